@@ -1,11 +1,58 @@
+import 'dart:convert';
 import 'package:http/http.dart' as http;
 import 'package:html/parser.dart' as parser;
 import 'package:html/dom.dart';
 
 class MetadataExtractor {
+  final String baseUrl;
+
+  MetadataExtractor(
+      {this.baseUrl =
+          'https://beloved-selected-krill.ngrok-free.app'}); // Change to your actual API endpoint
+
   /// Extract Open Graph metadata from a URL
   /// Returns a map with metadata or null if extraction fails
   Future<Map<String, String>?> extractMetadata(String url) async {
+    // The server answers from its shared cache with a downscaled image,
+    // so the phone doesn't download the whole page
+    final preview = await _fetchServerPreview(url);
+    if (preview != null) {
+      return preview;
+    }
+    return _extractOnDevice(url);
+  }
+
+  /// Get the preview from the server's link-preview endpoint
+  /// Returns null if the server can't be reached or can't preview the URL
+  Future<Map<String, String>?> _fetchServerPreview(String url) async {
+    try {
+      final response = await http
+          .get(Uri.parse('$baseUrl/api/v1/link-preview/')
+              .replace(queryParameters: {'url': url}))
+          .timeout(const Duration(seconds: 15));
+
+      if (response.statusCode != 200) {
+        print('Server preview failed: ${response.statusCode}');
+        return null;
+      }
+
+      final preview = jsonDecode(response.body) as Map<String, dynamic>;
+      return {
+        'url': url,
+        'title': preview['title'] ?? '',
+        'description': preview['description'] ?? '',
+        'image': preview['image'] ?? '',
+        'siteName': preview['site_name'] ?? '',
+        'type': preview['type'] ?? '',
+      };
+    } catch (e) {
+      print('Error fetching server preview: $e');
+      return null;
+    }
+  }
+
+  /// Download and parse the page on the device, used when the server is unavailable
+  Future<Map<String, String>?> _extractOnDevice(String url) async {
     try {
       // Make HTTP request to get the HTML content
       final response = await http.get(Uri.parse(url));
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import LinkedInVideo, VideoMetadata, HashTag
+from .models import EngagementSnapshot, LinkedInVideo, PageSnapshot, VideoMetadata, HashTag
 
 class VideoMetadataInline(admin.StackedInline):
     model = VideoMetadata
@@ -8,24 +8,45 @@ class VideoMetadataInline(admin.StackedInline):
     readonly_fields = [
         'author_name', 'author_headline', 'author_profile_url', 'author_username',
         'post_text', 'published_date', 'likes_count', 'comments_count',
+        'published_at', 'num_likes', 'num_comments',
         'embed_id', 'media_id', 'resolution', 'quality', 'has_auth_token',
         'open_graph', 'twitter_card'
     ]
 
+class EngagementSnapshotInline(admin.TabularInline):
+    model = EngagementSnapshot
+    can_delete = False
+    extra = 0
+    verbose_name_plural = 'Engagement History'
+    readonly_fields = ['captured_at', 'num_likes', 'num_comments']
+
+class PageSnapshotInline(admin.TabularInline):
+    model = PageSnapshot
+    can_delete = False
+    extra = 0
+    verbose_name_plural = 'Page Snapshots'
+    readonly_fields = ['captured_at', 'sha256', 'size']
+
 @admin.register(LinkedInVideo)
 class LinkedInVideoAdmin(admin.ModelAdmin):
-    list_display = ['id', 'title', 'status', 'created_at', 'file_size']
-    list_filter = ['status', 'created_at']
-    search_fields = ['title', 'post_url', 'id']
-    readonly_fields = ['id', 'created_at', 'updated_at', 'extracted_at', 'file_size']
-    inlines = [VideoMetadataInline]
+    list_display = ['id', 'title', 'status', 'priority', 'created_at', 'file_size']
+    list_filter = ['status', 'priority', 'is_tracked', 'created_at']
+    search_fields = ['title', 'post_url', 'id', '=post_key']
+    readonly_fields = ['id', 'post_key', 'created_at', 'updated_at', 'extracted_at', 'file_size', 'duration', 'last_accessed_at', 'file_evicted_at', 'queued_at', 'attempts', 'engagement_refreshed_at']
+    inlines = [VideoMetadataInline, EngagementSnapshotInline, PageSnapshotInline]
     
     fieldsets = (
         ('Basic Information', {
-            'fields': ('id', 'post_url', 'status', 'error_message')
+            'fields': ('id', 'post_url', 'post_key', 'status', 'error_message')
         }),
         ('Video Details', {
-            'fields': ('title', 'description', 'video_file', 'file_size')
+            'fields': ('title', 'description', 'video_file', 'file_size', 'quality_policy', 'poster_image', 'duration', 'last_accessed_at', 'file_evicted_at')
+        }),
+        ('Scheduling', {
+            'fields': ('priority', 'client_key', 'queued_at', 'attempts')
+        }),
+        ('Engagement tracking', {
+            'fields': ('is_tracked', 'engagement_refreshed_at')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at', 'extracted_at')
@@ -0,0 +1 @@
+"""Offline benchmark harness: a fake LinkedIn and CDN server, and the scenarios run against it"""
@@ -0,0 +1,249 @@
+import hashlib
+import html
+import json
+import re
+import struct
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Renditions offered for every post, as a share of the configured video size
+VARIANT_SHARES = {1080: 1.0, 720: 0.5, 480: 0.25}
+VIDEO_PATH_PATTERN = re.compile(r'^/playlist/vid/v2/([^/]+)/mp4-(\d+)p-30fp-crf28/0/\d+$')
+CHUNK_SIZE = 256 * 1024
+
+POST_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+  <title>{title}</title>
+  <meta name="description" content="{description}">
+  <meta property="og:type" content="video.other">
+  <meta property="og:title" content="{title}">
+  <meta property="og:description" content="{description}">
+  <meta property="og:image" content="http://media.licdn.com/dms/image/{media_id}/poster.jpg">
+  <meta property="og:video" content="{video_url}">
+  <meta property="og:url" content="{post_url}">
+  <meta name="twitter:card" content="player">
+  <meta name="twitter:title" content="{title}">
+  <meta name="twitter:description" content="{description}">
+</head>
+<body>
+  <div class="update-components-actor__container">
+    <a href="http://www.linkedin.com/in/{username}">
+      <span class="update-components-actor__name">Bench Mark</span>
+    </a>
+    <span class="update-components-actor__description">Performance engineer</span>
+    <span class="update-components-actor__sub-description">2d</span>
+  </div>
+  <div class="update-components-text">{post_text}</div>
+  <video src="{video_url}" data-sources="{data_sources}" dms-src="{dms_src}" preload="metadata"></video>
+  <span class="social-details-social-counts__reactions-count">1,234</span>
+  <span class="social-details-social-counts__comments">56 comments</span>
+</body>
+</html>
+"""
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><body>
+  <form action="/feed/" method="get">
+    <input id="username" name="session_key">
+    <input id="password" name="session_password" type="password">
+    <button type="submit">Sign in</button>
+  </form>
+</body></html>
+"""
+
+FEED_PAGE = """<!DOCTYPE html>
+<html><body><nav id="global-nav">Home</nav></body></html>
+"""
+
+
+def _mp4_header(size):
+    """ftyp box followed by the header of an mdat box spanning the rest of the file"""
+    ftyp = struct.pack('>I4s4sI4s4s', 24, b'ftyp', b'isom', 512, b'isom', b'mp41')
+    return ftyp + struct.pack('>I4s', size - len(ftyp), b'mdat')
+
+
+class FakeLinkedInHandler(BaseHTTPRequestHandler):
+    """Serves synthetic LinkedIn post pages and CDN video files, directly or as an HTTP proxy"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._dispatch(head=True)
+
+    def do_GET(self):
+        self._dispatch(head=False)
+
+    def _dispatch(self, head):
+        # Proxied requests carry an absolute URL, direct ones just the path
+        parts = urllib.parse.urlsplit(self.path)
+        path = parts.path.rstrip('/') or '/'
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.server.count_request()
+
+        video_match = VIDEO_PATH_PATTERN.match(path)
+        if video_match:
+            return self._send_video(int(video_match.group(2)), head)
+        if path.startswith('/posts/'):
+            return self._send_page(self.server.post_page(path), head)
+        if path == '/login':
+            return self._send_page(LOGIN_PAGE, head)
+        if path == '/feed':
+            return self._send_page(FEED_PAGE, head)
+        self._send_empty(404)
+
+    def _send_empty(self, code, headers=None):
+        self.send_response(code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _send_page(self, body, head):
+        payload = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(payload)
+
+    def _send_video(self, height, head):
+        if height not in VARIANT_SHARES:
+            return self._send_empty(404)
+
+        size = self.server.variant_size(height)
+        start, end = 0, size - 1
+        status = 200
+        range_header = self.headers.get('Range')
+        if range_header:
+            match = re.match(r'^bytes=(\d*)-(\d*)$', range_header.strip())
+            if not match or not any(match.groups()):
+                return self._send_empty(416, {'Content-Range': f'bytes */{size}'})
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                start = max(size - int(match.group(2)), 0)
+            if start > end or start >= size:
+                return self._send_empty(416, {'Content-Range': f'bytes */{size}'})
+            status = 206
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+        if head:
+            return
+
+        header = _mp4_header(size)
+        zeros = bytes(CHUNK_SIZE)
+        position = start
+        try:
+            while position <= end:
+                chunk_end = min(position + CHUNK_SIZE, end + 1)
+                chunk = header[position:chunk_end] if position < len(header) else b''
+                chunk += zeros[:chunk_end - position - len(chunk)]
+                self.wfile.write(chunk)
+                position = chunk_end
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class FakeLinkedInServer(ThreadingHTTPServer):
+    """
+    Local stand-in for linkedin.com and its video CDN
+
+    Post pages carry the Open Graph/Twitter tags, author and engagement markup,
+    and the <video> src, data-sources and dms-src attributes the scrapers read.
+    Every rendition is a range-capable MP4 of a configurable size. Point HTTP
+    clients at it as a proxy to keep the real http://www.linkedin.com URLs.
+
+    Args:
+        video_size: Size in bytes of the highest rendition
+        latency: Seconds to wait before answering each request
+        port: Port to listen on, 0 for any free port
+    """
+
+    daemon_threads = True
+
+    def __init__(self, video_size=5 * 1024 * 1024, latency=0.0, port=0):
+        super().__init__(('127.0.0.1', port), FakeLinkedInHandler)
+        self.video_size = video_size
+        self.latency = latency
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def address(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self):
+        with self._lock:
+            self.requests_served += 1
+
+    def variant_size(self, height):
+        return max(int(self.video_size * VARIANT_SHARES[height]), 64)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-linkedin', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    @staticmethod
+    def post_url(index):
+        """URL of the index-th synthetic post"""
+        return f"http://www.linkedin.com/posts/benchmark-user_video-{index}-activity-{7000000000000000000 + index}-bnch"
+
+    @staticmethod
+    def video_url(media_id, height):
+        # Signed CDN URLs expire; an hour is plenty for a benchmark run
+        expires_at = int(time.time()) + 3600
+        return (
+            f"http://dms.licdn.com/playlist/vid/v2/{media_id}/mp4-{height}p-30fp-crf28/0/{expires_at}"
+            f"?e={expires_at}&v=beta&t=benchmark-token"
+        )
+
+    def post_page(self, path):
+        """Render the post page for a /posts/<slug> path"""
+        slug = path.split('/')[2] if len(path.split('/')) > 2 else 'post'
+        username = slug.split('_')[0]
+        media_id = 'BENCH' + hashlib.sha1(slug.encode('utf-8')).hexdigest()[:12].upper()
+        sources = [
+            {'src': self.video_url(media_id, height), 'type': 'video/mp4', 'data-bitrate': height * 2000}
+            for height in sorted(VARIANT_SHARES, reverse=True)
+        ]
+        return POST_TEMPLATE.format(
+            title=html.escape(f"Benchmark video {slug}"),
+            description="A synthetic post used to benchmark the download pipeline",
+            username=username,
+            media_id=media_id,
+            post_url=html.escape(f"http://www.linkedin.com{path}"),
+            post_text=html.escape(f"Measuring the pipeline on {slug} #benchmark #performance #video"),
+            video_url=html.escape(self.video_url(media_id, 720)),
+            data_sources=html.escape(json.dumps(sources)),
+            dms_src=html.escape(self.video_url(media_id, 480)),
+        )
@@ -0,0 +1,380 @@
+import os
+import math
+import time
+import shutil
+import logging
+import platform
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+import django
+from django.conf import settings
+from django.core.files import File
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from linkedin_api.celery import app as celery_app
+from ..models import LinkedInVideo
+from ..tasks import download_linkedin_video
+from ..utils.linkedin_downloader import LinkedInDownloader
+from ..utils.metadata_extractor import MetadataExtractor
+from ..utils.persistence import VideoJobRecorder
+from ..utils.url_cache import cache_video_url
+from ..utils.video_resolver import resolve_video_url
+
+logger = logging.getLogger(__name__)
+
+PROXY_VARIABLES = ('http_proxy', 'HTTP_PROXY', 'no_proxy', 'NO_PROXY')
+
+# URLs per iteration of the url_metadata_batch scenario
+METADATA_BATCH_SIZE = 50
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(durations, errors, elapsed, transferred_bytes=0, first_error=None):
+    """
+    Summarize the timed iterations of one scenario
+
+    Args:
+        durations: Seconds taken by each successful iteration
+        errors: Number of failed iterations
+        elapsed: Wall-clock seconds for all iterations
+        transferred_bytes: Bytes moved by the successful iterations
+        first_error: Message of the first failure, if any
+
+    Returns:
+        dict: Counts, throughput and latency percentiles in milliseconds
+    """
+    values = sorted(duration * 1000 for duration in durations)
+    summary = {
+        'iterations': len(durations) + errors,
+        'errors': errors,
+        'throughput_per_second': round(len(durations) / elapsed, 3) if elapsed else None,
+        'latency_ms': {
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+            'mean': sum(values) / len(values) if values else None,
+            'min': values[0] if values else None,
+            'max': values[-1] if values else None,
+        },
+    }
+    summary['latency_ms'] = {key: round(value, 3) if value is not None else None for key, value in summary['latency_ms'].items()}
+    if transferred_bytes:
+        summary['mb_per_second'] = round(transferred_bytes / (1024 * 1024) / elapsed, 3) if elapsed else None
+    if first_error:
+        summary['first_error'] = first_error
+    return summary
+
+
+class CountingSink:
+    """Writable file-like object that discards the data, so downloads measure the network path only"""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+
+class BenchmarkError(Exception):
+    """Raised when an iteration produced a wrong result"""
+
+
+class BenchmarkRunner:
+    """
+    Runs the pipeline against a FakeLinkedInServer and reports latency percentiles
+
+    Everything runs on a throwaway test database, a temporary MEDIA_ROOT and a
+    local memory cache, with Celery in eager mode, so a run leaves no trace.
+    Scenarios that need Chrome only run with use_browser.
+
+    Args:
+        server: Running FakeLinkedInServer
+        iterations: Timed iterations per scenario
+        warmup: Untimed iterations run first
+        seed_videos: Completed videos created for the listing and search scenarios
+        use_browser: Whether to run the scenarios that launch Chrome
+        log: Optional callable for progress messages
+    """
+
+    def __init__(self, server, iterations=20, warmup=2, seed_videos=200, use_browser=False, log=None):
+        self.server = server
+        self.iterations = iterations
+        self.warmup = warmup
+        self.seed_videos = seed_videos
+        self.use_browser = use_browser
+        self.log = log or logger.info
+        self.client = None
+        self.file_video = None
+        self.post_counter = 0
+
+        # name: (method, needs a browser)
+        self.scenarios = {
+            'url_metadata': (self.bench_url_metadata, False),
+            'url_metadata_batch': (self.bench_url_metadata_batch, False),
+            'cdn_download': (self.bench_cdn_download, False),
+            'api_create': (self.bench_api_create, False),
+            'api_list': (self.bench_api_list, False),
+            'api_search': (self.bench_api_search, False),
+            'api_video_file_range': (self.bench_api_video_file_range, False),
+            'api_download_url_cached': (self.bench_api_download_url_cached, False),
+            'resolve_video_url': (self.bench_resolve_video_url, True),
+            'download_task': (self.bench_download_task, True),
+        }
+
+    def next_post_url(self):
+        self.post_counter += 1
+        return self.server.post_url(self.post_counter)
+
+    @contextmanager
+    def environment(self):
+        """Isolate the run: test database, temporary media, local cache, eager Celery, proxy to the fake server"""
+        if settings.VIDEO_STORAGE_BACKEND != 'filesystem':
+            raise BenchmarkError("The benchmark stores videos; run it with VIDEO_STORAGE_BACKEND=filesystem")
+
+        saved_environ = {name: os.environ.get(name) for name in PROXY_VARIABLES}
+        saved_eager = celery_app.conf.task_always_eager
+        work_dir = tempfile.mkdtemp(prefix='linkedin-benchmark-')
+        old_database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        setup_test_environment()
+        os.environ.update({
+            'http_proxy': self.server.address, 'HTTP_PROXY': self.server.address,
+            'no_proxy': 'localhost,127.0.0.1', 'NO_PROXY': 'localhost,127.0.0.1',
+        })
+        celery_app.conf.task_always_eager = True
+        try:
+            with override_settings(
+                MEDIA_ROOT=os.path.join(work_dir, 'media'),
+                VIDEO_TEMP_DIR=os.path.join(work_dir, 'tmp'),
+                VIDEO_POSTPROCESS_ENABLED=False,
+                CHROME_PROXY_SERVER=self.server.address,
+                CACHES={'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'linkedin-benchmark',
+                }},
+            ):
+                self.client = Client()
+                yield
+        finally:
+            celery_app.conf.task_always_eager = saved_eager
+            for name, value in saved_environ.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            teardown_test_environment()
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def seed(self):
+        """Create completed videos with metadata and hashtags, and one with a stored file"""
+        for index in range(self.seed_videos):
+            video = LinkedInVideo(
+                post_url=self.server.post_url(1000000 + index),
+                status='completed',
+                title=f"Benchmark video {index}",
+                description="A synthetic post used to benchmark the download pipeline",
+            )
+            recorder = VideoJobRecorder(video)
+            recorder.add_post_metadata({
+                'author_name': 'Bench Mark',
+                'author_username': 'benchmark-user',
+                'post_text': f"Measuring the pipeline on video {index} #benchmark #performance",
+                'published_date': '2d',
+                'likes_count': '1,234',
+                'comments_count': '56 comments',
+                'hashtags': ['benchmark', 'performance'],
+            }, scraped_at=timezone.now())
+            recorder.flush()
+
+        # A real download, so range requests are served from disk
+        video_url = self.server.video_url('BENCHFILE', 1080)
+        temp_path = os.path.join(settings.VIDEO_TEMP_DIR, 'seed.mp4')
+        success, file_size_mb = LinkedInDownloader().download_video(video_url, temp_path)
+        if not success:
+            raise BenchmarkError("Could not download the seed video from the fake CDN")
+        self.file_video = LinkedInVideo.objects.create(post_url=self.next_post_url(), status='completed', file_size=file_size_mb)
+        with open(temp_path, 'rb') as f:
+            self.file_video.video_file.save('benchmark.mp4', File(f))
+        os.unlink(temp_path)
+
+    def measure(self, iteration):
+        """Run warmup and timed iterations of a callable that returns the bytes it transferred"""
+        for _ in range(self.warmup):
+            try:
+                iteration()
+            except Exception:
+                pass
+
+        durations, errors, transferred, first_error = [], 0, 0, None
+        started = time.perf_counter()
+        for _ in range(self.iterations):
+            start = time.perf_counter()
+            try:
+                transferred += iteration() or 0
+            except Exception as e:
+                errors += 1
+                first_error = first_error or f"{type(e).__name__}: {e}"
+                continue
+            durations.append(time.perf_counter() - start)
+        return summarize(durations, errors, time.perf_counter() - started, transferred, first_error)
+
+    def run(self, names=None):
+        """
+        Run the selected scenarios (all by default)
+
+        Returns:
+            dict: JSON-serializable report
+        """
+        names = names or list(self.scenarios)
+        unknown = set(names) - set(self.scenarios)
+        if unknown:
+            raise BenchmarkError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        report = {
+            'started_at': timezone.now().isoformat(),
+            'config': {
+                'iterations': self.iterations,
+                'warmup': self.warmup,
+                'seed_videos': self.seed_videos,
+                'video_size_bytes': self.server.video_size,
+                'latency_ms': self.server.latency * 1000,
+                'browser': self.use_browser,
+            },
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'scenarios': {},
+        }
+
+        started = time.perf_counter()
+        with self.environment():
+            self.log(f"Seeding {self.seed_videos} videos")
+            self.seed()
+            for name in names:
+                method, needs_browser = self.scenarios[name]
+                if needs_browser and not self.use_browser:
+                    report['scenarios'][name] = {'skipped': 'needs Chrome, run with --browser'}
+                    continue
+                self.log(f"Running {name}")
+                report['scenarios'][name] = method()
+
+        report['duration_seconds'] = round(time.perf_counter() - started, 3)
+        report['fake_server_requests'] = self.server.requests_served
+        return report
+
+    def bench_url_metadata(self):
+        extractor = MetadataExtractor()
+
+        def iteration():
+            metadata = extractor.extract_url_metadata(self.next_post_url())
+            if 'error' in metadata:
+                raise BenchmarkError(metadata['error'])
+
+        return self.measure(iteration)
+
+    def bench_url_metadata_batch(self):
+        extractor = MetadataExtractor()
+
+        def iteration():
+            batch = [self.next_post_url() for _ in range(METADATA_BATCH_SIZE)]
+            for metadata in extractor.extract_many_url_metadata(batch):
+                if 'error' in metadata:
+                    raise BenchmarkError(metadata['error'])
+
+        return self.measure(iteration)
+
+    def bench_cdn_download(self):
+        downloader = LinkedInDownloader()
+
+        def iteration():
+            sink = CountingSink()
+            success, _ = downloader.download_video_to_stream(self.server.video_url('BENCHCDN', 1080), sink)
+            if not success:
+                raise BenchmarkError("Download failed")
+            return sink.size
+
+        return self.measure(iteration)
+
+    def bench_api_create(self):
+        def iteration():
+            response = self.client.post(reverse('linkedin-video'), {'post_url': self.next_post_url()}, content_type='application/json')
+            if response.status_code != 201:
+                raise BenchmarkError(f"HTTP {response.status_code}")
+
+        if self.use_browser:
+            # Eager Celery runs the whole download inside the request
+            return self.measure(iteration)
+        with mock.patch.object(download_linkedin_video, 'apply_async'):
+            return self.measure(iteration)
+
+    def bench_api_list(self):
+        def iteration():
+            response = self.client.get(reverse('video-list'), {'page_size': 20})
+            if response.status_code != 200:
+                raise BenchmarkError(f"HTTP {response.status_code}")
+
+        return self.measure(iteration)
+
+    def bench_api_search(self):
+        def iteration():
+            response = self.client.get(reverse('video-search'), {'q': 'benchmark performance'})
+            if response.status_code != 200:
+                raise BenchmarkError(f"HTTP {response.status_code}")
+
+        return self.measure(iteration)
+
+    def bench_api_video_file_range(self):
+        url = reverse('video-file', args=[self.file_video.id])
+
+        def iteration():
+            response = self.client.get(url, HTTP_RANGE='bytes=0-1048575')
+            if response.status_code != 206:
+                raise BenchmarkError(f"HTTP {response.status_code}")
+            return sum(len(chunk) for chunk in response.streaming_content)
+
+        return self.measure(iteration)
+
+    def bench_api_download_url_cached(self):
+        post_url = self.next_post_url()
+        cache_video_url(post_url, self.server.video_url('BENCHCACHED', 1080), settings.VIDEO_QUALITY_POLICY)
+
+        def iteration():
+            response = self.client.post(reverse('video-download-url'), {'url': post_url}, content_type='application/json')
+            if response.status_code != 200 or not response.json().get('cached'):
+                raise BenchmarkError(f"HTTP {response.status_code}")
+
+        return self.measure(iteration)
+
+    def bench_resolve_video_url(self):
+        def iteration():
+            video_url, _ = resolve_video_url(self.next_post_url(), quality_policy=settings.VIDEO_QUALITY_POLICY)
+            if not video_url:
+                raise BenchmarkError("No video URL found")
+
+        return self.measure(iteration)
+
+    def bench_download_task(self):
+        def iteration():
+            video = LinkedInVideo.objects.create(post_url=self.next_post_url())
+            download_linkedin_video.apply(args=[str(video.id)])
+            video.refresh_from_db(fields=['status', 'error_message', 'file_size'])
+            if video.status != 'completed':
+                raise BenchmarkError(video.error_message or video.status)
+            return int((video.file_size or 0) * 1024 * 1024)
+
+        return self.measure(iteration)
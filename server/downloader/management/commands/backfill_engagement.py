@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from downloader.models import VideoMetadata
+from downloader.utils.engagement import apply_engagement_values
+
+
+class Command(BaseCommand):
+    help = "Parse stored likes, comments and post age strings into the typed engagement columns"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows written per UPDATE")
+        parser.add_argument('--all', action='store_true', help="Reparse rows that already have typed values")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = VideoMetadata.objects.select_related('video').only(
+            'id', 'likes_count', 'comments_count', 'published_date',
+            'num_likes', 'num_comments', 'published_at',
+            'video__created_at', 'video__extracted_at',
+        )
+        if not options['all']:
+            queryset = queryset.filter(num_likes__isnull=True, num_comments__isnull=True, published_at__isnull=True)
+
+        fields = ['num_likes', 'num_comments', 'published_at']
+        batch = []
+        scanned = updated = 0
+        for metadata_obj in queryset.iterator(chunk_size=batch_size):
+            scanned += 1
+            # Relative post ages are relative to when the post was scraped
+            reference = metadata_obj.video.extracted_at or metadata_obj.video.created_at
+            if apply_engagement_values(metadata_obj, reference=reference):
+                batch.append(metadata_obj)
+            if len(batch) >= batch_size:
+                VideoMetadata.objects.bulk_update(batch, fields)
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            VideoMetadata.objects.bulk_update(batch, fields)
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Scanned {scanned} rows, updated {updated}"))
@@ -0,0 +1,42 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from downloader.benchmark.fake_linkedin import FakeLinkedInServer
+from downloader.benchmark.runner import BenchmarkError, BenchmarkRunner
+
+
+class Command(BaseCommand):
+    help = "Benchmark the pipeline offline against a local fake LinkedIn and CDN, reporting JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Timed iterations per scenario")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed iterations before each scenario")
+        parser.add_argument('--video-size', type=int, default=5 * 1024 * 1024, help="Bytes of the highest video rendition")
+        parser.add_argument('--latency-ms', type=float, default=0, help="Delay before each fake server response")
+        parser.add_argument('--seed-videos', type=int, default=200, help="Completed videos created for listing and search")
+        parser.add_argument('--scenario', action='append', dest='scenarios', help="Scenario to run, repeatable (default: all)")
+        parser.add_argument('--browser', action='store_true', help="Also run the scenarios that launch Chrome")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout")
+
+    def handle(self, *args, **options):
+        server = FakeLinkedInServer(video_size=options['video_size'], latency=options['latency_ms'] / 1000)
+        with server:
+            runner = BenchmarkRunner(
+                server,
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                seed_videos=options['seed_videos'],
+                use_browser=options['browser'],
+                log=lambda message: self.stderr.write(message),
+            )
+            try:
+                report = runner.run(options['scenarios'])
+            except BenchmarkError as e:
+                raise CommandError(str(e))
+
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(payload + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote benchmark report to {options['output']}"))
+        else:
+            self.stdout.write(payload)
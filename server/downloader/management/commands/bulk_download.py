@@ -0,0 +1,180 @@
+import os
+import sys
+import json
+import time
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from downloader.utils.bulk_download import download_post, init_worker
+from downloader.utils.failures import classify_failure
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 2.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Download many LinkedIn posts directly, without the API or the Celery broker, "
+        "using a process pool with one browser per process"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', nargs='?', help="File with one post URL per line (default: stdin)")
+        parser.add_argument('--browsers', type=int, default=4, help="Worker processes, each driving one Chrome")
+        parser.add_argument('--output', help="Append one JSON result per post to this file (default: stdout)")
+        parser.add_argument('--checkpoint', help="File of finished URLs; they are skipped, and new ones appended")
+        parser.add_argument('--email', default=os.getenv('LINKEDIN_EMAIL', ''), help="LinkedIn account email (default: $LINKEDIN_EMAIL)")
+        parser.add_argument('--password', default=os.getenv('LINKEDIN_PASSWORD', ''), help="LinkedIn account password (default: $LINKEDIN_PASSWORD)")
+        parser.add_argument('--postprocess', action='store_true', help="Remux and extract posters in the workers too")
+        parser.add_argument('--redownload', action='store_true', help="Download posts that already have a completed video")
+
+    def handle(self, *args, **options):
+        if options['browsers'] < 1:
+            raise CommandError("--browsers must be at least 1")
+
+        urls = self.read_urls(options['file'])
+        finished = self.read_checkpoint(options['checkpoint'])
+        pending = [url for url in urls if url not in finished]
+        if len(pending) < len(urls):
+            self.stderr.write(f"Skipping {len(urls) - len(pending)} URLs already in the checkpoint")
+        if not pending:
+            self.stderr.write("Nothing to download")
+            return
+
+        output = open(options['output'], 'a') if options['output'] else self.stdout
+        checkpoint = open(options['checkpoint'], 'a') if options['checkpoint'] else None
+
+        # Workers open their own connections; don't hand them the parent's
+        connections.close_all()
+
+        def start_pool():
+            return ProcessPoolExecutor(
+                max_workers=options['browsers'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=(options['email'], options['password'], options['postprocess']),
+            )
+
+        pool = start_pool()
+        progress = Progress(len(pending), self.stderr)
+        queue = iter(pending)
+        in_flight = {}
+        try:
+            while True:
+                # Keep two posts per worker queued, so reading stays lazy for huge lists
+                while len(in_flight) < options['browsers'] * 2:
+                    url = next(queue, None)
+                    if url is None:
+                        break
+                    in_flight[pool.submit(download_post, url, not options['redownload'])] = url
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                pool_broken = False
+                for future in done:
+                    url = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # A worker killed mid-post (e.g. by the OOM killer) breaks the whole pool,
+                        # and errors raised before download_post records a failure land here too
+                        pool_broken = pool_broken or isinstance(e, BrokenProcessPool)
+                        result = {
+                            'post_url': url, 'status': 'failed', 'reason': classify_failure(e).reason,
+                            'error': str(e) or type(e).__name__, 'seconds': None,
+                        }
+                    output.write(json.dumps(result) + '\n')
+                    output.flush()
+                    if checkpoint and result['status'] != 'failed':
+                        checkpoint.write(result['post_url'] + '\n')
+                        checkpoint.flush()
+                    progress.record(result)
+                if pool_broken:
+                    self.stderr.write("A worker process died, starting a new pool")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = start_pool()
+                progress.report()
+        except KeyboardInterrupt:
+            self.stderr.write("Interrupted, waiting for the posts in progress; rerun with the same --checkpoint to resume")
+            pool.shutdown(wait=True, cancel_futures=True)
+        else:
+            pool.shutdown(wait=True)
+        finally:
+            if checkpoint:
+                checkpoint.close()
+            if options['output']:
+                output.close()
+
+        self.stderr.write(json.dumps(progress.summary(), indent=2))
+
+    def read_urls(self, path):
+        """Post URLs in file order, without blanks, comments or duplicates"""
+        if path:
+            with open(path) as f:
+                lines = f.read().splitlines()
+        else:
+            lines = sys.stdin.read().splitlines()
+        urls = [line.strip() for line in lines]
+        return list(dict.fromkeys(url for url in urls if url and not url.startswith('#')))
+
+    def read_checkpoint(self, path):
+        if not path or not os.path.exists(path):
+            return set()
+        with open(path) as f:
+            return {line.strip() for line in f if line.strip()}
+
+
+class Progress:
+    """Counts bulk download results and reports progress and throughput"""
+
+    def __init__(self, total, stream):
+        self.total = total
+        self.stream = stream
+        self.started = time.monotonic()
+        self.last_report = 0
+        self.counts = {'completed': 0, 'skipped': 0, 'failed': 0}
+        self.failure_reasons = {}
+        self.megabytes = 0.0
+        self.durations = []
+
+    def record(self, result):
+        self.counts[result['status']] += 1
+        if result['status'] == 'failed':
+            self.failure_reasons[result['reason']] = self.failure_reasons.get(result['reason'], 0) + 1
+        elif result['status'] == 'completed':
+            self.megabytes += result.get('file_size_mb') or 0
+            self.durations.append(result['seconds'])
+
+    @property
+    def done(self):
+        return sum(self.counts.values())
+
+    def report(self):
+        now = time.monotonic()
+        if now - self.last_report < PROGRESS_INTERVAL and self.done < self.total:
+            return
+        self.last_report = now
+        elapsed = now - self.started
+        rate = self.done / elapsed if elapsed else 0
+        eta = (self.total - self.done) / rate if rate else None
+        self.stream.write(
+            f"{self.done}/{self.total} done ({self.counts['completed']} completed, "
+            f"{self.counts['skipped']} skipped, {self.counts['failed']} failed), "
+            f"{rate * 60:.1f} posts/min, {self.megabytes / elapsed if elapsed else 0:.2f} MB/s, "
+            f"ETA {f'{eta / 60:.0f} min' if eta is not None else 'unknown'}"
+        )
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        durations = sorted(self.durations)
+        return {
+            **self.counts,
+            'failure_reasons': self.failure_reasons,
+            'elapsed_seconds': round(elapsed, 1),
+            'posts_per_minute': round(self.done / elapsed * 60, 1) if elapsed else None,
+            'megabytes': round(self.megabytes, 1),
+            'median_seconds_per_post': durations[len(durations) // 2] if durations else None,
+        }
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from downloader.models import LinkedInVideo
+from downloader.utils.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search documents of all videos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Videos indexed per transaction")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        backend = get_search_backend()
+        queryset = LinkedInVideo.objects.select_related('metadata').prefetch_related('hashtags').order_by('pk')
+
+        indexed = 0
+        last_pk = None
+        while True:
+            page = queryset.filter(pk__gt=last_pk) if last_pk else queryset
+            videos = list(page[:batch_size])
+            if not videos:
+                break
+            with transaction.atomic():
+                for video in videos:
+                    backend.index_video(video)
+            indexed += len(videos)
+            last_pk = videos[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} videos"))
@@ -0,0 +1,41 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from downloader.utils.snapshot_reextraction import reextract_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-parse the stored page snapshots of posts with the current selectors and update "
+        "their metadata, without loading anything from LinkedIn"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('video_ids', nargs='*', help="Only these videos (default: every video with a snapshot)")
+        parser.add_argument('--workers', type=int, help="Parser processes (default: number of CPUs)")
+        parser.add_argument('--batch-size', type=int, default=500, help="Videos parsed and written per batch")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without writing it")
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError("--workers must be at least 1")
+
+        started = time.monotonic()
+
+        def progress(summary):
+            elapsed = time.monotonic() - started
+            self.stderr.write(
+                f"{summary['videos']} parsed, {summary['changed']} changed, {summary['failed']} failed, "
+                f"{summary['videos'] / elapsed if elapsed else 0:.0f} pages/s"
+            )
+
+        # The parser processes set up Django on their own; don't hand them the parent's connections
+        connections.close_all()
+        summary = reextract_snapshots(
+            video_ids=options['video_ids'], workers=options['workers'], batch_size=options['batch_size'],
+            dry_run=options['dry_run'], progress=progress,
+        )
+        summary['elapsed_seconds'] = round(time.monotonic() - started, 1)
+        summary['dry_run'] = options['dry_run']
+        self.stdout.write(json.dumps(summary, indent=2))
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.10 on 2026-10-19 12:05
+
+import re
+import hashlib
+import urllib.parse
+from django.db import migrations, models
+
+# Frozen copy of downloader.utils.linkedin_urls.canonical_post_key as of this migration,
+# so later changes to the helper don't change what the backfill does
+POST_URN_PATTERN = re.compile(r'(activity|ugcPost|share)[-:](\d{10,})')
+
+
+def canonical_post_key(post_url):
+    match = POST_URN_PATTERN.search(urllib.parse.unquote(post_url or ''))
+    if match:
+        return f"{match.group(1)}:{match.group(2)}"
+
+    parsed_url = urllib.parse.urlparse(post_url or '')
+    netloc = parsed_url.netloc.lower()
+    if netloc.startswith('linkedin.com'):
+        netloc = 'www.' + netloc
+    normalized_url = f"https://{netloc}{parsed_url.path.rstrip('/')}"
+    return f"url:{hashlib.sha1(normalized_url.encode('utf-8')).hexdigest()}"
+
+
+def backfill_post_keys(apps, schema_editor):
+    LinkedInVideo = apps.get_model('downloader', 'LinkedInVideo')
+    batch = []
+    for video in LinkedInVideo.objects.only('id', 'post_url').iterator(chunk_size=1000):
+        video.post_key = canonical_post_key(video.post_url)
+        batch.append(video)
+        if len(batch) >= 1000:
+            LinkedInVideo.objects.bulk_update(batch, ['post_key'])
+            batch = []
+    if batch:
+        LinkedInVideo.objects.bulk_update(batch, ['post_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('downloader', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='linkedinvideo',
+            name='post_key',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='Canonical post identifier parsed from the post URL', max_length=64),
+        ),
+        migrations.RunPython(backfill_post_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='linkedinvideo',
+            index=models.Index(fields=['-created_at'], name='video_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='linkedinvideo',
+            index=models.Index(fields=['status', '-created_at'], name='video_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='linkedinvideo',
+            index=models.Index(fields=['status', 'updated_at'], name='video_status_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.10 on 2026-10-19 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('downloader', '0002_linkedinvideo_post_key_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videometadata',
+            name='num_comments',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='videometadata',
+            name='num_likes',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='videometadata',
+            name='published_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Approximate, derived from published_date', null=True),
+        ),
+    ]
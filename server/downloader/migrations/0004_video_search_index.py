@@ -0,0 +1,47 @@
+# Generated by Django 4.2.10 on 2026-10-19 12:07
+
+from django.db import migrations
+
+# Tables of the downloader.utils.search backends. Their DDL lives only here, so later
+# changes to the search backends don't change what this migration creates
+CREATE_INDEX_SQL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS downloader_video_fts USING fts5("
+        "video_id UNINDEXED, title, description, post_text, hashtags, "
+        "tokenize='unicode61 remove_diacritics 2')",
+    ],
+    'postgresql': [
+        "CREATE TABLE IF NOT EXISTS downloader_video_search ("
+        "video_id uuid PRIMARY KEY REFERENCES downloader_linkedinvideo (id) "
+        "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "document tsvector NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS downloader_video_search_document_gin "
+        "ON downloader_video_search USING GIN (document)",
+    ],
+}
+
+DROP_INDEX_SQL = {
+    'sqlite': ["DROP TABLE IF EXISTS downloader_video_fts"],
+    'postgresql': ["DROP TABLE IF EXISTS downloader_video_search"],
+}
+
+
+def create_search_index(apps, schema_editor):
+    for statement in CREATE_INDEX_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    for statement in DROP_INDEX_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('downloader', '0003_videometadata_engagement_values'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
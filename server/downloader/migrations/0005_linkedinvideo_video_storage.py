@@ -0,0 +1,20 @@
+# Generated by Django 4.2.10 on 2026-10-19 12:10
+
+from django.db import migrations, models
+import downloader.models
+import downloader.utils.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('downloader', '0004_video_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='linkedinvideo',
+            name='video_file',
+            field=models.FileField(blank=True, null=True, storage=downloader.utils.storage.get_video_storage, upload_to=downloader.models.video_upload_path),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.10 on 2026-10-19 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('downloader', '0005_linkedinvideo_video_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='linkedinvideo',
+            name='file_evicted_at',
+            field=models.DateTimeField(blank=True, help_text='When the retention policy deleted the file', null=True),
+        ),
+        migrations.AddField(
+            model_name='linkedinvideo',
+            name='last_accessed_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Last playback through video-file/', null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.10 on 2026-10-19 12:13
+
+from django.db import migrations, models
+import downloader.utils.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('downloader', '0006_linkedinvideo_retention_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='linkedinvideo',
+            name='duration',
+            field=models.FloatField(blank=True, help_text='Length in seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='linkedinvideo',
+            name='poster_image',
+            field=models.FileField(blank=True, null=True, storage=downloader.utils.storage.get_video_storage, upload_to='linkedin_posters'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('downloader', '0007_linkedinvideo_poster_duration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='linkedinvideo',
+            name='quality_policy',
+            field=models.CharField(blank=True, default='', help_text='Rendition to download: highest, lowest, max_height:<px> or max_bytes:<n>; empty for VIDEO_QUALITY_POLICY', max_length=32),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.10 on 2026-10-19 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('downloader', '0008_linkedinvideo_quality_policy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='linkedinvideo',
+            name='client_key',
+            field=models.CharField(blank=True, default='', help_text='Submitting client; bulk and background downloads are shared fairly between clients', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='linkedinvideo',
+            name='priority',
+            field=models.CharField(choices=[('interactive', 'Interactive'), ('bulk', 'Bulk'), ('background', 'Background refresh')], default='interactive', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='linkedinvideo',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, help_text='When the download was sent to its Celery queue', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='linkedinvideo',
+            index=models.Index(fields=['priority', 'status', 'queued_at'], name='video_dispatch_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-19 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('downloader', '0009_linkedinvideo_scheduling'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='linkedinvideo',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Download attempts started, including retries'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.10 on 2026-10-19 12:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('downloader', '0010_linkedinvideo_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='linkedinvideo',
+            name='engagement_refreshed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='linkedinvideo',
+            name='is_tracked',
+            field=models.BooleanField(db_index=True, default=False, help_text='Refresh likes and comments periodically'),
+        ),
+        migrations.CreateModel(
+            name='EngagementSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('captured_at', models.DateTimeField()),
+                ('num_likes', models.PositiveIntegerField(blank=True, null=True)),
+                ('num_comments', models.PositiveIntegerField(blank=True, null=True)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='engagement_snapshots', to='downloader.linkedinvideo')),
+            ],
+            options={
+                'ordering': ['captured_at'],
+                'indexes': [models.Index(fields=['video', 'captured_at'], name='snapshot_video_captured_idx')],
+            },
+        ),
+    ]
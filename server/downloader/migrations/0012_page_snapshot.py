@@ -0,0 +1,28 @@
+# Generated by Django 4.2.10 on 2026-10-19 12:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('downloader', '0011_engagement_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('captured_at', models.DateTimeField()),
+                ('sha256', models.CharField(db_index=True, help_text='Digest of the page source, naming its file under PAGE_SNAPSHOT_ROOT', max_length=64)),
+                ('size', models.PositiveIntegerField(help_text='Uncompressed size in bytes')),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='page_snapshots', to='downloader.linkedinvideo')),
+            ],
+            options={
+                'ordering': ['-captured_at'],
+                'indexes': [models.Index(fields=['video', '-captured_at'], name='page_snapshot_video_idx')],
+            },
+        ),
+    ]
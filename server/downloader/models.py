@@ -2,6 +2,8 @@ from django.db import models
 import uuid
 import os
 from django.conf import settings
+from .utils.linkedin_urls import canonical_post_key
+from .utils.storage import get_video_storage
 
 def video_upload_path(instance, filename):
     """Generate file path for LinkedIn video"""
@@ -18,18 +20,48 @@ class LinkedInVideo(models.Model):
         ('completed', 'Completed'),
         ('failed', 'Failed'),
     )
+    PRIORITY_CHOICES = (
+        ('interactive', 'Interactive'),
+        ('bulk', 'Bulk'),
+        ('background', 'Background refresh'),
+    )
 
     # Base fields
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     post_url = models.URLField(max_length=1000)
+    post_key = models.CharField(
+        max_length=64, db_index=True, editable=False, blank=True, default='',
+        help_text="Canonical post identifier parsed from the post URL"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     error_message = models.TextField(blank=True, null=True)
     
     # Video file
-    video_file = models.FileField(upload_to=video_upload_path, blank=True, null=True)
+    video_file = models.FileField(upload_to=video_upload_path, storage=get_video_storage, blank=True, null=True)
     file_size = models.FloatField(blank=True, null=True, help_text="Size in MB")
+    poster_image = models.FileField(upload_to='linkedin_posters', storage=get_video_storage, blank=True, null=True)
+    duration = models.FloatField(blank=True, null=True, help_text="Length in seconds")
+    last_accessed_at = models.DateTimeField(blank=True, null=True, db_index=True, help_text="Last playback through video-file/")
+    file_evicted_at = models.DateTimeField(blank=True, null=True, help_text="When the retention policy deleted the file")
+    quality_policy = models.CharField(
+        max_length=32, blank=True, default='',
+        help_text="Rendition to download: highest, lowest, max_height:<px> or max_bytes:<n>; empty for VIDEO_QUALITY_POLICY"
+    )
+    
+    # Scheduling
+    priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='interactive')
+    client_key = models.CharField(
+        max_length=255, blank=True, default='',
+        help_text="Submitting client; bulk and background downloads are shared fairly between clients"
+    )
+    queued_at = models.DateTimeField(blank=True, null=True, help_text="When the download was sent to its Celery queue")
+    attempts = models.PositiveIntegerField(default=0, help_text="Download attempts started, including retries")
+    
+    # Engagement tracking
+    is_tracked = models.BooleanField(default=False, db_index=True, help_text="Refresh likes and comments periodically")
+    engagement_refreshed_at = models.DateTimeField(blank=True, null=True)
     
     # Basic metadata
     extracted_at = models.DateTimeField(blank=True, null=True)
@@ -44,10 +76,25 @@ class LinkedInVideo(models.Model):
         ordering = ['-created_at']
         verbose_name = "LinkedIn Video"
         verbose_name_plural = "LinkedIn Videos"
+        indexes = [
+            models.Index(fields=['-created_at'], name='video_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='video_status_created_idx'),
+            models.Index(fields=['status', 'updated_at'], name='video_status_updated_idx'),
+            models.Index(fields=['priority', 'status', 'queued_at'], name='video_dispatch_idx'),
+        ]
 
     def __str__(self):
         return f"LinkedIn Video: {self.title or self.post_url}"
 
+    def save(self, *args, **kwargs):
+        """Keep post_key in sync with post_url"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'post_url' in update_fields:
+            self.post_key = canonical_post_key(self.post_url)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'post_key'}
+        super().save(*args, **kwargs)
+
 class VideoMetadata(models.Model):
     """Model for storing detailed video metadata"""
     video = models.OneToOneField(LinkedInVideo, on_delete=models.CASCADE, related_name='metadata')
@@ -64,6 +111,11 @@ class VideoMetadata(models.Model):
     likes_count = models.CharField(max_length=100, blank=True, null=True)
     comments_count = models.CharField(max_length=100, blank=True, null=True)
     
+    # Values parsed from the display strings above, for sorting and aggregation
+    published_at = models.DateTimeField(blank=True, null=True, db_index=True, help_text="Approximate, derived from published_date")
+    num_likes = models.PositiveIntegerField(blank=True, null=True, db_index=True)
+    num_comments = models.PositiveIntegerField(blank=True, null=True, db_index=True)
+    
     # Video specific info
     embed_id = models.CharField(max_length=255, blank=True, null=True)
     media_id = models.CharField(max_length=255, blank=True, null=True)
@@ -78,6 +130,38 @@ class VideoMetadata(models.Model):
     def __str__(self):
         return f"Metadata for {self.video}"
 
+class EngagementSnapshot(models.Model):
+    """Engagement counts of a tracked post at one point in time, recorded when they change"""
+    video = models.ForeignKey(LinkedInVideo, on_delete=models.CASCADE, related_name='engagement_snapshots')
+    captured_at = models.DateTimeField()
+    num_likes = models.PositiveIntegerField(blank=True, null=True)
+    num_comments = models.PositiveIntegerField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['captured_at']
+        indexes = [
+            models.Index(fields=['video', 'captured_at'], name='snapshot_video_captured_idx'),
+        ]
+
+    def __str__(self):
+        return f"Engagement of {self.video_id} at {self.captured_at}"
+
+class PageSnapshot(models.Model):
+    """Rendered post page saved at scrape time, kept gzip-compressed in a content-addressed store"""
+    video = models.ForeignKey(LinkedInVideo, on_delete=models.CASCADE, related_name='page_snapshots')
+    captured_at = models.DateTimeField()
+    sha256 = models.CharField(max_length=64, db_index=True, help_text="Digest of the page source, naming its file under PAGE_SNAPSHOT_ROOT")
+    size = models.PositiveIntegerField(help_text="Uncompressed size in bytes")
+
+    class Meta:
+        ordering = ['-captured_at']
+        indexes = [
+            models.Index(fields=['video', '-captured_at'], name='page_snapshot_video_idx'),
+        ]
+
+    def __str__(self):
+        return f"Page of {self.video_id} at {self.captured_at}"
+
 class HashTag(models.Model):
     """Model for hashtags in LinkedIn posts"""
     name = models.CharField(max_length=100, unique=True)
@@ -0,0 +1,10 @@
+from rest_framework.pagination import CursorPagination
+
+
+class VideoCursorPagination(CursorPagination):
+    """Cursor pagination on creation time, so deep pages cost the same as the first one"""
+    # The cursor holds a created_at and how many rows sharing it were already
+    # returned; id fixes the order of those rows, so no page repeats or skips one
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,5 +1,18 @@
+from django.conf import settings
+from django.urls import reverse
 from rest_framework import serializers
-from .models import LinkedInVideo, VideoMetadata, HashTag
+from .models import EngagementSnapshot, LinkedInVideo, VideoMetadata, HashTag
+from .utils.video_variants import parse_quality_policy
+
+
+def validate_quality_policy(value):
+    """Reject quality policies the variant selector doesn't understand"""
+    if value:
+        try:
+            parse_quality_policy(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+    return value
 
 class HashTagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,20 +27,40 @@ class VideoMetadataSerializer(serializers.ModelSerializer):
 class LinkedInVideoSerializer(serializers.ModelSerializer):
     metadata = VideoMetadataSerializer(read_only=True)
     hashtags = HashTagSerializer(many=True, read_only=True)
+    stream_url = serializers.SerializerMethodField()
+    hls_url = serializers.SerializerMethodField()
     
     class Meta:
         model = LinkedInVideo
         fields = [
             'id', 'post_url', 'status', 'created_at', 'updated_at', 
             'extracted_at', 'title', 'description', 'file_size',
-            'video_file', 'metadata', 'hashtags'
+            'video_file', 'stream_url', 'hls_url', 'poster_image', 'duration', 'file_evicted_at', 'quality_policy',
+            'priority', 'queued_at', 'attempts', 'is_tracked', 'engagement_refreshed_at', 'metadata', 'hashtags'
         ]
         read_only_fields = [
             'id', 'status', 'created_at', 'updated_at', 
             'extracted_at', 'title', 'description', 'file_size',
-            'video_file', 'metadata', 'hashtags'
+            'video_file', 'stream_url', 'hls_url', 'poster_image', 'duration', 'file_evicted_at', 'quality_policy',
+            'priority', 'queued_at', 'attempts', 'is_tracked', 'engagement_refreshed_at', 'metadata', 'hashtags'
         ]
     
+    def get_stream_url(self, obj):
+        """Seekable playback URL for the downloaded file"""
+        if not obj.video_file:
+            return None
+        url = reverse('video-file', args=[obj.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+    
+    def get_hls_url(self, obj):
+        """HLS playlist URL, packaged on first play"""
+        if not obj.video_file or not settings.HLS_ENABLED:
+            return None
+        url = reverse('video-hls', args=[obj.id, 'index.m3u8'])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+    
     def to_representation(self, instance):
         """Include all metadata even if the metadata relation doesn't exist yet"""
         representation = super().to_representation(instance)
@@ -71,13 +104,35 @@ class LinkedInVideoSerializer(serializers.ModelSerializer):
                 
         return representation
 
+class LinkedInVideoListSerializer(LinkedInVideoSerializer):
+    """Serializer for video listings, which only returns stored metadata and never fetches it live"""
+    
+    def to_representation(self, instance):
+        return serializers.ModelSerializer.to_representation(self, instance)
+
+class VideoListFilterSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=LinkedInVideo.STATUS_CHOICES, required=False)
+    hashtag = serializers.CharField(required=False, help_text="Hashtag name, with or without the leading #")
+    author = serializers.CharField(required=False, help_text="Author username or name")
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+class VideoSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(help_text="Words to search for in titles, descriptions, post text and hashtags")
+    status = serializers.ChoiceField(choices=LinkedInVideo.STATUS_CHOICES, required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    limit = serializers.IntegerField(required=False, default=20, min_value=1, max_value=100)
+    offset = serializers.IntegerField(required=False, default=0, min_value=0)
+
 class LinkedInVideoCreateSerializer(serializers.ModelSerializer):
     linkedin_email = serializers.CharField(required=False, allow_blank=True, write_only=True)
     linkedin_password = serializers.CharField(required=False, allow_blank=True, write_only=True)
     
     class Meta:
         model = LinkedInVideo
-        fields = ['post_url', 'linkedin_email', 'linkedin_password']
+        fields = ['post_url', 'linkedin_email', 'linkedin_password', 'quality_policy', 'priority', 'is_tracked']
+        extra_kwargs = {'quality_policy': {'validators': [validate_quality_policy]}}
     
     def validate_post_url(self, value):
         """Validate that the URL is a LinkedIn post URL"""
@@ -85,13 +140,29 @@ class LinkedInVideoCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("URL must be a valid LinkedIn post URL")
         return value
 
+class EngagementSnapshotSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EngagementSnapshot
+        fields = ['captured_at', 'num_likes', 'num_comments']
+
+class EngagementTrackingSerializer(serializers.Serializer):
+    is_tracked = serializers.BooleanField(help_text="Refresh the likes and comments of the post periodically")
+
 class VideoDownloadURLSerializer(serializers.Serializer):
     url = serializers.URLField(required=True, help_text="LinkedIn post URL containing a video")
     email = serializers.EmailField(required=False, allow_blank=True, help_text="LinkedIn account email for accessing private content")
     password = serializers.CharField(required=False, allow_blank=True, help_text="LinkedIn account password")
+    run_async = serializers.BooleanField(required=False, default=False, help_text="Return a job handle immediately and resolve the URL in the background")
+    quality_policy = serializers.CharField(
+        required=False, allow_blank=True, validators=[validate_quality_policy],
+        help_text="Rendition to return: highest, lowest, max_height:<px> or max_bytes:<n>"
+    )
     
     def validate_url(self, value):
         """Validate that the URL is a LinkedIn post URL"""
         if 'linkedin.com/posts/' not in value:
             raise serializers.ValidationError("URL must be a valid LinkedIn post URL")
-        return value
\ No newline at end of file
+        return value
+
+class LinkPreviewQuerySerializer(serializers.Serializer):
+    url = serializers.CharField(max_length=2000, help_text="Page to preview, with or without http(s)://")
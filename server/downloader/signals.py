@@ -0,0 +1,86 @@
+import functools
+import threading
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import LinkedInVideo, VideoMetadata, HashTag
+from .utils.search import index_video
+
+# Fields whose changes have to reach the full-text index
+VIDEO_SEARCH_FIELDS = {'title', 'description'}
+METADATA_SEARCH_FIELDS = {'post_text'}
+
+
+# Videos with a reindex waiting for the current transaction, per thread
+_pending_reindex = threading.local()
+
+
+def _pending_video_ids():
+    if not hasattr(_pending_reindex, 'video_ids'):
+        _pending_reindex.video_ids = set()
+    return _pending_reindex.video_ids
+
+
+def _run_reindex(video_id):
+    # Several writes to the same video in one transaction only need one refresh:
+    # the first callback to run indexes the committed state, the others find the ID gone
+    video_ids = _pending_video_ids()
+    if video_id in video_ids:
+        video_ids.discard(video_id)
+        index_video(video_id)
+
+
+def schedule_reindex(video_id):
+    """Refresh the search document once the current transaction commits"""
+    # Every write registers its own callback, so Django still drops exactly the
+    # callbacks of rolled-back savepoints. An ID left behind by a rolled-back
+    # transaction is only reindexed once more, the next time the video is written.
+    _pending_video_ids().add(video_id)
+    transaction.on_commit(functools.partial(_run_reindex, video_id))
+
+
+@receiver(post_save, sender=LinkedInVideo)
+def reindex_video(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or VIDEO_SEARCH_FIELDS & set(update_fields):
+        schedule_reindex(instance.id)
+
+
+@receiver(post_save, sender=VideoMetadata)
+def reindex_video_metadata(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or METADATA_SEARCH_FIELDS & set(update_fields):
+        schedule_reindex(instance.video_id)
+
+
+@receiver(m2m_changed, sender=HashTag.videos.through)
+def reindex_video_hashtags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        # video.hashtags.add(...): the instance is the video
+        schedule_reindex(instance.id)
+    elif pk_set:
+        for video_id in pk_set:
+            schedule_reindex(video_id)
+    else:
+        # hashtag.videos.clear() does not report which videos were affected
+        for video_id in instance.videos.values_list('id', flat=True):
+            schedule_reindex(video_id)
+
+
+@receiver(post_delete, sender=LinkedInVideo)
+def remove_video_from_index(sender, instance, **kwargs):
+    schedule_reindex(instance.id)
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS so concurrent web and Celery writers don't trip over the lock"""
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
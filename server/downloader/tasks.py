@@ -1,154 +1,555 @@
 import os
+import uuid
+import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
 from celery import shared_task
+from celery.exceptions import Retry
+from django.core.cache import cache
+from django.core.files import File
 from django.utils import timezone
-from django.core.files.base import ContentFile
-from .models import LinkedInVideo, VideoMetadata, HashTag
+from .models import LinkedInVideo
+from .utils.engagement_refresh import refresh_tracked_engagement as run_engagement_refresh
+from .utils.failures import CircuitOpenError, JobFailure, classify_failure, failure_from, linkedin_breaker, retry_delay
+from .utils.job_credentials import take_job_credentials
 from .utils.linkedin_downloader import LinkedInDownloader
 from .utils.metadata_extractor import MetadataExtractor
+from .utils.metrics import stage_timer
+from .utils.media_processing import (
+    MediaToolError, extract_poster, hls_file_name, needs_faststart, package_hls as package_hls_files,
+    probe_video, remux_faststart
+)
+from .utils.page_snapshots import capture_page
+from .utils.persistence import VideoJobRecorder
+from .utils.retention import apply_retention_policies as run_retention_policies
+from .utils.scheduling import DEFERRED_PRIORITIES, dispatch_capacity, download_queue, fair_share_batch
+from .utils.video_resolver import resolve_video_url, BrowserInitError
 import logging
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
-@shared_task
-def download_linkedin_video(video_id):
+def process_video(recorder, downloader=None):
     """
-    Background task to download a LinkedIn video and extract metadata
+    Scrape, download and store one LinkedIn video, the work of download_linkedin_video
+    
+    Buffered metadata is written as the job goes; the caller records a failure with
+    recorder.fail() or recorder.defer(), which keeps what was gathered before it.
     
     Args:
-        video_id: UUID of the LinkedInVideo object
+        recorder: VideoJobRecorder of the video, already marked processing
+        downloader: LinkedInDownloader to reuse, e.g. one browser per bulk worker;
+            left open afterwards. By default a browser is launched and closed.
+    
+    Raises:
+        Exception: Why the job failed, a JobFailure where the cause is known
     """
-    try:
-        # Get the video object
-        video_obj = LinkedInVideo.objects.get(id=video_id)
-        
-        # Update status to processing
-        video_obj.status = 'processing'
-        video_obj.save(update_fields=['status'])
-        
-        # Initialize downloader and metadata extractor
+    video_obj = recorder.video
+    owns_downloader = downloader is None
+    if owns_downloader:
         downloader = LinkedInDownloader(headless=True, timeout=15)
-        extractor = MetadataExtractor()
-        
+    extractor = MetadataExtractor()
+    temp_path = None
+    
+    # Runs the HTTP metadata fetch and the video download next to the browser
+    # and database work of this thread; neither touches the database
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix=f"job-{video_obj.id}")
+    
+    with stage_timer('job') as job_stage:
         try:
-            # Extract URL metadata first
-            url_metadata = extractor.extract_url_metadata(video_obj.post_url)
-            
-            # Update basic metadata fields
-            if 'title' in url_metadata:
-                video_obj.title = url_metadata.get('title')
-            if 'description' in url_metadata:
-                video_obj.description = url_metadata.get('description')
-            video_obj.extracted_at = timezone.now()
-            video_obj.save(update_fields=['title', 'description', 'extracted_at'])
-            
-            # Create basic metadata object right away so frontend can access it
-            metadata_obj, created = VideoMetadata.objects.get_or_create(video=video_obj)
-            
-            # Add open graph and twitter card data
-            if 'open_graph' in url_metadata:
-                metadata_obj.open_graph = url_metadata['open_graph']
-            if 'twitter_card' in url_metadata:
-                metadata_obj.twitter_card = url_metadata['twitter_card']
-            metadata_obj.save()
+            # Fetch the URL metadata while Chrome starts
+            url_metadata_future = pool.submit(
+                _run_stage, 'url_metadata', extractor.extract_url_metadata, video_obj.post_url
+            )
             
             # Setup the browser
-            if not downloader.setup_driver():
-                raise Exception("Failed to initialize WebDriver")
+            if not downloader.driver:
+                with stage_timer('browser_launch') as stage:
+                    if not downloader.setup_driver():
+                        stage.fail('driver_init')
+                        error = downloader.last_error
+                        raise JobFailure(f"Failed to initialize WebDriver: {error}", 'driver_init', transient=True)
             
             # Login if credentials provided
             if video_obj.linkedin_email and video_obj.linkedin_password:
-                login_success = downloader.login_to_linkedin(
-                    video_obj.linkedin_email, video_obj.linkedin_password
+                with stage_timer('login') as stage:
+                    login_success = downloader.login_to_linkedin(
+                        video_obj.linkedin_email, video_obj.linkedin_password
+                    )
+                    if not login_success:
+                        stage.fail('login_rejected')
+                        logger.warning(f"LinkedIn login failed for video {video_obj.id}")
+            
+            # Load the post and extract the URL of the rendition the request asked for
+            with stage_timer('page_ready') as stage:
+                video_url = downloader.extract_video_url(
+                    video_obj.post_url, video_obj.quality_policy or settings.VIDEO_QUALITY_POLICY
                 )
-                if not login_success:
-                    logger.warning(f"LinkedIn login failed for video {video_id}")
+                if not video_url:
+                    stage.fail('no_video')
             
-            # Extract post metadata
-            post_metadata = extractor.extract_post_metadata(downloader.driver, video_obj.post_url)
+            # Scrape post metadata from the page that is already loaded
+            with stage_timer('post_metadata'):
+                post_metadata = extractor.extract_post_metadata(downloader.driver, video_obj.post_url)
+            recorder.add_post_metadata(post_metadata, scraped_at=timezone.now())
             
-            # Extract video URL
-            video_url = downloader.extract_video_url(video_obj.post_url)
+            # Keep the rendered page, so it can be re-parsed offline when the selectors change
+            if settings.PAGE_SNAPSHOTS_ENABLED:
+                with stage_timer('page_snapshot') as stage:
+                    if not capture_page(recorder, downloader.driver):
+                        stage.fail('snapshot_write')
+            recorder.add_url_metadata(url_metadata_future.result())
             
             if not video_url:
-                raise Exception("Could not extract video URL from the post")
+                # A page that timed out or errored is retried; a post without a video is not
+                raise failure_from(downloader.last_error, "Could not extract video URL from the post", 'no_video')
             
             # Extract video URL metadata
-            video_url_metadata = extractor.extract_video_metadata(video_url)
+            recorder.add_video_url_metadata(extractor.extract_video_metadata(video_url))
             
-            # Download the video to a temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_file:
-                temp_path = temp_file.name
+            video_filename = f"linkedin_video_{video_obj.id}.mp4"
+            storage = video_obj.video_file.storage
             
-            # Download the actual video
-            download_success, file_size_mb = downloader.download_video(video_url, temp_path)
+            # Start the download, then write the metadata while it runs
+            if getattr(storage, 'supports_streaming_upload', False):
+                # Upload to object storage in parallel parts while the download runs
+                storage_name = video_obj.video_file.field.generate_filename(video_obj, video_filename)
+                download_future = pool.submit(_download_to_storage, downloader, video_url, storage, storage_name)
+            else:
+                # Download the video to a temporary file
+                storage_name = None
+                temp_path = _temp_file_path('.mp4')
+                download_future = pool.submit(_download_to_file, downloader, video_url, temp_path)
             
-            if not download_success:
-                raise Exception("Failed to download video")
-            
-            # Save the video file to the model
-            with open(temp_path, 'rb') as f:
-                video_filename = f"linkedin_video_{video_id}.mp4"
-                video_obj.video_file.save(video_filename, ContentFile(f.read()), save=False)
-            
-            # Update file size
-            video_obj.file_size = file_size_mb
-            
-            # Save all metadata to VideoMetadata model
-            metadata_obj, created = VideoMetadata.objects.get_or_create(video=video_obj)
-            
-            # Update with post metadata
-            for key, value in post_metadata.items():
-                if key != 'hashtags' and hasattr(metadata_obj, key):
-                    setattr(metadata_obj, key, value)
-            
-            # Update with video URL metadata
-            for key, value in video_url_metadata.items():
-                if hasattr(metadata_obj, key):
-                    setattr(metadata_obj, key, value)
-            
-            # Save open graph and twitter card data
-            if 'open_graph' in url_metadata:
-                metadata_obj.open_graph = url_metadata['open_graph']
-            if 'twitter_card' in url_metadata:
-                metadata_obj.twitter_card = url_metadata['twitter_card']
-            
-            # Save the metadata
-            metadata_obj.save()
-            
-            # Process hashtags
-            if 'hashtags' in post_metadata and post_metadata['hashtags']:
-                for tag_name in post_metadata['hashtags']:
-                    hashtag, _ = HashTag.objects.get_or_create(name=tag_name)
-                    video_obj.hashtags.add(hashtag)
-            
-            # Update status to completed
-            video_obj.status = 'completed'
-            video_obj.save()
-            
-            # Delete temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-                
-            logger.info(f"Successfully processed LinkedIn video {video_id}")
-            return True
+            with stage_timer('metadata_write'):
+                recorder.flush()
+            
+            file_size_mb = download_future.result()
+            if storage_name:
+                recorder.attach_stored_file(storage_name, file_size_mb)
+            else:
+                recorder.attach_file(temp_path, video_filename, file_size_mb)
+            
+            # Save the file and completed status together, clearing the error of a failed attempt
+            with stage_timer('db_write'):
+                recorder.flush(status='completed', error_message='' if video_obj.error_message else None)
+            
+            linkedin_breaker.record_success()
             
         except Exception as e:
-            logger.error(f"Error processing video {video_id}: {e}")
-            video_obj.status = 'failed'
-            video_obj.error_message = str(e)
-            video_obj.save(update_fields=['status', 'error_message'])
-            return False
+            failure = classify_failure(e)
+            job_stage.fail(failure.reason)
+            if failure.counts_against_linkedin:
+                linkedin_breaker.record_failure()
+            raise
             
         finally:
-            # Always close the browser
-            downloader.close()
+            # Always close our browser, wait for the download and delete the temporary file
+            if owns_downloader:
+                downloader.close()
+            pool.shutdown(wait=True, cancel_futures=True)
+            if temp_path and os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+
+@shared_task(bind=True)
+def download_linkedin_video(self, video_id):
+    """
+    Background task to download a LinkedIn video and extract metadata
+    
+    Transient failures (timeouts, rate limiting, server errors) are retried with
+    exponential backoff up to DOWNLOAD_MAX_ATTEMPTS attempts. While the LinkedIn
+    circuit breaker is open the job is put back without launching a browser.
+    
+    Args:
+        video_id: UUID of the LinkedInVideo object
+    """
+    try:
+        # Get the video object
+        video_obj = LinkedInVideo.objects.get(id=video_id)
+        
+        # Wait out a LinkedIn outage instead of spending an attempt on it
+        breaker_wait = linkedin_breaker.retry_after()
+        if breaker_wait:
+            logger.warning(f"LinkedIn circuit is open, postponing video {video_id} by {breaker_wait:.0f}s")
+            raise self.retry(countdown=breaker_wait + retry_delay(1), max_retries=None)
+        
+        # Status changes are written immediately, everything else is buffered
+        # and written in one transaction at the end
+        recorder = VideoJobRecorder(video_obj)
+        recorder.mark_processing()
+        
+        try:
+            process_video(recorder)
+        except Exception as e:
+            failure = classify_failure(e)
+            if not failure.transient or video_obj.attempts >= settings.DOWNLOAD_MAX_ATTEMPTS:
+                logger.error(f"Error processing video {video_id} ({failure.reason}): {e}")
+                recorder.fail(str(e))
+                return False
+            
+            retry_in = retry_delay(video_obj.attempts, failure.retry_after)
+            logger.warning(
+                f"Attempt {video_obj.attempts} of video {video_id} failed ({failure.reason}), "
+                f"retrying in {retry_in:.0f}s: {e}"
+            )
+            recorder.defer(f"{e} (attempt {video_obj.attempts} failed, retrying)")
+            
+            # Retry with the same arguments on the same queue
+            raise self.retry(countdown=retry_in, max_retries=None)
+        
+        if settings.VIDEO_POSTPROCESS_ENABLED:
+            postprocess_video.delay(str(video_id))
+            
+        logger.info(f"Successfully processed LinkedIn video {video_id}")
+        return True
     
+    except Retry:
+        raise
     except LinkedInVideo.DoesNotExist:
         logger.error(f"LinkedInVideo with id {video_id} does not exist")
         return False
     except Exception as e:
         logger.error(f"Unexpected error in download_linkedin_video task: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+@shared_task
+def resolve_video_download_url(post_url, quality_policy='highest', credentials_token=None):
+    """
+    Background task to resolve the direct download URL of a LinkedIn post video
+
+    Task arguments end up in the broker, the result backend and worker logs, so
+    they never carry credentials: a logged-in resolution gets the token of
+    credentials the web tier stored with store_job_credentials.
+
+    Args:
+        post_url: LinkedIn post URL
+        quality_policy: Which rendition to return
+        credentials_token: Optional token of the LinkedIn credentials to log in with
+
+    Returns:
+        dict: The downloadable URL, or an error message
+    """
+    linkedin_email = linkedin_password = ''
+    if credentials_token:
+        credentials = take_job_credentials(credentials_token)
+        if not credentials:
+            logger.error(f"Credentials of the URL job for {post_url} expired before it ran")
+            return {"error": "The LinkedIn credentials of this job expired before it ran", "post_url": post_url}
+        linkedin_email, linkedin_password = credentials['email'], credentials['password']
+
+    try:
+        video_url, cached = resolve_video_url(post_url, linkedin_email, linkedin_password, quality_policy)
+    except (BrowserInitError, CircuitOpenError, JobFailure) as e:
+        logger.error(f"Could not resolve video URL for {post_url}: {e}")
+        return {"error": str(e), "post_url": post_url}
+
+    if not video_url:
+        return {
+            "error": "Could not extract video URL from the post. The post might not contain a video or might require login.",
+            "post_url": post_url
+        }
+
+    return {
+        "downloadable_url": video_url,
+        "post_url": post_url,
+        "cached": cached
+    }
+
+
+
+def enqueue_download(video_obj):
+    """
+    Send a download to the Celery queue of its priority class
+    
+    Args:
+        video_obj: LinkedInVideo whose queued_at is already set
+    """
+    return download_linkedin_video.apply_async(args=[str(video_obj.id)], queue=download_queue(video_obj.priority))
+
+
+DISPATCH_LOCK_KEY = 'downloader:dispatch-pending-downloads'
+
+
+@shared_task
+def dispatch_pending_downloads():
+    """
+    Periodic task that releases waiting bulk and background downloads to their queues
+    
+    Each class gets at most DOWNLOAD_DISPATCH_WINDOW downloads queued or running at
+    once, picked round-robin between submitting clients, so the queue never holds a
+    backlog that later clients would have to wait behind.
+    
+    Returns:
+        dict: Number of downloads dispatched per priority class
+    """
+    # Beat may fire again before a slow run finishes
+    if not cache.add(DISPATCH_LOCK_KEY, 1, timeout=60):
+        return {}
+    
+    dispatched = {}
+    try:
+        for priority in DEFERRED_PRIORITIES:
+            dispatched[priority] = 0
+            for video_obj in fair_share_batch(priority, dispatch_capacity(priority)):
+                # Claim the row, so a download is never queued twice
+                claimed = LinkedInVideo.objects.filter(id=video_obj.id, queued_at__isnull=True).update(
+                    queued_at=timezone.now()
+                )
+                if not claimed:
+                    continue
+                try:
+                    enqueue_download(video_obj)
+                except Exception as e:
+                    logger.error(f"Could not queue download {video_obj.id}: {e}")
+                    LinkedInVideo.objects.filter(id=video_obj.id).update(queued_at=None)
+                    return dispatched
+                dispatched[priority] += 1
+    finally:
+        cache.delete(DISPATCH_LOCK_KEY)
+    
+    if any(dispatched.values()):
+        logger.info(f"Dispatched pending downloads: {dispatched}")
+    return dispatched
+
+
+ENGAGEMENT_REFRESH_LOCK_KEY = 'downloader:refresh-tracked-engagement'
+
+
+@shared_task
+def refresh_tracked_engagement():
+    """
+    Periodic task that refreshes the likes and comments of tracked posts in one browser session
+    
+    Runs on the background queue, and never downloads video.
+    
+    Returns:
+        dict: Number of posts refreshed, changed and failed
+    """
+    # A batch of page loads can outlast the beat interval
+    if not cache.add(ENGAGEMENT_REFRESH_LOCK_KEY, 1, timeout=settings.ENGAGEMENT_REFRESH_BATCH * 60):
+        return {}
+    try:
+        return run_engagement_refresh()
+    finally:
+        cache.delete(ENGAGEMENT_REFRESH_LOCK_KEY)
+
+
+@shared_task
+def apply_retention_policies():
+    """
+    Periodic task that evicts stale video files and purges old rows according to VIDEO_RETENTION
+    
+    Returns:
+        dict: Number of files and rows affected per policy
+    """
+    return run_retention_policies()
+
+
+
+def _run_stage(stage, func, *args):
+    """Call func inside a stage timer, for work submitted to a thread"""
+    with stage_timer(stage):
+        return func(*args)
+
+
+def _download_to_file(downloader, video_url, path):
+    """
+    Download the video to a local file, timed as the download stage
+
+    Returns:
+        float: File size in MB
+    """
+    with stage_timer('download') as stage:
+        download_success, file_size_mb = downloader.download_video(video_url, path)
+        if not download_success:
+            stage.fail('download_error')
+            raise failure_from(downloader.last_error, "Failed to download video", 'download_error')
+        return file_size_mb
+
+
+def _download_to_storage(downloader, video_url, storage, name):
+    """
+    Stream the video into a storage backend that supports streaming uploads, timed as the download stage
+
+    Returns:
+        float: File size in MB
+    """
+    with stage_timer('download') as stage:
+        with storage.open_upload(name) as upload:
+            download_success, file_size_mb = downloader.download_video_to_stream(video_url, upload)
+            if not download_success:
+                stage.fail('download_error')
+                raise failure_from(downloader.last_error, "Failed to download video", 'download_error')
+        return file_size_mb
+
+
+def _temp_file_path(suffix):
+    """Create an empty file in VIDEO_TEMP_DIR, where the retention task can find it if it is left behind"""
+    os.makedirs(settings.VIDEO_TEMP_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=settings.VIDEO_TEMP_DIR) as temp_file:
+        return temp_file.name
+
+
+@shared_task
+def postprocess_video(video_id):
+    """
+    Background task that remuxes a downloaded video for fast start and extracts
+    a poster frame, its duration and its resolution
+    
+    Runs on the media queue, so ffmpeg work is spread over that worker's process
+    pool without holding up downloads. Streams are copied, never re-encoded.
+    
+    Args:
+        video_id: UUID of the LinkedInVideo object
+    
+    Returns:
+        bool: Success status
+    """
+    try:
+        video_obj = LinkedInVideo.objects.get(id=video_id)
+    except LinkedInVideo.DoesNotExist:
+        logger.error(f"LinkedInVideo with id {video_id} does not exist")
+        return False
+    
+    if not video_obj.video_file:
+        logger.warning(f"Video {video_id} has no file to post-process")
+        return False
+    
+    storage = video_obj.video_file.storage
+    recorder = VideoJobRecorder(video_obj)
+    temp_paths = []
+    
+    try:
+        try:
+            source_path = storage.path(video_obj.video_file.name)
+            is_local = True
+        except NotImplementedError:
+            # Remote storage: work on a local copy
+            source_path = _temp_file_path('.mp4')
+            temp_paths.append(source_path)
+            with storage.open(video_obj.video_file.name) as src, open(source_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            is_local = False
+        
+        with stage_timer('probe'):
+            info = probe_video(source_path)
+        
+        if needs_faststart(source_path):
+            if is_local:
+                # Remux next to the original so the swap is an atomic rename
+                remuxed_path = f"{source_path}.faststart.mp4"
+                temp_paths.append(remuxed_path)
+                with stage_timer('remux'):
+                    remux_faststart(source_path, remuxed_path)
+                os.replace(remuxed_path, source_path)
+            else:
+                remuxed_path = _temp_file_path('.mp4')
+                temp_paths.append(remuxed_path)
+                with stage_timer('remux'):
+                    remux_faststart(source_path, remuxed_path)
+                with open(remuxed_path, 'rb') as f:
+                    storage.save(video_obj.video_file.name, File(f))
+                source_path = remuxed_path
+            recorder.set_video_fields(file_size=os.path.getsize(source_path) / (1024 * 1024))
+            logger.info(f"Remuxed video {video_id} for fast start")
+        
+        poster_path = _temp_file_path('.jpg')
+        temp_paths.append(poster_path)
+        with stage_timer('poster'):
+            extract_poster(source_path, poster_path, info['duration'])
+        with open(poster_path, 'rb') as f:
+            video_obj.poster_image.save(f"{uuid.uuid4()}.jpg", File(f), save=False)
+        
+        recorder.set_video_fields(poster_image=video_obj.poster_image.name, duration=info['duration'])
+        if info['width'] and info['height']:
+            recorder.add_metadata(resolution=f"{info['width']}x{info['height']}")
+        recorder.flush()
+        
+        logger.info(f"Post-processed LinkedIn video {video_id}")
+        return True
+    
+    except (MediaToolError, OSError) as e:
+        # The download itself succeeded, so the video stays usable as it is
+        logger.error(f"Error post-processing video {video_id}: {e}")
+        return False
+    
+    finally:
+        for path in temp_paths:
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+
+def hls_lock_key(video_id):
+    return f"hls-packaging:{video_id}"
+
+
+def hls_failure_key(video_id):
+    return f"hls-failed:{video_id}"
+
+
+@shared_task
+def package_hls(video_id):
+    """
+    Background task that segments a downloaded video into HLS for adaptive playback
+    
+    Queued by the HLS endpoint on first play. The playlist and segments are saved
+    to the video storage, so any web server can serve them, the playlist last so
+    it is only visible once all of its segments are. A failure is remembered for
+    HLS_FAILURE_TTL seconds, so players get an error instead of queueing it again.
+    
+    Args:
+        video_id: UUID of the LinkedInVideo object
+    
+    Returns:
+        bool: Success status
+    """
+    temp_path = None
+    output_dir = None
+    try:
+        video_obj = LinkedInVideo.objects.get(id=video_id)
+        storage = video_obj.video_file.storage
+        if storage.exists(hls_file_name(video_obj.id, 'index.m3u8')):
+            return True
+        if not video_obj.video_file:
+            logger.warning(f"Video {video_id} has no file to package")
+            return False
+        
+        try:
+            source_path = storage.path(video_obj.video_file.name)
+        except NotImplementedError:
+            # Remote storage: segment a local copy
+            temp_path = source_path = _temp_file_path('.mp4')
+            with storage.open(video_obj.video_file.name) as src, open(source_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+        
+        os.makedirs(settings.VIDEO_TEMP_DIR, exist_ok=True)
+        output_dir = tempfile.mkdtemp(dir=settings.VIDEO_TEMP_DIR)
+        with stage_timer('hls_package'):
+            package_hls_files(source_path, output_dir)
+            for name in sorted(os.listdir(output_dir), key=lambda name: name == 'index.m3u8'):
+                stored_name = hls_file_name(video_obj.id, name)
+                # Replace what an interrupted attempt left, which save() would rename around
+                storage.delete(stored_name)
+                with open(os.path.join(output_dir, name), 'rb') as f:
+                    storage.save(stored_name, File(f))
+        logger.info(f"Packaged LinkedIn video {video_id} as HLS")
+        return True
+    
+    except LinkedInVideo.DoesNotExist:
+        logger.error(f"LinkedInVideo with id {video_id} does not exist")
+        return False
+    except Exception as e:
+        logger.error(f"Error packaging video {video_id} as HLS: {e}")
+        cache.set(hls_failure_key(video_id), True, timeout=settings.HLS_FAILURE_TTL)
+        return False
+    
+    finally:
+        cache.delete(hls_lock_key(video_id))
+        if temp_path and os.path.exists(temp_path):
+            os.unlink(temp_path)
+        if output_dir:
+            shutil.rmtree(output_dir, ignore_errors=True)
@@ -1,3 +1,1467 @@
-from django.test import TestCase
+import importlib.util
+import io
+import json
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
+import requests
+from celery.exceptions import Retry
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import OperationalError, connection, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+from .models import EngagementSnapshot, HashTag, LinkedInVideo, PageSnapshot, VideoMetadata
+from .tasks import download_linkedin_video, package_hls, postprocess_video, process_video, resolve_video_download_url
+from .utils import bulk_download, chromedriver
+from .utils.async_metadata import extract_many_url_metadata
+from .utils.bulk_download import download_post
+from .utils.chromedriver import ChromeDriverError, resolve_chromedriver
+from .utils.engagement import parse_count, parse_post_age
+from .utils.engagement_refresh import refresh_tracked_engagement
+from .utils.failures import CircuitBreaker, CircuitOpenError, JobFailure, classify_failure, failure_from, retry_delay
+from .utils.file_serving import UnsatisfiableRange, parse_range_header, serve_file
+from .utils.link_preview import PreviewURLError, _fetch_image, check_preview_url, get_link_preview
+from .utils.linkedin_downloader import LinkedInDownloader
+from .utils.linkedin_urls import canonical_post_key
+from .utils.media_processing import MediaToolError, needs_faststart
+from .utils.metadata_extractor import MetadataExtractor
+from .utils.page_snapshots import load_page, store_page
+from .utils.persistence import VideoJobRecorder
+from .utils.scheduling import fair_share_batch
+from .utils.snapshot_reextraction import reextract_snapshots
+from .utils.storage import MIN_PART_SIZE, MultipartUpload
+from .utils.video_variants import make_variant, parse_quality_policy, select_variant
 
-# Create your tests here.
+# Packages only the Celery workers that drive a browser or scrape pages need
+BROWSER_STACK_MODULES = ('selenium', 'webdriver_manager', 'bs4')
+
+# Seconds a fresh web process may spend on django.setup() and loading the URLconf
+IMPORT_TIME_BUDGET = 2.0
+
+# Boots the web tier in a clean interpreter, optionally with the browser stack uninstallable
+WEB_TIER_PROBE = """
+import json, sys, time
+
+blocked = set(sys.argv[1].split(',')) if sys.argv[1] else set()
+
+class BlockBrowserStack:
+    def find_spec(self, name, path=None, target=None):
+        if name.split('.')[0] in blocked:
+            raise ImportError(f"{name} is not installed")
+
+sys.meta_path.insert(0, BlockBrowserStack())
+
+start = time.perf_counter()
+import django
+django.setup()
+import linkedin_api.urls
+import linkedin_api.wsgi
+elapsed = time.perf_counter() - start
+
+from django.core.management import call_command
+call_command('check', verbosity=0)
+
+print(json.dumps({
+    'elapsed': elapsed,
+    'loaded': sorted({name.split('.')[0] for name in sys.modules}),
+}))
+"""
+
+
+class WebTierImportTests(SimpleTestCase):
+    """The web tier must boot quickly, without the Selenium and scraping stack"""
+
+    def run_probe(self, blocked=()):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'linkedin_api.settings'}
+        result = subprocess.run(
+            [sys.executable, '-c', WEB_TIER_PROBE, ','.join(blocked)],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=60
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_browser_stack_not_imported(self):
+        loaded = self.run_probe()['loaded']
+        for module in BROWSER_STACK_MODULES:
+            self.assertNotIn(module, loaded, f"{module} is imported when the web tier starts")
+
+    def test_import_time_budget(self):
+        elapsed = self.run_probe()['elapsed']
+        self.assertLess(elapsed, IMPORT_TIME_BUDGET, f"Web tier took {elapsed:.2f}s to import")
+
+    def test_boots_without_browser_stack(self):
+        self.run_probe(blocked=BROWSER_STACK_MODULES)
+
+
+class VideoDownloadURLJobTests(SimpleTestCase):
+    """Queued URL jobs, which never carry LinkedIn credentials in their arguments"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def post(self, **data):
+        data = {'url': 'https://www.linkedin.com/posts/a', 'run_async': True, **data}
+        with mock.patch('downloader.views.resolve_video_download_url') as task:
+            task.delay.return_value.id = 'job-1'
+            response = self.client.post(reverse('video-download-url'), data, content_type='application/json')
+        return response, task
+
+    def test_logged_in_job_is_queued_with_a_credentials_token(self):
+        response, task = self.post(email='user@example.com', password='secret')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['job_id'], 'job-1')
+        post_url, quality_policy, token = task.delay.call_args.args
+        self.assertNotIn('secret', json.dumps(task.delay.call_args.args))
+
+        with mock.patch('downloader.tasks.resolve_video_url', return_value=('https://cdn.example.com/v.mp4', False)) as resolve:
+            result = resolve_video_download_url(post_url, quality_policy, token)
+        resolve.assert_called_once_with(post_url, 'user@example.com', 'secret', quality_policy)
+        self.assertEqual(result['downloadable_url'], 'https://cdn.example.com/v.mp4')
+
+        # The credentials are read once
+        with mock.patch('downloader.tasks.resolve_video_url') as resolve, self.assertLogs('downloader.tasks', 'ERROR'):
+            result = resolve_video_download_url(post_url, quality_policy, token)
+        resolve.assert_not_called()
+        self.assertIn('expired', result['error'])
+
+    def test_anonymous_job_is_queued_without_credentials(self):
+        response, task = self.post()
+        self.assertEqual(response.status_code, 202)
+        task.delay.assert_called_once_with('https://www.linkedin.com/posts/a', settings.VIDEO_QUALITY_POLICY, None)
+
+
+class HealthCheckTests(TestCase):
+    """The health check reports the database state without exposing the error"""
+
+    def test_reachable_database(self):
+        response = self.client.get(reverse('health'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok', 'database': connection.vendor})
+
+    def test_database_error_is_logged_not_returned(self):
+        error = OperationalError('could not connect to server at "db.internal" as user "app"')
+        with mock.patch('downloader.views.connection.cursor', side_effect=error), \
+                self.assertLogs('downloader.views', 'ERROR') as logs, \
+                self.assertLogs('django.request', 'ERROR'):
+            response = self.client.get(reverse('health'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'status': 'unavailable', 'database': 'database unavailable'})
+        self.assertNotIn('db.internal', response.content.decode())
+        self.assertIn('db.internal', logs.output[0])
+
+
+class VideoListTests(TestCase):
+    """The list endpoint loads a page in a fixed number of queries and pages stably on a cursor"""
+
+    def setUp(self):
+        tag = HashTag.objects.create(name='video')
+        self.videos = []
+        for n in range(5):
+            video = LinkedInVideo.objects.create(post_url=f'https://www.linkedin.com/posts/a-activity-{n}')
+            VideoMetadata.objects.create(video=video, author_name=f'Author {n}')
+            tag.videos.add(video)
+            self.videos.append(video)
+
+    def get(self, url=None, **params):
+        response = self.client.get(url or reverse('video-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        # The page, then the hashtags of all of its videos
+        with self.assertNumQueries(2):
+            body = self.get(page_size=5)
+        self.assertEqual(len(body['results']), 5)
+        self.assertEqual(body['results'][0]['hashtags'][0]['name'], 'video')
+        with self.assertNumQueries(2):
+            self.get(page_size=1)
+
+    def test_cursor_walks_pages_across_ties(self):
+        # Imports create many videos within the same instant
+        LinkedInVideo.objects.update(created_at=datetime(2026, 1, 1, tzinfo=timezone.utc))
+        newest = LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/b-activity-9')
+
+        seen = []
+        body = self.get(page_size=2)
+        while True:
+            seen.extend(result['id'] for result in body['results'])
+            if not body['next']:
+                break
+            body = self.get(body['next'])
+
+        self.assertEqual(seen[0], str(newest.id))
+        self.assertCountEqual(seen, [str(video.id) for video in [newest, *self.videos]])
+
+
+class PostKeyTests(TestCase):
+    """Every spelling of a post URL maps to one indexed post_key, also for rows from before the field"""
+
+    def test_spellings_of_a_post_share_a_key(self):
+        same_post = [
+            'https://www.linkedin.com/posts/jane_title-activity-7313868802440495105-SMwB',
+            'https://linkedin.com/posts/jane_title-activity-7313868802440495105-SMwB/?utm_source=share',
+            'https://www.linkedin.com/feed/update/urn:li:activity:7313868802440495105/',
+            'https://www.linkedin.com/feed/update/urn%3Ali%3Aactivity%3A7313868802440495105',
+        ]
+        self.assertEqual({canonical_post_key(url) for url in same_post}, {'activity:7313868802440495105'})
+        self.assertNotEqual(
+            canonical_post_key('https://www.linkedin.com/posts/jane_title-activity-7313868802440495106-SMwB'),
+            canonical_post_key(same_post[0])
+        )
+        # Without a post ID the normalized URL is hashed
+        self.assertEqual(
+            canonical_post_key('https://linkedin.com/posts/jane_title/?trk=feed'),
+            canonical_post_key('https://www.linkedin.com/posts/jane_title')
+        )
+
+    def test_save_keeps_the_key_in_sync(self):
+        video = LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/a-activity-1111111111111')
+        self.assertEqual(video.post_key, 'activity:1111111111111')
+        video.post_url = 'https://www.linkedin.com/posts/a-activity-2222222222222'
+        video.save(update_fields=['post_url'])
+        video.refresh_from_db()
+        self.assertEqual(video.post_key, 'activity:2222222222222')
+
+    def test_migration_backfills_existing_rows(self):
+        urls = [
+            'https://www.linkedin.com/posts/a-activity-1111111111111',
+            'https://www.linkedin.com/feed/update/urn:li:ugcPost:3333333333333/',
+            'https://www.linkedin.com/posts/no_id_here/',
+        ]
+        for url in urls:
+            LinkedInVideo.objects.create(post_url=url)
+        LinkedInVideo.objects.update(post_key='')
+
+        migration = importlib.import_module('downloader.migrations.0002_linkedinvideo_post_key_indexes')
+        migration.backfill_post_keys(django_apps, None)
+
+        self.assertEqual(
+            dict(LinkedInVideo.objects.values_list('post_url', 'post_key')),
+            {url: canonical_post_key(url) for url in urls}
+        )
+
+
+class RangeHeaderTests(SimpleTestCase):
+    """parse_range_header on a 1000 byte file"""
+
+    def test_satisfiable_ranges(self):
+        cases = [
+            ('bytes=0-99', (0, 99)),
+            ('bytes=100-', (100, 999)),
+            ('bytes=-100', (900, 999)),
+            ('bytes=-5000', (0, 999)),
+            ('bytes=990-2000', (990, 999)),
+            (' bytes=5-5 ', (5, 5)),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(parse_range_header(header, 1000), expected)
+
+    def test_full_file_fallbacks(self):
+        # Missing, malformed and multi-range headers get the whole file
+        for header in (None, '', 'bytes=-', 'items=0-99', 'bytes=0-99,200-299', 'bytes=a-b'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range_header(header, 1000))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=1000-', 'bytes=1000-1005', 'bytes=50-10', 'bytes=-0'):
+            with self.subTest(header=header):
+                with self.assertRaises(UnsatisfiableRange):
+                    parse_range_header(header, 1000)
+
+
+@override_settings(VIDEO_SERVE_MODE='direct')
+class ServeFileTests(SimpleTestCase):
+    """Status codes, headers and bodies of serve_file for range and If-Range requests"""
+
+    def setUp(self):
+        self.content = bytes(range(256)) * 4
+        fd, self.path = tempfile.mkstemp(suffix='.mp4')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.content)
+        self.addCleanup(os.unlink, self.path)
+        self.factory = RequestFactory()
+
+    def serve(self, **headers):
+        response = serve_file(self.factory.get('/video', headers=headers), self.path, 'video.mp4')
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_whole_file(self):
+        response, body = self.serve()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], '1024')
+        self.assertEqual(body, self.content)
+
+    def test_suffix_range(self):
+        response, body = self.serve(Range='bytes=-24')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 1000-1023/1024')
+        self.assertEqual(response['Content-Length'], '24')
+        self.assertEqual(body, self.content[-24:])
+
+    def test_open_ended_range(self):
+        response, body = self.serve(Range='bytes=1000-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 1000-1023/1024')
+        self.assertEqual(body, self.content[1000:])
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.serve(Range='bytes=2048-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_multiple_ranges_get_whole_file(self):
+        response, body = self.serve(Range='bytes=0-9,20-29')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Range', response)
+        self.assertEqual(body, self.content)
+
+    def test_if_range_matching_etag(self):
+        etag = self.serve()[0]['ETag']
+        response, body = self.serve(Range='bytes=0-9', **{'If-Range': etag})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.content[:10])
+
+    def test_if_range_etag_mismatch_gets_whole_file(self):
+        response, body = self.serve(Range='bytes=0-9', **{'If-Range': '"stale-etag"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Range', response)
+        self.assertEqual(body, self.content)
+
+    def test_if_range_date(self):
+        last_modified = self.serve()[0]['Last-Modified']
+        response, _ = self.serve(Range='bytes=0-9', **{'If-Range': last_modified})
+        self.assertEqual(response.status_code, 206)
+        response, _ = self.serve(Range='bytes=0-9', **{'If-Range': http_date(0)})
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_none_match(self):
+        etag = self.serve()[0]['ETag']
+        response, _ = self.serve(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+
+def mp4_atoms(*atom_types):
+    """Bytes of an MP4 made of empty top-level atoms, in the given order"""
+    return b''.join(struct.pack('>I4s', 16, atom_type.encode()) + bytes(8) for atom_type in atom_types)
+
+
+class FaststartTests(TestCase):
+    """Post-processing moves the moov atom to the front, without touching files that already start fast"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=media_root, VIDEO_TEMP_DIR=os.path.join(media_root, 'tmp'), VIDEO_STORAGE_BACKEND='filesystem'
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_needs_faststart(self):
+        cases = [
+            (('ftyp', 'mdat', 'moov'), True),
+            (('ftyp', 'moov', 'mdat'), False),
+            (('ftyp', 'mdat'), False),
+        ]
+        for atoms, expected in cases:
+            with self.subTest(atoms=atoms), tempfile.NamedTemporaryFile(suffix='.mp4') as f:
+                f.write(mp4_atoms(*atoms))
+                f.flush()
+                self.assertEqual(needs_faststart(f.name), expected)
+
+    def postprocess(self, content):
+        video = LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/a', status='completed')
+        video.video_file.save('video.mp4', ContentFile(content))
+
+        def remux(source_path, output_path):
+            with open(output_path, 'wb') as f:
+                f.write(mp4_atoms('ftyp', 'moov', 'mdat'))
+
+        def poster(source_path, output_path, duration=None):
+            with open(output_path, 'wb') as f:
+                f.write(b'jpeg')
+
+        with mock.patch('downloader.tasks.probe_video', return_value={'duration': 12.5, 'width': 1280, 'height': 720}), \
+                mock.patch('downloader.tasks.remux_faststart', side_effect=remux) as remux_faststart, \
+                mock.patch('downloader.tasks.extract_poster', side_effect=poster), \
+                self.assertLogs('downloader.tasks', 'INFO'):
+            self.assertTrue(postprocess_video(str(video.id)))
+        video.refresh_from_db()
+        return video, remux_faststart
+
+    def test_slow_start_file_is_remuxed_in_place(self):
+        video, remux_faststart = self.postprocess(mp4_atoms('ftyp', 'mdat', 'moov'))
+        remux_faststart.assert_called_once()
+        self.assertFalse(needs_faststart(video.video_file.path))
+        self.assertEqual((video.duration, video.metadata.resolution), (12.5, '1280x720'))
+        self.assertTrue(video.poster_image)
+        self.assertEqual(os.listdir(settings.VIDEO_TEMP_DIR), [])
+
+    def test_fast_start_file_is_left_alone(self):
+        content = mp4_atoms('ftyp', 'moov', 'mdat')
+        video, remux_faststart = self.postprocess(content)
+        remux_faststart.assert_not_called()
+        with video.video_file.open('rb') as f:
+            self.assertEqual(f.read(), content)
+
+
+def write_hls_files(source_path, output_dir):
+    """package_hls stand-in writing a one-segment playlist"""
+    with open(os.path.join(output_dir, 'segment_00000.ts'), 'wb') as f:
+        f.write(b'segment')
+    with open(os.path.join(output_dir, 'index.m3u8'), 'w') as f:
+        f.write("#EXTM3U\n#EXTINF:6.0,\nsegment_00000.ts\n#EXT-X-ENDLIST\n")
+
+
+class HLSPackagingTests(TestCase):
+    """HLS files go through the video storage, and a failed packaging is reported instead of re-queued"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(
+            HLS_ENABLED=True, MEDIA_ROOT=media_root, VIDEO_TEMP_DIR=os.path.join(media_root, 'tmp'),
+            VIDEO_STORAGE_BACKEND='filesystem', VIDEO_SERVE_MODE='direct'
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.video = LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/a', status='completed')
+        self.video.video_file.save('video.mp4', ContentFile(b'mp4'))
+
+    def hls_url(self, name):
+        return reverse('video-hls', args=[self.video.id, name])
+
+    def test_packaged_files_are_served_from_storage(self):
+        with mock.patch('downloader.tasks.package_hls_files', side_effect=write_hls_files), \
+                self.assertLogs('downloader.tasks', 'INFO'):
+            self.assertTrue(package_hls(str(self.video.id)))
+        self.assertEqual(os.listdir(settings.VIDEO_TEMP_DIR), [])
+
+        response = self.client.get(self.hls_url('index.m3u8'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.apple.mpegurl')
+        self.assertIn(b'segment_00000.ts', b''.join(response.streaming_content))
+        response = self.client.get(self.hls_url('segment_00000.ts'))
+        self.assertEqual(b''.join(response.streaming_content), b'segment')
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.client.get(self.hls_url('segment_00001.ts')).status_code, 404)
+
+    def test_remote_storage_serves_the_playlist_and_redirects_segments(self):
+        storage = mock.Mock()
+        storage.path.side_effect = NotImplementedError
+        storage.exists.return_value = True
+        storage.open.return_value = io.BytesIO(b"#EXTM3U\n")
+        storage.url.return_value = 'https://bucket.example.com/presigned'
+        with mock.patch('downloader.views.get_video_storage', return_value=storage):
+            response = self.client.get(self.hls_url('index.m3u8'))
+            self.assertEqual((response.status_code, response.content), (200, b"#EXTM3U\n"))
+            response = self.client.get(self.hls_url('segment_00000.ts'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], 'https://bucket.example.com/presigned')
+        storage.url.assert_called_once_with(f'linkedin_hls/{self.video.id}/segment_00000.ts')
+
+    def test_first_play_queues_packaging_once(self):
+        with mock.patch('downloader.views.package_hls') as task, self.assertLogs('django.request', 'ERROR'):
+            for _ in range(2):
+                response = self.client.get(self.hls_url('index.m3u8'))
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(response['Retry-After'], '5')
+        task.delay.assert_called_once_with(str(self.video.id))
+
+    def test_failed_packaging_is_reported_until_it_expires(self):
+        with mock.patch('downloader.tasks.package_hls_files', side_effect=MediaToolError("ffmpeg failed")), \
+                self.assertLogs('downloader.tasks', 'ERROR'):
+            self.assertFalse(package_hls(str(self.video.id)))
+        self.assertEqual(os.listdir(settings.VIDEO_TEMP_DIR), [])
+
+        with mock.patch('downloader.views.package_hls') as task, self.assertLogs('django.request', 'ERROR'):
+            response = self.client.get(self.hls_url('index.m3u8'))
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()['status'], 'failed')
+        task.delay.assert_not_called()
+
+        cache.delete(f'hls-failed:{self.video.id}')
+        with mock.patch('downloader.views.package_hls') as task, self.assertLogs('django.request', 'ERROR'):
+            self.assertEqual(self.client.get(self.hls_url('index.m3u8')).status_code, 503)
+        task.delay.assert_called_once()
+
+
+class SearchReindexTests(TestCase):
+    """Writes to indexed fields refresh the search document once per transaction"""
+
+    def test_one_refresh_per_transaction(self):
+        with mock.patch('downloader.signals.index_video') as index_video:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    video = LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/a-activity-1234567890123')
+                    video.title = 'First'
+                    video.save(update_fields=['title'])
+                    video.description = 'Second'
+                    video.save()
+        index_video.assert_called_once_with(video.id)
+
+    def test_unindexed_fields_do_not_refresh(self):
+        video = LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/a-activity-1234567890123')
+        with mock.patch('downloader.signals.index_video') as index_video:
+            with self.captureOnCommitCallbacks(execute=True):
+                video.status = 'processing'
+                video.save(update_fields=['status'])
+        index_video.assert_not_called()
+
+    def test_refresh_after_rolled_back_savepoint(self):
+        video = LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/a-activity-1234567890123')
+        with mock.patch('downloader.signals.index_video') as index_video:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    try:
+                        with transaction.atomic():
+                            video.title = 'Rolled back'
+                            video.save(update_fields=['title'])
+                            raise ValueError
+                    except ValueError:
+                        pass
+                    video.title = 'Kept'
+                    video.save(update_fields=['title'])
+        index_video.assert_called_once_with(video.id)
+
+
+class VideoSearchTests(TestCase):
+    """The search endpoint ranks matches by field weight and applies its filters (FTS5 on SQLite)"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.in_title = LinkedInVideo.objects.create(
+                post_url='https://www.linkedin.com/posts/a-activity-1', title='Kubernetes autoscaling', status='completed'
+            )
+            self.in_description = LinkedInVideo.objects.create(
+                post_url='https://www.linkedin.com/posts/b-activity-2', title='Conference talk',
+                description='Running kubernetes clusters', status='completed'
+            )
+            self.failed = LinkedInVideo.objects.create(
+                post_url='https://www.linkedin.com/posts/c-activity-3', title='Kubernetes', status='failed'
+            )
+            LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/d-activity-4', title='Unrelated')
+        LinkedInVideo.objects.filter(pk=self.in_title.pk).update(created_at=datetime(2026, 1, 1, tzinfo=timezone.utc))
+
+    def search(self, **params):
+        response = self.client.get(reverse('video-search'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, body):
+        return [result['id'] for result in body['results']]
+
+    def test_title_matches_rank_above_description_matches(self):
+        body = self.search(q='kubernetes', status='completed')
+        self.assertEqual(self.ids(body), [str(self.in_title.id), str(self.in_description.id)])
+        self.assertGreater(body['results'][0]['rank'], body['results'][1]['rank'])
+        self.assertIsNone(body['next'])
+
+    def test_filters_and_paging(self):
+        self.assertEqual(self.ids(self.search(q='kubernetes', status='failed')), [str(self.failed.id)])
+        self.assertNotIn(str(self.in_title.id), self.ids(self.search(q='kubernetes', created_after='2026-06-01T00:00:00Z')))
+        self.assertEqual(self.ids(self.search(q='kubernetes', created_before='2026-06-01T00:00:00Z')), [str(self.in_title.id)])
+
+        body = self.search(q='kubernetes', limit=2)
+        self.assertEqual(len(body['results']), 2)
+        self.assertIn('offset=2', body['next'])
+        self.assertEqual(len(self.search(q='kubernetes', limit=2, offset=2)['results']), 1)
+
+    def test_query_syntax_is_matched_literally(self):
+        self.assertEqual(self.search(q='kubernetes OR "unrelated"')['results'], [])
+        self.assertEqual(self.search(q='***')['results'], [])
+
+
+class VideoJobRecorderTests(TestCase):
+    """A job writes its status changes straight away and everything else in one flush"""
+
+    def writes(self, queries):
+        return [query['sql'] for query in queries if query['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+
+    def test_writes_per_job(self):
+        video = LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/a-activity-1234567890123')
+        recorder = VideoJobRecorder(video)
+        with CaptureQueriesContext(connection) as queries:
+            recorder.mark_processing()
+            self.assertEqual(len(self.writes(queries)), 1)
+
+            recorder.add_url_metadata({'title': 'Title', 'description': 'Description', 'open_graph': {}, 'twitter_card': {}})
+            recorder.add_post_metadata({
+                'author_name': 'Author', 'likes_count': '1,204', 'comments_count': '38 comments',
+                'published_date': '2d', 'hashtags': ['python', 'django'],
+            })
+            recorder.add_video_url_metadata({'media_id': 'D5605AQ'})
+            self.assertEqual(len(self.writes(queries)), 1)
+
+            # The video, its metadata row, the hashtags and their links; in between the
+            # metadata and existing links are read, within a savepoint of the test transaction
+            with self.captureOnCommitCallbacks(), self.assertNumQueries(9):
+                recorder.flush()
+            self.assertEqual(len(self.writes(queries)), 5)
+
+            recorder.flush(status='completed', error_message='')
+            self.assertEqual(len(self.writes(queries)), 6)
+
+        video.refresh_from_db()
+        self.assertEqual((video.status, video.title, video.metadata.num_likes), ('completed', 'Title', 1204))
+        self.assertCountEqual(video.hashtags.values_list('name', flat=True), ['python', 'django'])
+
+
+class MultipartUploadTests(SimpleTestCase):
+    """Streaming S3 uploads assemble their parts, or abort so no parts stay billed"""
+
+    def s3_client(self):
+        client = mock.Mock()
+        client.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+        client.upload_part.side_effect = lambda PartNumber, **kwargs: {'ETag': f'etag-{PartNumber}'}
+        return client
+
+    def test_parts_are_assembled_in_order(self):
+        client = self.s3_client()
+        with MultipartUpload(client, 'bucket', 'video.mp4', MIN_PART_SIZE, 2) as upload:
+            upload.write(b'x' * (MIN_PART_SIZE * 2 + 1))
+        client.complete_multipart_upload.assert_called_once_with(
+            Bucket='bucket', Key='video.mp4', UploadId='upload-1',
+            MultipartUpload={'Parts': [{'PartNumber': n, 'ETag': f'etag-{n}'} for n in (1, 2, 3)]}
+        )
+        client.abort_multipart_upload.assert_not_called()
+
+    def test_failed_completion_aborts_the_upload(self):
+        for failing_call in ('upload_part', 'complete_multipart_upload'):
+            with self.subTest(failing_call=failing_call):
+                client = self.s3_client()
+                getattr(client, failing_call).side_effect = ConnectionError("reset")
+                with self.assertRaises(ConnectionError):
+                    with MultipartUpload(client, 'bucket', 'video.mp4', MIN_PART_SIZE, 2) as upload:
+                        upload.write(b'x')
+                client.abort_multipart_upload.assert_called_once_with(Bucket='bucket', Key='video.mp4', UploadId='upload-1')
+
+
+class EngagementParsingTests(SimpleTestCase):
+    """Display strings scraped from posts to typed engagement values"""
+
+    def test_parse_count(self):
+        cases = [
+            ('1,234', 1234),
+            ('1.2K', 1200),
+            ('1.2k reactions', 1200),
+            ('2.5M', 2_500_000),
+            ('3 comments', 3),
+            ('12,345,678', 12_345_678),
+            ('0', 0),
+            ('No comments', None),
+            ('', None),
+            (None, None),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(parse_count(text), expected)
+
+    def test_parse_post_age(self):
+        reference = datetime(2026, 1, 31, 12, 0, tzinfo=timezone.utc)
+        cases = [
+            ('45s', timedelta(seconds=45)),
+            ('45m', timedelta(minutes=45)),
+            ('10 mins ago', timedelta(minutes=10)),
+            ('3h', timedelta(hours=3)),
+            ('1d •', timedelta(days=1)),
+            ('3 days ago', timedelta(days=3)),
+            ('2w •', timedelta(weeks=2)),
+            ('2 weeks ago', timedelta(weeks=2)),
+            ('5mo', timedelta(days=150)),
+            ('1 month ago', timedelta(days=30)),
+            ('1yr', timedelta(days=365)),
+            ('2 years ago', timedelta(days=730)),
+        ]
+        for text, age in cases:
+            with self.subTest(text=text):
+                self.assertEqual(parse_post_age(text, reference), reference - age)
+
+    def test_parse_post_age_without_age(self):
+        for text in ('Edited', 'Promoted', '', None):
+            with self.subTest(text=text):
+                self.assertIsNone(parse_post_age(text))
+
+
+class QualityPolicyTests(SimpleTestCase):
+    """Quality policy parsing and rendition selection"""
+
+    def setUp(self):
+        self.variants = [
+            make_variant('https://cdn.test/vid/v2/MEDIA/mp4-720p-30fp-crf28/0/1', size=4_000_000),
+            make_variant('https://cdn.test/vid/v2/MEDIA/mp4-360p-30fp-crf28/0/1', size=1_000_000),
+            make_variant('https://cdn.test/vid/v2/MEDIA/mp4-1080p-30fp-crf28/0/1', size=9_000_000),
+        ]
+
+    def test_parse_quality_policy(self):
+        cases = [
+            (None, ('highest', None)),
+            ('', ('highest', None)),
+            ('highest', ('highest', None)),
+            (' lowest ', ('lowest', None)),
+            ('max_height:720', ('max_height', 720)),
+            ('max_bytes:5000000', ('max_bytes', 5_000_000)),
+        ]
+        for policy, expected in cases:
+            with self.subTest(policy=policy):
+                self.assertEqual(parse_quality_policy(policy), expected)
+
+    def test_invalid_quality_policy(self):
+        for policy in ('best', 'highest:720', 'max_height', 'max_height:', 'max_height:abc', 'max_bytes:0', 'max_bytes:-5'):
+            with self.subTest(policy=policy):
+                with self.assertRaises(ValueError):
+                    parse_quality_policy(policy)
+
+    def test_select_variant(self):
+        cases = [
+            ('highest', 1080),
+            ('lowest', 360),
+            ('max_height:720', 720),
+            ('max_height:1000', 720),
+            ('max_height:2160', 1080),
+            ('max_height:240', 360),  # Nothing fits: the smallest
+            ('max_bytes:5000000', 720),
+            ('max_bytes:100', 360),
+        ]
+        for policy, height in cases:
+            with self.subTest(policy=policy):
+                self.assertEqual(select_variant(self.variants, policy)['height'], height)
+
+    def test_select_variant_unknown_heights_rank_lowest(self):
+        unknown = make_variant('https://cdn.test/video.mp4')
+        self.assertIsNone(unknown['height'])
+        self.assertEqual(select_variant(self.variants + [unknown], 'lowest'), unknown)
+        self.assertEqual(select_variant(self.variants + [unknown], 'highest')['height'], 1080)
+
+    def test_select_variant_fetches_missing_sizes(self):
+        for variant in self.variants:
+            variant['size'] = None
+        sizes = {variant['url']: variant['height'] * 5000 for variant in self.variants}
+        with mock.patch('downloader.utils.video_variants._head_size', side_effect=sizes.get) as head_size:
+            self.assertEqual(select_variant(self.variants, 'max_bytes:4000000')['height'], 720)
+        self.assertEqual(head_size.call_count, 3)
+
+    def test_select_variant_no_variants(self):
+        self.assertIsNone(select_variant([], 'highest'))
+
+
+class FairShareTests(TestCase):
+    """Deferred downloads are picked round-robin between clients, oldest first"""
+
+    def add_videos(self, client_key, count, priority='bulk'):
+        videos = []
+        for _ in range(count):
+            video = LinkedInVideo.objects.create(
+                post_url='https://www.linkedin.com/posts/a-activity-1234567890123',
+                priority=priority, client_key=client_key
+            )
+            # Distinct creation times, in insertion order
+            LinkedInVideo.objects.filter(pk=video.pk).update(
+                created_at=datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=LinkedInVideo.objects.count())
+            )
+            videos.append(video.pk)
+        return videos
+
+    def test_round_robin_between_clients(self):
+        large_import = self.add_videos('ip:10.0.0.1', 5)
+        small = self.add_videos('ip:10.0.0.2', 2)
+        single = self.add_videos('user:7', 1)
+
+        batch = [video.pk for video in fair_share_batch('bulk', 10)]
+        self.assertEqual(batch, [
+            large_import[0], small[0], single[0],
+            large_import[1], small[1],
+            large_import[2], large_import[3], large_import[4],
+        ])
+
+    def test_limit_and_filters(self):
+        large_import = self.add_videos('ip:10.0.0.1', 3)
+        small = self.add_videos('ip:10.0.0.2', 1)
+        self.add_videos('ip:10.0.0.3', 2, priority='background')
+        LinkedInVideo.objects.filter(pk=large_import[0]).update(queued_at=datetime(2026, 1, 2, tzinfo=timezone.utc))
+
+        batch = [video.pk for video in fair_share_batch('bulk', 2)]
+        # Already dispatched downloads and other classes are skipped
+        self.assertEqual(batch, [large_import[1], small[0]])
+        self.assertEqual(fair_share_batch('bulk', 0), [])
+
+
+CANNED_PAGE = b"""<html><head><title>A post</title>
+<meta property="og:title" content="Open Graph title">
+<meta name="description" content="A description">
+<meta property="og:image" content="https://cdn.example.com/image.jpg">
+</head><body></body></html>"""
+
+
+class CannedPageHandler(BaseHTTPRequestHandler):
+    """Serves the pages of URLMetadataParityTests"""
+
+    def do_GET(self):
+        if self.path == '/page':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(CANNED_PAGE)))
+            self.end_headers()
+            self.wfile.write(CANNED_PAGE)
+        elif self.path.startswith('/loop'):
+            self.send_response(302)
+            self.send_header('Location', f'/loop{len(self.path)}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@skipUnless(importlib.util.find_spec('aiohttp'), "aiohttp is not installed")
+class URLMetadataParityTests(SimpleTestCase):
+    """The aiohttp fetcher returns exactly what the blocking extract_url_metadata returns"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), CannedPageHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    def test_same_results_as_the_blocking_fetcher(self):
+        with socket.socket() as unused:
+            unused.bind(('127.0.0.1', 0))
+            closed_port = unused.getsockname()[1]
+        base = f'http://127.0.0.1:{self.server.server_port}'
+        urls = [f'{base}/page', f'{base}/missing', f'{base}/loop', f'http://127.0.0.1:{closed_port}/page']
+
+        with mock.patch.dict(os.environ, {'NO_PROXY': '127.0.0.1', 'no_proxy': '127.0.0.1'}), \
+                self.assertLogs('downloader.utils', 'ERROR'):
+            blocking = [MetadataExtractor().extract_url_metadata(url) for url in urls]
+            concurrent = extract_many_url_metadata(urls)
+
+        # Only the time of the fetch may differ
+        for result in blocking + concurrent:
+            result.pop('extracted_at', None)
+        self.assertEqual(concurrent, blocking)
+        self.assertEqual(blocking[0]['open_graph']['title'], 'Open Graph title')
+        self.assertEqual(blocking[1]['error'], f"404 Client Error: Not Found for url: {base}/missing")
+        self.assertEqual(blocking[2]['error'], f"Too many redirects fetching {base}/loop")
+        self.assertEqual(blocking[3]['error'], "Could not connect to 127.0.0.1")
+
+
+class EngagementRefreshTests(TestCase):
+    """The refresh writes changed counts only, and the snapshots of a batch in one insert"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def tracked(self, n, likes_count=None, with_snapshot=False):
+        video = LinkedInVideo.objects.create(post_url=f'https://www.linkedin.com/posts/a-activity-{n}', is_tracked=True)
+        if likes_count:
+            VideoMetadata.objects.create(video=video, likes_count=likes_count, num_likes=parse_count(likes_count))
+        if with_snapshot:
+            EngagementSnapshot.objects.create(
+                video=video, captured_at=datetime.now(timezone.utc) - timedelta(days=1), num_likes=parse_count(likes_count)
+            )
+        return video
+
+    def test_batch_refresh(self):
+        unchanged = self.tracked(1, likes_count='12', with_snapshot=True)
+        changed = self.tracked(2, likes_count='12', with_snapshot=True)
+        new = self.tracked(3)
+        unreachable = self.tracked(4)
+        untracked = LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/a-activity-5')
+
+        scraped = {
+            unchanged.post_url: {'likes_count': '12', 'comments_count': None},
+            changed.post_url: {'likes_count': '1,204', 'comments_count': '38 comments'},
+            new.post_url: {'likes_count': '7', 'comments_count': None},
+        }
+        downloader = mock.Mock(driver=mock.Mock(), last_error=selenium_error('TimeoutException')())
+        downloader.load_post.side_effect = lambda url: url in scraped
+        with mock.patch('downloader.utils.engagement_refresh.LinkedInDownloader', return_value=downloader), \
+                mock.patch('downloader.utils.engagement_refresh.MetadataExtractor') as extractor, \
+                mock.patch('downloader.utils.engagement_refresh.linkedin_breaker') as breaker, \
+                CaptureQueriesContext(connection) as queries, \
+                self.assertLogs('downloader.utils.engagement_refresh', 'INFO'):
+            breaker.retry_after.return_value = 0
+            extractor.return_value.extract_post_metadata.side_effect = lambda driver, url: scraped[url]
+            result = refresh_tracked_engagement()
+
+        self.assertEqual(result, {'refreshed': 3, 'changed': 2, 'failed': 1})
+        breaker.record_failure.assert_called_once_with()
+        downloader.close.assert_called_once_with()
+
+        snapshot_inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "downloader_engagementsnapshot"')]
+        self.assertEqual(len(snapshot_inserts), 1)
+        self.assertEqual(unchanged.engagement_snapshots.count(), 1)
+        self.assertEqual(
+            list(changed.engagement_snapshots.order_by('captured_at').values_list('num_likes', 'num_comments')),
+            [(12, None), (1204, 38)]
+        )
+        self.assertEqual(list(new.engagement_snapshots.values_list('num_likes', flat=True)), [7])
+        self.assertEqual(VideoMetadata.objects.get(video=changed).likes_count, '1,204')
+
+        refreshed = set(LinkedInVideo.objects.filter(engagement_refreshed_at__isnull=False).values_list('id', flat=True))
+        self.assertEqual(refreshed, {unchanged.id, changed.id, new.id})
+        self.assertNotIn(untracked.id, refreshed)
+        self.assertNotIn(unreachable.id, refreshed)
+
+
+class BulkDownloadWorkerTests(TestCase):
+    """What a bulk download worker does with posts it already has, and with failing ones"""
+
+    def setUp(self):
+        self.downloader = mock.Mock(driver=mock.Mock())
+        patcher = mock.patch.dict(bulk_download._worker, downloader=self.downloader, postprocess=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def existing(self, **fields):
+        return LinkedInVideo.objects.create(
+            post_url='https://www.linkedin.com/posts/jane-activity-7313868802440495105', status='completed', **fields
+        )
+
+    def test_stored_video_is_skipped(self):
+        video = self.existing(video_file='linkedin_videos/video.mp4')
+        with mock.patch('downloader.tasks.process_video') as process_video:
+            result = download_post('https://linkedin.com/posts/jane-activity-7313868802440495105/?utm_source=share')
+        process_video.assert_not_called()
+        self.assertEqual((result['status'], result['video_id']), ('skipped', str(video.id)))
+
+    def test_evicted_video_is_fetched_again(self):
+        evicted = self.existing(video_file='', file_evicted_at=datetime(2026, 1, 1, tzinfo=timezone.utc))
+        with mock.patch('downloader.tasks.process_video') as process_video:
+            result = download_post(evicted.post_url)
+        process_video.assert_called_once()
+        recorder, downloader = process_video.call_args.args
+        self.assertIs(downloader, self.downloader)
+        self.assertEqual(result['status'], 'completed')
+        self.assertNotEqual(result['video_id'], str(evicted.id))
+        self.assertEqual(LinkedInVideo.objects.get(id=result['video_id']).priority, 'bulk')
+
+    def test_browser_failure_restarts_the_browser(self):
+        error = JobFailure("Could not extract video URL from the post", 'browser_timeout', transient=True)
+        with mock.patch('downloader.tasks.process_video', side_effect=error):
+            result = download_post('https://www.linkedin.com/posts/jane-activity-7313868802440495105')
+        self.assertEqual((result['status'], result['reason']), ('failed', 'browser_timeout'))
+        self.downloader.close.assert_called_once_with()
+        self.assertEqual(LinkedInVideo.objects.get(id=result['video_id']).status, 'failed')
+
+
+SNAPSHOT_PAGE = """<html><body>
+<div class="update-components-actor__name">Jane Doe</div>
+<div class="update-components-text">Scaling Postgres #databases #python</div>
+<span class="social-details-social-counts__reactions-count">1,204</span>
+<video data-sources="[{&quot;src&quot;:&quot;https://dms.licdn.com/playlist/vid/v2/D5605AQ/mp4-720p-30fp-crf28/0/1?e=4102444800&amp;t=x&quot;,&quot;height&quot;:720}]"></video>
+</body></html>"""
+
+
+class PageSnapshotTests(TestCase):
+    """Pages are stored once per content, and re-parsed offline into the stored metadata"""
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        overrides = override_settings(PAGE_SNAPSHOT_ROOT=root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_pages_are_content_addressed(self):
+        digest, size = store_page(SNAPSHOT_PAGE)
+        self.assertEqual(store_page(SNAPSHOT_PAGE), (digest, size))
+        self.assertNotEqual(store_page(SNAPSHOT_PAGE + ' ')[0], digest)
+        self.assertEqual(load_page(digest), SNAPSHOT_PAGE)
+        stored = [name for _, _, names in os.walk(settings.PAGE_SNAPSHOT_ROOT) for name in names]
+        self.assertEqual(len(stored), 2)
+
+    def test_reextraction_updates_the_stored_metadata(self):
+        video = LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/jane-activity-7313868802440495105')
+        VideoMetadata.objects.create(video=video, author_name='Stale selector', post_text='Scaling Postgres')
+        unchanged = LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/other-activity-7313868802440495106')
+        VideoMetadata.objects.create(video=unchanged, author_name='Kept', author_username='other-activity-7313868802440495106')
+        digest, size = store_page(SNAPSHOT_PAGE)
+        now = datetime.now(timezone.utc)
+        PageSnapshot.objects.create(video=video, sha256=digest, size=size, captured_at=now)
+        empty_digest, empty_size = store_page('<html></html>')
+        PageSnapshot.objects.create(video=unchanged, sha256=empty_digest, size=empty_size, captured_at=now)
+
+        with mock.patch('downloader.utils.snapshot_reextraction.index_video') as index_video, \
+                self.assertLogs('downloader.utils.snapshot_reextraction', 'INFO'):
+            summary = reextract_snapshots(workers=1)
+
+        self.assertEqual((summary['videos'], summary['changed'], summary['failed']), (2, 1, 0))
+        metadata = VideoMetadata.objects.get(video=video)
+        self.assertEqual(
+            (metadata.author_name, metadata.post_text, metadata.num_likes, metadata.embed_id),
+            ('Jane Doe', 'Scaling Postgres #databases #python', 1204, '4102444800')
+        )
+        self.assertCountEqual(video.hashtags.values_list('name', flat=True), ['databases', 'python'])
+        # A page where no selector matches blanks nothing
+        self.assertEqual(VideoMetadata.objects.get(video=unchanged).author_name, 'Kept')
+        index_video.assert_called_once_with(video.id)
+
+
+def selenium_error(name):
+    """Stand-in for a Selenium exception class, which classify_failure matches by module"""
+    return type(name, (Exception,), {'__module__': 'selenium.common.exceptions'})
+
+
+def http_error(code, retry_after=None):
+    response = requests.Response()
+    response.status_code = code
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(retry_after)
+    return requests.exceptions.HTTPError(f"{code} error", response=response)
+
+
+class FailureClassificationTests(SimpleTestCase):
+    """Which failures are retried, and how long jobs wait"""
+
+    def test_classify_failure(self):
+        cases = [
+            (http_error(429, 90), 'rate_limited', True, 90.0),
+            (http_error(503), 'server_error', True, None),
+            (http_error(408), 'server_error', True, None),
+            (http_error(520), 'server_error', True, None),
+            (http_error(404), 'http_404', False, None),
+            (http_error(403), 'http_403', False, None),
+            (requests.exceptions.ReadTimeout(), 'timeout', True, None),
+            (requests.exceptions.ConnectionError(), 'connection_error', True, None),
+            (selenium_error('TimeoutException')(), 'browser_timeout', True, None),
+            (selenium_error('WebDriverException')(), 'browser_error', True, None),
+            (selenium_error('NoSuchElementException')(), 'page_changed', False, None),
+            (selenium_error('InvalidSelectorException')(), 'page_changed', False, None),
+            (selenium_error('InvalidArgumentException')(), 'browser_invalid_argument', False, None),
+            (ValueError('bad'), 'ValueError', False, None),
+            (JobFailure('no video', 'no_video'), 'no_video', False, None),
+        ]
+        for error, reason, transient, retry_after in cases:
+            with self.subTest(reason=reason, error=type(error).__name__):
+                failure = classify_failure(error)
+                self.assertEqual(failure.reason, reason)
+                self.assertEqual(failure.transient, transient)
+                self.assertEqual(failure.retry_after, retry_after)
+
+    def test_linkedin_failures_trip_the_breaker(self):
+        self.assertTrue(classify_failure(http_error(429)).counts_against_linkedin)
+        self.assertTrue(classify_failure(selenium_error('TimeoutException')()).counts_against_linkedin)
+        self.assertFalse(classify_failure(http_error(404)).counts_against_linkedin)
+        self.assertFalse(classify_failure(selenium_error('NoSuchElementException')()).counts_against_linkedin)
+
+    def test_failure_from(self):
+        failure = failure_from(None, "Login failed", 'login_rejected')
+        self.assertEqual((failure.reason, failure.transient), ('login_rejected', False))
+        failure = failure_from(http_error(502), "Download failed", 'download_failed')
+        self.assertEqual((failure.reason, failure.transient), ('server_error', True))
+        self.assertTrue(str(failure).startswith("Download failed: "))
+
+    @override_settings(DOWNLOAD_RETRY_BACKOFF=10, DOWNLOAD_RETRY_BACKOFF_MAX=40)
+    def test_retry_delay(self):
+        for attempt, ceiling in [(1, 10), (2, 20), (3, 40), (4, 40), (10, 40)]:
+            with self.subTest(attempt=attempt):
+                with mock.patch('downloader.utils.failures.random.uniform', side_effect=lambda low, high: low):
+                    self.assertEqual(retry_delay(attempt), ceiling / 2)
+                with mock.patch('downloader.utils.failures.random.uniform', side_effect=lambda low, high: high):
+                    self.assertEqual(retry_delay(attempt), ceiling)
+        # Retry-After from the remote side wins when it is longer
+        self.assertEqual(retry_delay(1, retry_after=300), 300)
+
+
+@override_settings(
+    LINKEDIN_BREAKER_WINDOW=60, LINKEDIN_BREAKER_MIN_REQUESTS=4,
+    LINKEDIN_BREAKER_FAILURE_RATIO=0.5, LINKEDIN_BREAKER_COOLDOWN=120,
+)
+class CircuitBreakerTests(SimpleTestCase):
+    """Open, cooldown and close transitions of the cache-backed circuit breaker"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.breaker = CircuitBreaker('test')
+        # Window boundaries at multiples of 60s; the cache expires keys on the same clock
+        self.now = 1_800_000_000.0
+        patcher = mock.patch('time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_stays_closed_below_minimum_requests(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.retry_after(), 0)
+        self.breaker.raise_if_open()
+
+    def test_stays_closed_below_failure_ratio(self):
+        for _ in range(3):
+            self.breaker.record_success()
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.retry_after(), 0)
+
+    def test_opens_then_closes_after_cooldown(self):
+        for _ in range(2):
+            self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.retry_after(), 0)
+        with self.assertLogs('downloader.utils.failures', 'WARNING'):
+            self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.retry_after(), 120)
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.breaker.raise_if_open()
+        self.assertEqual(raised.exception.retry_after, 120)
+
+        self.now += 100
+        self.assertEqual(self.breaker.retry_after(), 20)
+
+        # Cooled down and in a new window: closed
+        self.now += 21
+        self.assertEqual(self.breaker.retry_after(), 0)
+        self.breaker.raise_if_open()
+
+    @override_settings(LINKEDIN_BREAKER_COOLDOWN=30)
+    def test_reopens_on_failure_while_window_is_bad(self):
+        self.now += 10
+        with self.assertLogs('downloader.utils.failures', 'WARNING'):
+            for _ in range(4):
+                self.breaker.record_failure()
+        self.assertEqual(self.breaker.retry_after(), 30)
+
+        # Cooled down, but the first request after it fails while the window still looks bad
+        self.now += 31
+        self.assertEqual(self.breaker.retry_after(), 0)
+        with self.assertLogs('downloader.utils.failures', 'WARNING'):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.retry_after(), 30)
+
+    @override_settings(LINKEDIN_BREAKER_COOLDOWN=30)
+    def test_success_after_cooldown_keeps_it_closed(self):
+        self.now += 10
+        with self.assertLogs('downloader.utils.failures', 'WARNING'):
+            for _ in range(4):
+                self.breaker.record_failure()
+        self.now += 31
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.retry_after(), 0)
+
+    def test_new_window_starts_clean(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now += 60
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.retry_after(), 0)
+
+
+class SinglePageLoadTests(TestCase):
+    """A job loads the post page once, for the video URL and the post metadata both"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=media_root, VIDEO_TEMP_DIR=os.path.join(media_root, 'tmp'), VIDEO_STORAGE_BACKEND='filesystem',
+            PAGE_SNAPSHOTS_ENABLED=False
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def rendered_post(self):
+        element = mock.Mock(text='Jane Doe')
+        element.get_attribute.return_value = 'https://dms.licdn.com/playlist/vid/v2/D5605AQ/mp4-720p-30fp-crf28/0/1?e=4102444800&t=x'
+        element.find_elements.return_value = []
+        driver = mock.Mock(page_source='<html></html>')
+        driver.find_element.return_value = element
+        driver.find_elements.side_effect = lambda by, value: [element] if value == 'video' else []
+        return driver
+
+    def test_one_page_load_per_job(self):
+        video = LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/jane-activity-7313868802440495105')
+        recorder = VideoJobRecorder(video)
+        recorder.mark_processing()
+
+        downloader = LinkedInDownloader()
+        downloader.driver = self.rendered_post()
+
+        def download(video_url, path):
+            with open(path, 'wb') as f:
+                f.write(b'mp4')
+            return True, 0.1
+
+        with mock.patch.object(downloader, 'download_video', side_effect=download), \
+                mock.patch('downloader.tasks.MetadataExtractor.extract_url_metadata', return_value={'title': 'Title'}), \
+                mock.patch('downloader.utils.linkedin_downloader.time.sleep'), \
+                self.assertLogs('downloader', 'INFO'):
+            process_video(recorder, downloader)
+
+        downloader.driver.get.assert_called_once_with(video.post_url)
+        video.refresh_from_db()
+        self.assertEqual((video.status, video.title, video.metadata.author_name), ('completed', 'Title', 'Jane Doe'))
+        self.assertTrue(video.video_file)
+
+
+class ChromeDriverResolutionTests(SimpleTestCase):
+    """ChromeDriver is resolved once per process, and a failure only for CHROMEDRIVER_RETRY_AFTER seconds"""
+
+    def setUp(self):
+        patcher = mock.patch.multiple(chromedriver, _resolved=None, _failure=None, _failed_at=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.bin_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.bin_dir, ignore_errors=True)
+        self.now = 1000.0
+        clock = mock.patch('downloader.utils.chromedriver.time.monotonic', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def binary(self, name, version_line):
+        path = os.path.join(self.bin_dir, name)
+        with open(path, 'w') as f:
+            f.write(f'#!/bin/sh\necho "{version_line}"\n')
+        os.chmod(path, 0o755)
+        return path
+
+    def test_resolved_once(self):
+        driver = self.binary('chromedriver', 'ChromeDriver 120.0.6099.109 (abc)')
+        chrome = self.binary('chrome', 'Google Chrome 120.0.6099.129')
+        with override_settings(CHROMEDRIVER_PATH=driver, CHROME_BINARY=chrome), \
+                mock.patch('downloader.utils.chromedriver.subprocess.run', wraps=subprocess.run) as run:
+            with self.assertLogs('downloader.utils.chromedriver', 'INFO'):
+                resolved = resolve_chromedriver()
+            self.assertIs(resolve_chromedriver(), resolved)
+        self.assertEqual(run.call_count, 2)
+        self.assertEqual(
+            (resolved['path'], resolved['source'], resolved['driver_version'], resolved['chrome_version']),
+            (driver, 'settings', '120.0.6099.109', '120.0.6099.129')
+        )
+
+    def test_failure_is_retried_after_the_retry_interval(self):
+        driver = os.path.join(self.bin_dir, 'chromedriver')
+        chrome = self.binary('chrome', 'Google Chrome 120.0.6099.129')
+        with override_settings(CHROMEDRIVER_PATH=driver, CHROME_BINARY=chrome, CHROMEDRIVER_RETRY_AFTER=60):
+            with self.assertRaisesMessage(ChromeDriverError, "is not an executable file"):
+                resolve_chromedriver()
+
+            # Installed meanwhile, but the failure is still cached
+            self.binary('chromedriver', 'ChromeDriver 120.0.6099.109')
+            self.now += 30
+            with self.assertRaisesMessage(ChromeDriverError, "is not an executable file"):
+                resolve_chromedriver()
+
+            self.now += 31
+            with self.assertLogs('downloader.utils.chromedriver', 'INFO'):
+                self.assertEqual(resolve_chromedriver()['driver_version'], '120.0.6099.109')
+
+    def test_version_mismatch(self):
+        driver = self.binary('chromedriver', 'ChromeDriver 119.0.6045.105')
+        chrome = self.binary('chrome', 'Google Chrome 120.0.6099.129')
+        with override_settings(CHROMEDRIVER_PATH=driver, CHROME_BINARY=chrome):
+            with self.assertRaisesMessage(ChromeDriverError, "does not match Chrome 120.0.6099.129"):
+                resolve_chromedriver()
+
+
+class PageLoadFailureTests(TestCase):
+    """A post page that never renders is retried and counts against LinkedIn, a post without a video is not"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def driver(self, rendered_post):
+        from selenium.common.exceptions import NoSuchElementException
+        driver = mock.Mock()
+        driver.find_element.side_effect = NoSuchElementException("no video")
+        driver.find_elements.return_value = [mock.Mock()] if rendered_post else []
+        return driver
+
+    def test_wait_timeout_keeps_the_error_unless_the_post_rendered(self):
+        from selenium.common.exceptions import TimeoutException
+        downloader = LinkedInDownloader(timeout=0.01)
+        downloader.last_error = ValueError("stale login error")
+        downloader.driver = self.driver(rendered_post=False)
+        with self.assertLogs('downloader.utils.linkedin_downloader', 'ERROR'):
+            self.assertEqual(downloader.extract_video_variants('https://www.linkedin.com/posts/a'), [])
+        self.assertIsInstance(downloader.last_error, TimeoutException)
+
+        downloader.driver = self.driver(rendered_post=True)
+        with self.assertLogs('downloader.utils.linkedin_downloader', 'INFO'):
+            self.assertEqual(downloader.extract_video_variants('https://www.linkedin.com/posts/a'), [])
+        self.assertIsNone(downloader.last_error)
+
+    @override_settings(PAGE_SNAPSHOTS_ENABLED=False, DOWNLOAD_MAX_ATTEMPTS=3)
+    def test_page_load_timeout_is_retried_and_trips_the_breaker(self):
+        video = LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/a')
+        downloader = mock.Mock(driver=mock.Mock(), last_error=selenium_error('TimeoutException')("video wait"))
+        downloader.extract_video_url.return_value = None
+        with mock.patch('downloader.tasks.LinkedInDownloader', return_value=downloader), \
+                mock.patch('downloader.tasks.MetadataExtractor') as extractor, \
+                mock.patch('downloader.tasks.linkedin_breaker') as breaker, \
+                mock.patch.object(download_linkedin_video, 'retry', side_effect=Retry()) as retry, \
+                self.assertLogs('downloader.tasks', 'WARNING'):
+            extractor.return_value.extract_url_metadata.return_value = {}
+            extractor.return_value.extract_post_metadata.return_value = {}
+            breaker.retry_after.return_value = 0
+            with self.assertRaises(Retry):
+                download_linkedin_video(str(video.id))
+
+        retry.assert_called_once()
+        breaker.record_failure.assert_called_once_with()
+        breaker.record_success.assert_not_called()
+        video.refresh_from_db()
+        self.assertEqual(video.status, 'pending')
+        self.assertIn("retrying", video.error_message)
+
+    @override_settings(PAGE_SNAPSHOTS_ENABLED=False)
+    def test_post_without_video_fails_for_good(self):
+        video = LinkedInVideo.objects.create(post_url='https://www.linkedin.com/posts/a')
+        downloader = mock.Mock(driver=mock.Mock(), last_error=None)
+        downloader.extract_video_url.return_value = None
+        with mock.patch('downloader.tasks.LinkedInDownloader', return_value=downloader), \
+                mock.patch('downloader.tasks.MetadataExtractor') as extractor, \
+                mock.patch('downloader.tasks.linkedin_breaker') as breaker, \
+                self.assertLogs('downloader.tasks', 'ERROR'):
+            extractor.return_value.extract_url_metadata.return_value = {}
+            extractor.return_value.extract_post_metadata.return_value = {}
+            breaker.retry_after.return_value = 0
+            self.assertFalse(download_linkedin_video(str(video.id)))
+
+        breaker.record_failure.assert_not_called()
+        video.refresh_from_db()
+        self.assertEqual(video.status, 'failed')
+
+
+def resolve_to(*addresses):
+    """getaddrinfo stand-in resolving every host to the given addresses"""
+    def getaddrinfo(host, port, *args, **kwargs):
+        family = lambda address: socket.AF_INET6 if ':' in address else socket.AF_INET
+        return [(family(address), socket.SOCK_STREAM, 6, '', (address, port)) for address in addresses]
+    return getaddrinfo
+
+
+@override_settings(LINK_PREVIEW_ALLOW_PRIVATE_HOSTS=False)
+class LinkPreviewURLTests(SimpleTestCase):
+    """The anonymous preview endpoint only fetches public hosts, on every hop"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.sent = []
+
+    def respond(self, *responses):
+        """Answer the requests the preview code sends, in order, with (status, headers, body) tuples"""
+        responses = list(responses)
+
+        def send(adapter, request, **kwargs):
+            self.sent.append(request)
+            status, headers, body = responses.pop(0)
+            response = requests.Response()
+            response.status_code = status
+            response.headers.update(headers)
+            response.raw = io.BytesIO(body)
+            response.request = request
+            response.url = request.url
+            return response
+        return mock.patch('requests.adapters.HTTPAdapter.send', autospec=True, side_effect=send)
+
+    def test_non_public_addresses_refused(self):
+        addresses = [
+            '10.0.0.5', '172.16.3.4', '192.168.1.1', '127.0.0.1', '169.254.169.254',
+            '100.64.0.1', '0.0.0.0', '::1', 'fe80::1%eth0', 'fd00::1', '::ffff:127.0.0.1',
+        ]
+        for address in addresses:
+            with self.subTest(address=address):
+                with mock.patch('socket.getaddrinfo', side_effect=resolve_to(address)):
+                    with self.assertRaises(PreviewURLError):
+                        check_preview_url('https://internal.example.com/')
+
+    def test_any_non_public_address_refused(self):
+        with mock.patch('socket.getaddrinfo', side_effect=resolve_to('93.184.216.34', '10.0.0.5')):
+            with self.assertRaises(PreviewURLError):
+                check_preview_url('https://mixed.example.com/')
+
+    def test_public_address_returned_for_pinning(self):
+        with mock.patch('socket.getaddrinfo', side_effect=resolve_to('93.184.216.34')):
+            self.assertEqual(check_preview_url('https://example.com/page'), '93.184.216.34')
+
+    def test_invalid_urls_refused(self):
+        for url in ('ftp://example.com/', 'file:///etc/passwd', 'https://', 'http://example.com:99999/'):
+            with self.subTest(url=url):
+                with self.assertRaises(PreviewURLError):
+                    check_preview_url(url)
+
+    def test_request_connects_to_checked_address(self):
+        page = b'<html><head><title>Example</title></head></html>'
+        with mock.patch('socket.getaddrinfo', side_effect=resolve_to('93.184.216.34')), \
+                self.respond((200, {'Content-Type': 'text/html; charset=utf-8'}, page)):
+            preview, cached = get_link_preview('http://example.com:8080/page')
+        self.assertEqual(preview['title'], 'Example')
+        self.assertFalse(cached)
+        self.assertEqual(self.sent[0].url, 'http://93.184.216.34:8080/page')
+        self.assertEqual(self.sent[0].headers['Host'], 'example.com:8080')
+
+    def test_redirect_to_private_host_refused(self):
+        def getaddrinfo(host, port, *args, **kwargs):
+            return resolve_to('169.254.169.254' if host == 'metadata.internal' else '93.184.216.34')(host, port)
+
+        with mock.patch('socket.getaddrinfo', side_effect=getaddrinfo), \
+                self.respond((302, {'Location': 'http://metadata.internal/latest/meta-data/'}, b'')), \
+                self.assertLogs('downloader.utils.link_preview', 'WARNING'):
+            preview, _ = get_link_preview('https://example.com/redirect')
+        self.assertIn('error', preview)
+        self.assertNotIn('title', preview)
+        # The redirect target was never requested
+        self.assertEqual(len(self.sent), 1)
+
+    def test_image_redirect_to_private_host_refused(self):
+        def getaddrinfo(host, port, *args, **kwargs):
+            return resolve_to('10.1.2.3' if host == 'intranet.local' else '93.184.216.34')(host, port)
+
+        with mock.patch('socket.getaddrinfo', side_effect=getaddrinfo), \
+                self.respond((301, {'Location': 'https://intranet.local/secret.png'}, b'')):
+            with self.assertRaises(PreviewURLError):
+                _fetch_image('https://cdn.example.com/image.png')
+        self.assertEqual(len(self.sent), 1)
+
+    @override_settings(LINK_PREVIEW_IMAGE_MAX_BYTES=1000)
+    def test_oversized_image_rejected(self):
+        with mock.patch('socket.getaddrinfo', side_effect=resolve_to('93.184.216.34')):
+            # Declared too large
+            with self.respond((200, {'Content-Length': '5000'}, b'x' * 5000)):
+                with self.assertRaises(ValueError):
+                    _fetch_image('https://cdn.example.com/large.png')
+            # Too large without a Content-Length
+            with self.respond((200, {}, b'x' * 5000)):
+                with self.assertRaises(ValueError):
+                    _fetch_image('https://cdn.example.com/large.png')
+            with self.respond((200, {}, b'x' * 1000)):
+                self.assertEqual(len(_fetch_image('https://cdn.example.com/small.png')), 1000)
+
+    @override_settings(LINK_PREVIEW_PAGE_MAX_BYTES=1000)
+    def test_oversized_page_not_read(self):
+        with mock.patch('socket.getaddrinfo', side_effect=resolve_to('93.184.216.34')), \
+                self.respond((200, {'Content-Type': 'text/html'}, b'<html>' + b'x' * 5000)), \
+                self.assertLogs('downloader.utils.link_preview', 'WARNING'):
+            preview, _ = get_link_preview('https://example.com/huge')
+        self.assertIn('error', preview)
@@ -1,8 +1,17 @@
 from django.urls import path
-from .views import LinkedInVideoView, TaskStatusView, VideoDownloadURLView
+from .views import LinkedInVideoView, LinkedInVideoListView, TaskStatusView, VideoDownloadURLView, VideoFileView, VideoHLSView, VideoEngagementView, VideoSearchView, LinkPreviewView, LinkPreviewImageView, HealthCheckView, MetricsView
 
 urlpatterns = [
     path('linkedin-video/', LinkedInVideoView.as_view(), name='linkedin-video'),
+    path('videos/', LinkedInVideoListView.as_view(), name='video-list'),
+    path('video-search/', VideoSearchView.as_view(), name='video-search'),
     path('task-status/', TaskStatusView.as_view(), name='task-status'),
      path('video-download-url/', VideoDownloadURLView.as_view(), name='video-download-url'),
+    path('video-file/<uuid:video_id>/', VideoFileView.as_view(), name='video-file'),
+    path('video-hls/<uuid:video_id>/<str:name>', VideoHLSView.as_view(), name='video-hls'),
+    path('video-engagement/<uuid:video_id>/', VideoEngagementView.as_view(), name='video-engagement'),
+    path('link-preview/', LinkPreviewView.as_view(), name='link-preview'),
+    path('link-preview-image/<str:name>', LinkPreviewImageView.as_view(), name='link-preview-image'),
+    path('health/', HealthCheckView.as_view(), name='health'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
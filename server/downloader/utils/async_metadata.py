@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import threading
+import urllib.parse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.models import DEFAULT_REDIRECT_LIMIT
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from django.conf import settings
+from .metadata_extractor import (
+    URL_METADATA_HEADERS, URL_METADATA_TIMEOUT, MetadataExtractor, normalize_url, parse_url_metadata, url_metadata_error
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _host(url):
+    return urllib.parse.urlsplit(url).hostname or ''
+
+
+def _as_requests_error(error):
+    """The requests exception a blocking fetch would have failed with, for url_metadata_error"""
+    import aiohttp
+
+    if isinstance(error, requests.exceptions.RequestException):
+        return error
+    # Before the connection errors: aiohttp's socket timeouts are both
+    if isinstance(error, asyncio.TimeoutError):
+        return requests.exceptions.Timeout(error)
+    if isinstance(error, aiohttp.TooManyRedirects):
+        return requests.exceptions.TooManyRedirects(error)
+    if isinstance(error, aiohttp.ClientConnectionError):
+        return requests.exceptions.ConnectionError(error)
+    return requests.exceptions.RequestException(error)
+
+
+def _as_requests_response(response, body):
+    """
+    Wrap an aiohttp response in a requests.Response
+
+    raise_for_status() and text then behave exactly like the blocking fetcher's,
+    including the error messages and the charset detection.
+    """
+    result = requests.Response()
+    result.status_code = response.status
+    result.reason = response.reason
+    result.headers = CaseInsensitiveDict(response.headers)
+    result.url = str(response.url)
+    result.encoding = get_encoding_from_headers(result.headers)
+    result._content = body
+    return result
+
+
+async def fetch_url_metadata(session, url, limit, host_limits):
+    """
+    Fetch and parse the metadata of one URL, within the global and per-host limits
+
+    Args:
+        session: aiohttp.ClientSession
+        url: Page URL
+        limit: Semaphore bounding all requests in flight
+        host_limits: Semaphore per host name
+
+    Returns:
+        dict: Same as MetadataExtractor.extract_url_metadata
+    """
+    import aiohttp
+
+    url = normalize_url(url)
+    try:
+        async with limit, host_limits[_host(url)]:
+            # requests follows up to 30 redirects, aiohttp only 10 by default
+            async with session.get(url, headers=URL_METADATA_HEADERS, max_redirects=DEFAULT_REDIRECT_LIMIT) as response:
+                result = _as_requests_response(response, await response.read())
+        result.raise_for_status()
+    except (aiohttp.ClientError, asyncio.TimeoutError, requests.exceptions.RequestException) as e:
+        logger.error(f"Error extracting URL metadata: {e!r}")
+        return {'error': url_metadata_error(url, _as_requests_error(e)), 'url': url}
+
+    # Parse in a thread, so the event loop keeps the other requests moving
+    return await asyncio.to_thread(parse_url_metadata, url, result.text)
+
+
+async def fetch_many_url_metadata(urls, concurrency, per_host):
+    """Fetch the metadata of all URLs over one aiohttp session"""
+    import aiohttp
+
+    limit = asyncio.Semaphore(concurrency)
+    host_limits = defaultdict(lambda: asyncio.Semaphore(per_host))
+    # Same connect and per-read timeouts as requests' timeout=URL_METADATA_TIMEOUT;
+    # trust_env honours HTTP(S)_PROXY like requests does
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=URL_METADATA_TIMEOUT, sock_read=URL_METADATA_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector, trust_env=True) as session:
+        return await asyncio.gather(*(fetch_url_metadata(session, url, limit, host_limits) for url in urls))
+
+
+def _extract_many_with_threads(urls, concurrency, per_host):
+    """Fallback without aiohttp: the blocking fetcher on a thread pool, with the same limits"""
+    extractor = MetadataExtractor()
+    host_limits = defaultdict(lambda: threading.BoundedSemaphore(per_host))
+    host_limits_lock = threading.Lock()
+
+    def extract(url):
+        with host_limits_lock:
+            host_limit = host_limits[_host(normalize_url(url))]
+        with host_limit:
+            return extractor.extract_url_metadata(url)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(extract, urls))
+
+
+def extract_many_url_metadata(urls, concurrency=None, per_host=None):
+    """
+    Extract the Open Graph/Twitter Card metadata of many URLs concurrently
+
+    Uses asyncio and aiohttp when installed, otherwise a thread pool. Either way the
+    results are exactly what extract_url_metadata returns for each URL. Call it from
+    synchronous code only; it runs its own event loop.
+
+    Args:
+        urls: Page URLs
+        concurrency: Requests in flight at once, defaults to URL_METADATA_CONCURRENCY
+        per_host: Requests in flight per host, defaults to URL_METADATA_PER_HOST
+
+    Returns:
+        list: One metadata dict per URL, in the order given
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+    concurrency = concurrency or settings.URL_METADATA_CONCURRENCY
+    per_host = per_host or settings.URL_METADATA_PER_HOST
+
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        logger.info("aiohttp is not installed, fetching URL metadata with threads")
+        return _extract_many_with_threads(urls, min(concurrency, len(urls)), per_host)
+
+    return asyncio.run(fetch_many_url_metadata(urls, concurrency, per_host))
@@ -0,0 +1,113 @@
+import time
+import logging
+from multiprocessing.util import Finalize
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Failure reasons after which the worker's browser is restarted before the next post
+BROWSER_RESTART_REASONS = {'driver_init', 'browser_error', 'browser_timeout'}
+
+# State of a bulk download worker process
+_worker = {}
+
+
+def init_worker(email='', password='', postprocess=False):
+    """
+    Set up a process pool worker: Django, and one browser reused for all its posts
+
+    The pool uses the spawn start method, so each worker starts from a fresh
+    interpreter instead of a fork of the parent's database connections and threads.
+
+    Args:
+        email: Optional LinkedIn account email, logged in once per browser
+        password: Optional LinkedIn account password
+        postprocess: Run post-processing in the worker after each download
+    """
+    import django
+    django.setup()
+
+    from .linkedin_downloader import LinkedInDownloader
+
+    _worker.update(
+        downloader=LinkedInDownloader(headless=True, timeout=15),
+        email=email, password=password, postprocess=postprocess, logged_in=False,
+    )
+    # multiprocessing runs finalizers, not atexit hooks, when a pool worker exits
+    Finalize(None, _close_browser, exitpriority=10)
+
+
+def _close_browser():
+    downloader = _worker.get('downloader')
+    if downloader:
+        downloader.close()
+
+
+def _ensure_browser():
+    """Launch the worker's browser and log it in, if not done yet"""
+    downloader = _worker['downloader']
+    if downloader.driver:
+        return
+    _worker['logged_in'] = False
+    if downloader.setup_driver() and _worker['email'] and _worker['password']:
+        _worker['logged_in'] = downloader.login_to_linkedin(_worker['email'], _worker['password'])
+        if not _worker['logged_in']:
+            logger.warning("LinkedIn login failed, continuing without it")
+
+
+def download_post(post_url, skip_existing=True):
+    """
+    Download one post in a bulk download worker, through the same path as the Celery task
+
+    Args:
+        post_url: LinkedIn post URL
+        skip_existing: Don't download posts that already have a completed video with its file
+
+    Returns:
+        dict: Result line for the NDJSON output
+    """
+    from ..models import LinkedInVideo
+    from ..tasks import process_video, postprocess_video
+    from .failures import classify_failure
+    from .linkedin_urls import canonical_post_key
+    from .persistence import VideoJobRecorder
+
+    started = time.monotonic()
+    result = {'post_url': post_url}
+
+    if skip_existing:
+        # Videos whose file the retention policy evicted are downloaded again
+        existing = (
+            LinkedInVideo.objects
+            .filter(post_key=canonical_post_key(post_url), status='completed', file_evicted_at__isnull=True)
+            .exclude(video_file='').exclude(video_file__isnull=True)
+            .values_list('id', flat=True).first()
+        )
+        if existing:
+            result.update(status='skipped', video_id=str(existing), seconds=0.0)
+            return result
+
+    # queued_at keeps dispatch_pending_downloads from also sending it to Celery
+    video_obj = LinkedInVideo.objects.create(
+        post_url=post_url, priority='bulk', client_key='bulk_download', queued_at=timezone.now()
+    )
+    result['video_id'] = str(video_obj.id)
+    recorder = VideoJobRecorder(video_obj)
+    recorder.mark_processing()
+
+    try:
+        _ensure_browser()
+        process_video(recorder, _worker['downloader'])
+    except Exception as e:
+        failure = classify_failure(e)
+        recorder.fail(str(e))
+        if failure.reason in BROWSER_RESTART_REASONS:
+            _close_browser()
+        result.update(status='failed', reason=failure.reason, error=str(e))
+    else:
+        result.update(status='completed', file_size_mb=video_obj.file_size, title=video_obj.title)
+        if _worker['postprocess']:
+            postprocess_video(str(video_obj.id))
+
+    result['seconds'] = round(time.monotonic() - started, 3)
+    return result
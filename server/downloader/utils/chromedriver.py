@@ -0,0 +1,131 @@
+import os
+import re
+import shutil
+import logging
+import subprocess
+import threading
+import time
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+VERSION_PATTERN = re.compile(r'(\d+)\.(\d+)\.(\d+)\.(\d+)')
+CHROME_BINARY_NAMES = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome')
+VERSION_TIMEOUT = 10
+
+_lock = threading.Lock()
+_resolved = None
+_failure = None
+_failed_at = None
+
+
+class ChromeDriverError(Exception):
+    """Raised when no usable ChromeDriver could be found"""
+
+
+def _binary_version(path):
+    """Return the dotted version a binary prints for --version, or None"""
+    try:
+        result = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=VERSION_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    match = VERSION_PATTERN.search(result.stdout)
+    return match.group(0) if match else None
+
+
+def _find_chrome_binary():
+    if settings.CHROME_BINARY:
+        return settings.CHROME_BINARY
+    for name in CHROME_BINARY_NAMES:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def _find_driver():
+    """
+    Locate the ChromeDriver executable without touching the network unless allowed to
+
+    Returns:
+        tuple: (path, where it came from)
+    """
+    if settings.CHROMEDRIVER_PATH:
+        if not os.access(settings.CHROMEDRIVER_PATH, os.X_OK):
+            raise ChromeDriverError(f"CHROMEDRIVER_PATH {settings.CHROMEDRIVER_PATH} is not an executable file")
+        return settings.CHROMEDRIVER_PATH, 'settings'
+
+    path = shutil.which('chromedriver')
+    if path:
+        return path, 'PATH'
+
+    if not settings.CHROMEDRIVER_AUTO_INSTALL:
+        raise ChromeDriverError(
+            "No chromedriver on PATH and CHROMEDRIVER_AUTO_INSTALL is off; "
+            "install one and set CHROMEDRIVER_PATH"
+        )
+
+    # webdriver-manager discovers the matching version online, then reuses its download cache
+    from webdriver_manager.chrome import ChromeDriverManager
+    try:
+        return ChromeDriverManager().install(), 'webdriver-manager'
+    except Exception as e:
+        raise ChromeDriverError(f"webdriver-manager could not install ChromeDriver: {e}")
+
+
+def resolve_chromedriver(refresh=False):
+    """
+    Resolve the ChromeDriver and Chrome versions once per process
+
+    The result is cached, so browser launches never repeat version discovery.
+    Failures are only cached for CHROMEDRIVER_RETRY_AFTER seconds, so a transient
+    webdriver-manager or network error at boot doesn't disable browser tasks until
+    the worker restarts. Worker processes resolve it at boot (see linkedin_api.celery).
+
+    Args:
+        refresh: Resolve again instead of using the cached result
+
+    Returns:
+        dict: path, source, driver_version, chrome_binary and chrome_version
+
+    Raises:
+        ChromeDriverError: If no usable driver was found, or it doesn't match Chrome
+    """
+    global _resolved, _failure, _failed_at
+
+    with _lock:
+        if not refresh:
+            if _resolved:
+                return _resolved
+            if _failure and time.monotonic() - _failed_at < settings.CHROMEDRIVER_RETRY_AFTER:
+                raise _failure
+
+        try:
+            path, source = _find_driver()
+            driver_version = _binary_version(path)
+            if not driver_version:
+                raise ChromeDriverError(f"ChromeDriver at {path} did not report a version")
+
+            chrome_binary = _find_chrome_binary()
+            chrome_version = _binary_version(chrome_binary) if chrome_binary else None
+            if chrome_version and chrome_version.split('.')[0] != driver_version.split('.')[0]:
+                raise ChromeDriverError(
+                    f"ChromeDriver {driver_version} at {path} does not match Chrome {chrome_version} at {chrome_binary}"
+                )
+        except ChromeDriverError as e:
+            _resolved, _failure, _failed_at = None, e, time.monotonic()
+            raise
+
+        _resolved = {
+            'path': path,
+            'source': source,
+            'driver_version': driver_version,
+            'chrome_binary': chrome_binary,
+            'chrome_version': chrome_version,
+        }
+        _failure = _failed_at = None
+        logger.info(
+            f"Using ChromeDriver {driver_version} from {path} ({source}), "
+            f"Chrome {chrome_version or 'version unknown'}"
+        )
+        return _resolved
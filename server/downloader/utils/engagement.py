@@ -0,0 +1,97 @@
+import re
+from datetime import timedelta
+from django.utils import timezone
+
+COUNT_PATTERN = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*([KkMm])?\b')
+COUNT_MULTIPLIERS = {'k': 1_000, 'm': 1_000_000}
+
+# LinkedIn shows post age as "45m", "3h", "2w •", "5mo", "1yr" or "2 weeks ago"
+AGE_PATTERN = re.compile(
+    r'(\d+)\s*(mo|months?|yrs?|years?|y|w|wks?|weeks?|d|days?|h|hrs?|hours?|m|mins?|minutes?|s|secs?|seconds?)\b',
+    re.IGNORECASE
+)
+AGE_UNITS = {
+    'mo': timedelta(days=30),
+    'y': timedelta(days=365),
+    'w': timedelta(weeks=1),
+    'd': timedelta(days=1),
+    'h': timedelta(hours=1),
+    'm': timedelta(minutes=1),
+    's': timedelta(seconds=1),
+}
+
+
+def parse_count(text):
+    """
+    Parse a LinkedIn engagement count ("1,234", "1.2K", "45 comments")
+
+    Returns:
+        int or None: The count, or None when the text has no number
+    """
+    if not text:
+        return None
+
+    match = COUNT_PATTERN.search(text)
+    if not match:
+        return None
+
+    number, suffix = match.groups()
+    value = float(number.replace(',', ''))
+    if suffix:
+        value *= COUNT_MULTIPLIERS[suffix.lower()]
+    return int(round(value))
+
+
+def parse_post_age(text, reference=None):
+    """
+    Turn a relative LinkedIn post age ("2w •", "3 days ago") into an approximate timestamp
+
+    Args:
+        text: Display string scraped from the post
+        reference: When the string was scraped, defaults to now
+
+    Returns:
+        datetime or None: Approximate publish time
+    """
+    if not text:
+        return None
+
+    match = AGE_PATTERN.search(text)
+    if not match:
+        return None
+
+    amount, unit = match.groups()
+    unit = unit.lower()
+    if unit.startswith('mo'):
+        step = AGE_UNITS['mo']
+    elif unit.startswith('mi'):
+        step = AGE_UNITS['m']
+    else:
+        step = AGE_UNITS[unit[0]]
+
+    return (reference or timezone.now()) - int(amount) * step
+
+
+def apply_engagement_values(metadata_obj, reference=None):
+    """
+    Fill the typed engagement columns of a VideoMetadata from its display strings
+
+    Args:
+        metadata_obj: VideoMetadata instance
+        reference: When the display strings were scraped, defaults to now
+
+    Returns:
+        list: Names of the fields whose value changed
+    """
+    values = {
+        'num_likes': parse_count(metadata_obj.likes_count),
+        'num_comments': parse_count(metadata_obj.comments_count),
+        'published_at': parse_post_age(metadata_obj.published_date, reference),
+    }
+
+    changed_fields = []
+    for field, value in values.items():
+        if getattr(metadata_obj, field) != value:
+            setattr(metadata_obj, field, value)
+            changed_fields.append(field)
+    return changed_fields
@@ -0,0 +1,130 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from ..models import EngagementSnapshot, LinkedInVideo, VideoMetadata
+from .engagement import parse_count
+from .failures import classify_failure, linkedin_breaker
+from .linkedin_downloader import LinkedInDownloader
+from .metadata_extractor import MetadataExtractor
+from .metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+ENGAGEMENT_FIELDS = ('likes_count', 'comments_count', 'num_likes', 'num_comments')
+
+
+def due_for_refresh(now=None):
+    """Tracked videos not refreshed within ENGAGEMENT_REFRESH_INTERVAL, least recently refreshed first"""
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.ENGAGEMENT_REFRESH_INTERVAL)
+    return (
+        LinkedInVideo.objects
+        .filter(is_tracked=True)
+        .filter(Q(engagement_refreshed_at__isnull=True) | Q(engagement_refreshed_at__lt=cutoff))
+        .select_related('metadata')
+        .annotate(has_snapshots=Exists(EngagementSnapshot.objects.filter(video=OuterRef('pk'))))
+        .only('id', 'post_url', 'engagement_refreshed_at', *[f'metadata__{field}' for field in ENGAGEMENT_FIELDS])
+        .order_by('engagement_refreshed_at', 'created_at')
+    )
+
+
+def apply_counts(metadata_obj, likes_count, comments_count):
+    """
+    Update the engagement fields of a VideoMetadata, leaving counts that couldn't be scraped alone
+
+    Returns:
+        list: Names of the fields whose value changed
+    """
+    values = {}
+    if likes_count:
+        values['likes_count'] = likes_count
+        values['num_likes'] = parse_count(likes_count)
+    if comments_count:
+        values['comments_count'] = comments_count
+        values['num_comments'] = parse_count(comments_count)
+
+    changed_fields = []
+    for field, value in values.items():
+        if getattr(metadata_obj, field) != value:
+            setattr(metadata_obj, field, value)
+            changed_fields.append(field)
+    return changed_fields
+
+
+def refresh_tracked_engagement(limit=None):
+    """
+    Re-scrape the likes and comments of tracked posts, without downloading their video
+
+    One browser loads every post of the batch. Only engagement fields that changed are
+    written, and a snapshot is added to the time series when the counts changed (or
+    for the first refresh of a post).
+
+    Args:
+        limit: Maximum number of posts, defaults to ENGAGEMENT_REFRESH_BATCH
+
+    Returns:
+        dict: Number of posts refreshed, changed and failed
+    """
+    videos = list(due_for_refresh()[:limit or settings.ENGAGEMENT_REFRESH_BATCH])
+    result = {'refreshed': 0, 'changed': 0, 'failed': 0}
+    if not videos:
+        return result
+
+    downloader = LinkedInDownloader(headless=True, timeout=15)
+    extractor = MetadataExtractor()
+    refreshed_ids = []
+    snapshots = []
+
+    try:
+        for video in videos:
+            if linkedin_breaker.retry_after():
+                logger.warning("LinkedIn circuit is open, stopping the engagement refresh")
+                break
+
+            with stage_timer('engagement_refresh') as stage:
+                if not downloader.load_post(video.post_url):
+                    result['failed'] += 1
+                    if not downloader.driver:
+                        stage.fail('driver_init')
+                        break
+                    failure = classify_failure(downloader.last_error)
+                    stage.fail(failure.reason)
+                    if failure.counts_against_linkedin:
+                        linkedin_breaker.record_failure()
+                    continue
+                post_metadata = extractor.extract_post_metadata(downloader.driver, video.post_url)
+                linkedin_breaker.record_success()
+
+            now = timezone.now()
+            refreshed_ids.append(video.id)
+            result['refreshed'] += 1
+
+            metadata_obj = getattr(video, 'metadata', None)
+            if metadata_obj is None:
+                metadata_obj = VideoMetadata(video=video)
+            changed_fields = apply_counts(metadata_obj, post_metadata.get('likes_count'), post_metadata.get('comments_count'))
+            if not changed_fields and video.has_snapshots:
+                continue
+
+            if changed_fields:
+                result['changed'] += 1
+                if metadata_obj.pk:
+                    metadata_obj.save(update_fields=changed_fields)
+                else:
+                    metadata_obj.save()
+            if metadata_obj.num_likes is not None or metadata_obj.num_comments is not None:
+                snapshots.append(EngagementSnapshot(
+                    video=video, captured_at=now,
+                    num_likes=metadata_obj.num_likes, num_comments=metadata_obj.num_comments
+                ))
+    finally:
+        downloader.close()
+        with transaction.atomic():
+            EngagementSnapshot.objects.bulk_create(snapshots)
+            LinkedInVideo.objects.filter(id__in=refreshed_ids).update(engagement_refreshed_at=timezone.now())
+
+    logger.info(f"Engagement refresh: {result}")
+    return result
@@ -0,0 +1,195 @@
+import random
+import time
+import logging
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying; every other 4xx means the request itself is wrong
+TRANSIENT_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# Selenium errors that mean the page doesn't look like the scraper expects, or the
+# scraper called WebDriver wrongly; a retry would only hit them again
+PERMANENT_SELENIUM_ERRORS = {
+    'NoSuchElementException': 'page_changed',
+    'NoSuchAttributeException': 'page_changed',
+    'InvalidSelectorException': 'page_changed',
+    'ElementNotInteractableException': 'page_changed',
+    'InvalidArgumentException': 'browser_invalid_argument',
+}
+
+# Failure reasons that say LinkedIn or its CDN is struggling, which trip the circuit breaker
+LINKEDIN_FAILURE_REASONS = {'rate_limited', 'server_error', 'timeout', 'connection_error', 'browser_timeout'}
+
+
+class JobFailure(Exception):
+    """
+    A failed job, with the reason it is reported under and whether retrying can help
+
+    Args:
+        message: Error message stored on the video
+        reason: Short failure class, e.g. 'rate_limited' or 'no_video'
+        transient: Whether the same job may succeed later
+        retry_after: Seconds the remote side asked us to wait, if it did
+    """
+
+    def __init__(self, message, reason, transient=False, retry_after=None):
+        super().__init__(message)
+        self.reason = reason
+        self.transient = transient
+        self.retry_after = retry_after
+
+    @property
+    def counts_against_linkedin(self):
+        return self.reason in LINKEDIN_FAILURE_REASONS
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of starting browser work while LinkedIn's error rate is too high"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"LinkedIn is failing too often, browser work is paused for {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def _retry_after_header(response):
+    try:
+        return float(response.headers.get('Retry-After', ''))
+    except ValueError:
+        return None
+
+
+def classify_failure(error):
+    """
+    Decide whether an exception is worth retrying
+
+    Args:
+        error: Exception raised or swallowed by the job
+
+    Returns:
+        JobFailure: The error with its reason and transient flag
+    """
+    if isinstance(error, JobFailure):
+        return error
+
+    message = str(error)
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        code = error.response.status_code
+        if code == 429:
+            return JobFailure(message, 'rate_limited', transient=True, retry_after=_retry_after_header(error.response))
+        if code in TRANSIENT_STATUS_CODES or code >= 500:
+            return JobFailure(message, 'server_error', transient=True, retry_after=_retry_after_header(error.response))
+        return JobFailure(message, f'http_{code}')
+    if isinstance(error, requests.exceptions.Timeout):
+        return JobFailure(message, 'timeout', transient=True)
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return JobFailure(message, 'connection_error', transient=True)
+
+    # Selenium is only loaded by browser workers, so match its exceptions by module
+    error_type = type(error)
+    if error_type.__module__.startswith('selenium.'):
+        if error_type.__name__ == 'TimeoutException':
+            return JobFailure(message, 'browser_timeout', transient=True)
+        if error_type.__name__ in PERMANENT_SELENIUM_ERRORS:
+            return JobFailure(message, PERMANENT_SELENIUM_ERRORS[error_type.__name__])
+        return JobFailure(message, 'browser_error', transient=True)
+
+    return JobFailure(message, error_type.__name__)
+
+
+def failure_from(error, message, reason):
+    """
+    Build the failure of an operation that reported failure instead of raising
+
+    Args:
+        error: The exception the operation swallowed, or None
+        message: What failed
+        reason: Reason to use when there is no exception to classify
+
+    Returns:
+        JobFailure
+    """
+    if error is None:
+        return JobFailure(message, reason)
+    failure = classify_failure(error)
+    return JobFailure(f"{message}: {error}", failure.reason, failure.transient, failure.retry_after)
+
+
+def retry_delay(attempt, retry_after=None):
+    """
+    Seconds to wait before retrying, growing exponentially with the attempt number
+
+    Half of the delay is random, so jobs that failed together don't retry together.
+
+    Args:
+        attempt: Number of attempts made so far, starting at 1
+        retry_after: Minimum delay requested by the remote side
+
+    Returns:
+        float: Delay in seconds
+    """
+    ceiling = min(settings.DOWNLOAD_RETRY_BACKOFF * 2 ** (attempt - 1), settings.DOWNLOAD_RETRY_BACKOFF_MAX)
+    delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+    return max(delay, retry_after or 0)
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker shared by every process through the Django cache
+
+    Outcomes are counted in fixed windows of LINKEDIN_BREAKER_WINDOW seconds. Once a
+    window has LINKEDIN_BREAKER_MIN_REQUESTS outcomes and at least
+    LINKEDIN_BREAKER_FAILURE_RATIO of them failed, the circuit opens for
+    LINKEDIN_BREAKER_COOLDOWN seconds. A failure right after it closes again, while
+    the window still looks bad, opens it again.
+
+    Args:
+        name: Name of the protected dependency, part of the cache keys
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def _key(self, suffix):
+        return f'circuit:{self.name}:{suffix}'
+
+    def _count(self, suffix):
+        key = self._key(suffix)
+        cache.add(key, 0, timeout=settings.LINKEDIN_BREAKER_WINDOW * 2)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.add(key, 1, timeout=settings.LINKEDIN_BREAKER_WINDOW * 2)
+            return 1
+
+    def retry_after(self):
+        """Seconds until the circuit closes, 0 when it is closed"""
+        open_until = cache.get(self._key('open-until'))
+        return max(open_until - time.time(), 0) if open_until else 0
+
+    def raise_if_open(self):
+        retry_after = self.retry_after()
+        if retry_after:
+            raise CircuitOpenError(retry_after)
+
+    def record_success(self):
+        window = int(time.time() // settings.LINKEDIN_BREAKER_WINDOW)
+        self._count(f'{window}:total')
+
+    def record_failure(self):
+        window = int(time.time() // settings.LINKEDIN_BREAKER_WINDOW)
+        total = self._count(f'{window}:total')
+        failed = self._count(f'{window}:failed')
+        if total >= settings.LINKEDIN_BREAKER_MIN_REQUESTS and failed / total >= settings.LINKEDIN_BREAKER_FAILURE_RATIO:
+            self.trip()
+
+    def trip(self):
+        cooldown = settings.LINKEDIN_BREAKER_COOLDOWN
+        if cache.add(self._key('open-until'), time.time() + cooldown, timeout=cooldown):
+            logger.warning(f"Circuit {self.name} opened for {cooldown}s after too many failures")
+
+
+linkedin_breaker = CircuitBreaker('linkedin')
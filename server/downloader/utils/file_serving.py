@@ -0,0 +1,168 @@
+import os
+import re
+import logging
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+logger = logging.getLogger(__name__)
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class UnsatisfiableRange(Exception):
+    """Raised when a Range header does not overlap the file"""
+
+
+class RangeFile:
+    """
+    File wrapper that streams at most `length` bytes from `start`
+
+    It keeps exposing fileno() so WSGI servers with wsgi.file_wrapper (gunicorn, uwsgi)
+    can hand the response to sendfile() instead of copying it through Python.
+    """
+
+    def __init__(self, file_obj, start, length):
+        self.file_obj = file_obj
+        self.remaining = length
+        self.file_obj.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file_obj.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file_obj.fileno()
+
+    def close(self):
+        self.file_obj.close()
+
+
+def parse_range_header(header, size):
+    """
+    Parse a single byte range from a Range header
+
+    Args:
+        header: Value of the Range header
+        size: Size of the file in bytes
+
+    Returns:
+        tuple or None: Inclusive (start, end), or None to serve the whole file
+    """
+    match = RANGE_PATTERN.match(header.strip()) if header else None
+    if not match:
+        # Multi-range and malformed requests fall back to a full response
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise UnsatisfiableRange()
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise UnsatisfiableRange()
+    return start, min(end, size - 1)
+
+
+def _etag(stat):
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def _range_applies(request, etag, last_modified):
+    """Check If-Range so a client resuming a changed file gets the whole new file"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def serve_file(request, path, name, content_type='video/mp4'):
+    """
+    Serve a local media file with conditional request and byte range support
+
+    Depending on VIDEO_SERVE_MODE the bytes are either streamed by the WSGI server
+    (zero-copy with sendfile where available) or offloaded to the front-end web
+    server with X-Accel-Redirect (nginx) or X-Sendfile (Apache, lighttpd).
+
+    Args:
+        request: The incoming HttpRequest
+        path: Absolute path of the file on disk
+        name: Path of the file relative to MEDIA_ROOT
+        content_type: MIME type of the file
+
+    Returns:
+        HttpResponse
+    """
+    serve_mode = settings.VIDEO_SERVE_MODE
+
+    if serve_mode == 'x-accel-redirect':
+        # nginx handles ranges and conditional requests for internal locations itself
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.VIDEO_ACCEL_REDIRECT_PREFIX + name
+        return response
+
+    if serve_mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return response
+
+    stat = os.stat(path)
+    etag = _etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    # 304 Not Modified / 412 Precondition Failed
+    conditional_response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if conditional_response is not None:
+        conditional_response['Accept-Ranges'] = 'bytes'
+        return conditional_response
+
+    size = stat.st_size
+    start, end = 0, size - 1
+    status_code = 200
+    if size and _range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range_header(request.headers.get('Range'), size)
+        except UnsatisfiableRange:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            response['Accept-Ranges'] = 'bytes'
+            return response
+        if byte_range:
+            start, end = byte_range
+            status_code = 206
+    length = end - start + 1 if size else 0
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type, status=status_code)
+    else:
+        response = FileResponse(
+            RangeFile(open(path, 'rb'), start, length),
+            content_type=content_type,
+            status=status_code
+        )
+
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if status_code == 206:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
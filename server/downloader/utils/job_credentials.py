@@ -0,0 +1,40 @@
+import secrets
+from django.conf import settings
+from django.core.cache import cache
+
+# Task arguments end up in the broker, the result backend and worker logs, so queued
+# jobs only carry a token and read the credentials it stands for from the cache
+CREDENTIALS_KEY = 'job-credentials:{}'
+
+
+def store_job_credentials(linkedin_email, linkedin_password):
+    """
+    Keep LinkedIn credentials for a queued job for JOB_CREDENTIALS_TTL seconds
+
+    Args:
+        linkedin_email: LinkedIn account email
+        linkedin_password: LinkedIn account password
+
+    Returns:
+        str: Token to pass to the job instead of the credentials
+    """
+    token = secrets.token_urlsafe(32)
+    cache.set(
+        CREDENTIALS_KEY.format(token),
+        {'email': linkedin_email, 'password': linkedin_password},
+        timeout=settings.JOB_CREDENTIALS_TTL
+    )
+    return token
+
+
+def take_job_credentials(token):
+    """
+    Read the credentials stored under a token and forget them, so they are used once
+
+    Returns:
+        dict or None: email and password, None once expired or already taken
+    """
+    key = CREDENTIALS_KEY.format(token)
+    credentials = cache.get(key)
+    cache.delete(key)
+    return credentials
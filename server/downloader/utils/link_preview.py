@@ -0,0 +1,284 @@
+import io
+import os
+import socket
+import contextlib
+import hashlib
+import logging
+import ipaddress
+import tempfile
+import urllib.parse
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import cache
+from .metadata_extractor import URL_METADATA_HEADERS, URL_METADATA_TIMEOUT, normalize_url, parse_url_metadata
+from .metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_KEY = 'link-preview:{}'
+# Downscaled preview images, under MEDIA_ROOT so every VIDEO_SERVE_MODE can serve them
+PREVIEW_IMAGE_DIR = 'link_previews'
+MAX_REDIRECTS = 3
+
+try:
+    from PIL import Image, ImageOps
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+
+class PreviewURLError(ValueError):
+    """Raised for URLs the server won't fetch"""
+
+
+def check_preview_url(url):
+    """
+    Make sure a URL may be fetched for a preview
+
+    The endpoint fetches URLs for anonymous clients, so hosts that resolve to
+    private, loopback or link-local addresses are refused unless
+    LINK_PREVIEW_ALLOW_PRIVATE_HOSTS is set.
+
+    Returns:
+        str or None: The checked address to connect to, or None when private hosts are allowed
+
+    Raises:
+        PreviewURLError: If the URL is not http(s) or its host is not public
+    """
+    parsed_url = urllib.parse.urlsplit(url)
+    try:
+        port = parsed_url.port
+    except ValueError:
+        raise PreviewURLError("URL has an invalid port")
+    if parsed_url.scheme not in ('http', 'https') or not parsed_url.hostname:
+        raise PreviewURLError("URL must be an http or https URL")
+    if settings.LINK_PREVIEW_ALLOW_PRIVATE_HOSTS:
+        return None
+
+    try:
+        addresses = socket.getaddrinfo(parsed_url.hostname, port or 443, proto=socket.IPPROTO_TCP)
+    except socket.gaierror as e:
+        raise PreviewURLError(f"Could not resolve {parsed_url.hostname}: {e}")
+    if not addresses:
+        raise PreviewURLError(f"Could not resolve {parsed_url.hostname}")
+    for address in addresses:
+        if not ipaddress.ip_address(address[4][0].split('%')[0]).is_global:
+            raise PreviewURLError("URL must point to a public host")
+    return addresses[0][4][0]
+
+
+class PinnedHostAdapter(HTTPAdapter):
+    """
+    HTTPS adapter for URLs whose host was replaced by its checked address
+
+    TLS still sends and verifies the original host name, so the connection goes
+    to the address check_preview_url approved without weakening certificate checks.
+    """
+
+    def __init__(self, hostname, **kwargs):
+        self.hostname = hostname
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, server_hostname=self.hostname, assert_hostname=self.hostname, **kwargs)
+
+
+@contextlib.contextmanager
+def _open(url):
+    """
+    Start a streamed GET of a preview URL, without following redirects
+
+    The host is resolved and checked once, and the request connects to that
+    address, so a DNS answer that changes between the check and the connection
+    (DNS rebinding) can't point it at a private host.
+    """
+    address = check_preview_url(url)
+    headers = dict(URL_METADATA_HEADERS)
+    with requests.Session() as session:
+        if address is not None:
+            # A proxy from the environment would resolve the host again on its own
+            session.trust_env = False
+            parsed_url = urllib.parse.urlsplit(url)
+            host = f'[{address}]' if ':' in address else address
+            port = f':{parsed_url.port}' if parsed_url.port else ''
+            hostname = f'[{parsed_url.hostname}]' if ':' in parsed_url.hostname else parsed_url.hostname
+            headers['Host'] = hostname + port
+            session.mount('https://', PinnedHostAdapter(parsed_url.hostname))
+            url = urllib.parse.urlunsplit(parsed_url._replace(netloc=host + port))
+        with session.get(url, headers=headers, timeout=URL_METADATA_TIMEOUT, stream=True, allow_redirects=False) as response:
+            yield response
+
+
+def _fetch(url, max_bytes):
+    """
+    Download a URL for a preview, checking every redirect target and capping the size
+
+    Returns:
+        tuple: (URL the body came from, response, body bytes)
+
+    Raises:
+        PreviewURLError: If the URL or a redirect target may not be fetched
+        ValueError: If the body is larger than max_bytes, or there are too many redirects
+        requests.RequestException: If the request failed
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        with _open(url) as response:
+            if response.is_redirect:
+                url = urllib.parse.urljoin(url, response.headers['location'])
+                continue
+            response.raise_for_status()
+
+            content_length = response.headers.get('content-length', '')
+            if content_length.isdigit() and int(content_length) > max_bytes:
+                raise ValueError(f"Response is larger than {max_bytes} bytes")
+            # Counted after decompression, so a small gzip body can't expand past the cap
+            data = bytearray()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                data.extend(chunk)
+                if len(data) > max_bytes:
+                    raise ValueError(f"Response is larger than {max_bytes} bytes")
+            return url, response, bytes(data)
+    raise ValueError("Too many redirects")
+
+
+def preview_cache_key(url):
+    return PREVIEW_KEY.format(hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+
+def preview_image_path(name):
+    """Absolute path of a stored preview image, from its file name"""
+    return os.path.join(settings.MEDIA_ROOT, PREVIEW_IMAGE_DIR, name)
+
+
+def compact_preview(url_metadata):
+    """Reduce an extract_url_metadata result to what a preview card shows"""
+    open_graph = url_metadata.get('open_graph') or {}
+    twitter_card = url_metadata.get('twitter_card') or {}
+    return {
+        'url': url_metadata['url'],
+        'title': open_graph.get('title') or twitter_card.get('title') or url_metadata.get('title') or '',
+        'description': (
+            open_graph.get('description') or twitter_card.get('description') or url_metadata.get('description') or ''
+        ),
+        'image': open_graph.get('image') or twitter_card.get('image') or '',
+        'site_name': open_graph.get('site_name') or '',
+        'type': open_graph.get('type') or '',
+    }
+
+
+def _fetch_image(url):
+    """Download an image, checking every redirect target and capping the size"""
+    _, _, data = _fetch(url, settings.LINK_PREVIEW_IMAGE_MAX_BYTES)
+    return data
+
+
+def downscale_image(data):
+    """
+    Shrink an image to fit LINK_PREVIEW_IMAGE_SIZE pixels and encode it as JPEG
+
+    Returns:
+        bytes: JPEG data
+    """
+    size = settings.LINK_PREVIEW_IMAGE_SIZE
+    with Image.open(io.BytesIO(data)) as image:
+        # JPEGs are decoded at the smallest scale that still covers the target size
+        image.draft('RGB', (size, size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        output = io.BytesIO()
+        image.save(output, 'JPEG', quality=settings.LINK_PREVIEW_IMAGE_QUALITY, optimize=True, progressive=True)
+        return output.getvalue()
+
+
+def store_preview_image(image_url):
+    """
+    Downscale the image of a preview into the local preview image store
+
+    Images are named by the hash of their URL, so previews sharing an image
+    share its file.
+
+    Returns:
+        str or None: File name of the stored image, or None if it couldn't be stored
+    """
+    name = f"{hashlib.sha256(image_url.encode('utf-8')).hexdigest()}.jpg"
+    path = preview_image_path(name)
+    try:
+        # Already stored for another preview: mark it fresh for the retention task
+        os.utime(path)
+        return name
+    except FileNotFoundError:
+        pass
+
+    try:
+        data = downscale_image(_fetch_image(image_url))
+    except Exception as e:
+        logger.warning(f"Could not store preview image {image_url}: {e}")
+        return None
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return name
+
+
+def get_link_preview(url):
+    """
+    Return the compact preview of a URL, from the shared cache when possible
+
+    Args:
+        url: Page URL, with or without scheme
+
+    Returns:
+        tuple: (preview dict, whether it came from the cache). The preview has
+        url, title, description, image, site_name and type, plus image_file when
+        the image is stored locally, or only url and error when the page
+        couldn't be fetched.
+
+    Raises:
+        PreviewURLError: If the URL may not be fetched
+    """
+    url = normalize_url(url)
+    key = preview_cache_key(url)
+    preview = cache.get(key)
+    if preview is not None:
+        return preview, True
+
+    check_preview_url(url)
+    with stage_timer('link_preview') as stage:
+        try:
+            page_url, response, body = _fetch(url, settings.LINK_PREVIEW_PAGE_MAX_BYTES)
+        except (requests.RequestException, ValueError) as e:
+            # Includes redirects to hosts check_preview_url refuses
+            logger.warning(f"Could not fetch {url} for a preview: {e}")
+            stage.fail('fetch_error')
+            preview = {'url': url, 'error': str(e)}
+            cache.set(key, preview, timeout=settings.LINK_PREVIEW_ERROR_TTL)
+            return preview, False
+
+        preview = compact_preview(parse_url_metadata(url, body.decode(response.encoding or 'utf-8', errors='replace')))
+        if preview['image']:
+            preview['image'] = urllib.parse.urljoin(page_url, preview['image'])
+            # Without Pillow, or if the image can't be fetched, clients load the original
+            if PILLOW_AVAILABLE:
+                image_file = store_preview_image(preview['image'])
+                if image_file:
+                    preview['image_file'] = image_file
+
+    cache.set(key, preview, timeout=settings.LINK_PREVIEW_CACHE_TTL)
+    return preview, False
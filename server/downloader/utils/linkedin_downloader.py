@@ -1,16 +1,12 @@
 import os
 import time
 import requests
-import re
-import json
 import logging
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from django.conf import settings
+from .chromedriver import ChromeDriverError, resolve_chromedriver
+from .metadata_extractor import POST_SELECTORS
+from .metrics import BROWSERS_ACTIVE, record_downloaded_bytes
+from .video_variants import make_variant, merge_variants, parse_page_variants, select_variant
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -23,9 +19,24 @@ class LinkedInDownloader:
         self.headless = headless
         self.timeout = timeout
         self.driver = None
+        # Exception behind the last operation that reported failure, for retry decisions
+        self.last_error = None
     
     def setup_driver(self):
         """Setup and return a configured Chrome WebDriver"""
+        # Selenium is imported on first use so web processes never load it
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        
+        try:
+            # Resolved once per process, so launches never repeat driver discovery
+            chromedriver = resolve_chromedriver()
+        except ChromeDriverError as e:
+            logger.error(f"Error initializing Chrome WebDriver: {e}")
+            self.last_error = e
+            return False
+        
         chrome_options = Options()
         if self.headless:
             chrome_options.add_argument("--headless")
@@ -33,28 +44,20 @@ class LinkedInDownloader:
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36")
+        if settings.CHROME_PROXY_SERVER:
+            chrome_options.add_argument(f"--proxy-server={settings.CHROME_PROXY_SERVER}")
+        if chromedriver['chrome_binary']:
+            chrome_options.binary_location = chromedriver['chrome_binary']
         
         try:
-            # Try a simpler approach to initialize the driver
-            try:
-                # First attempt: Use ChromeDriverManager but with more explicit options
-                driver_path = ChromeDriverManager().install()
-                logger.info(f"Using ChromeDriver from path: {driver_path}")
-                service = Service(executable_path=driver_path)
-                self.driver = webdriver.Chrome(service=service, options=chrome_options)
-                return True
-            except Exception as e1:
-                logger.warning(f"First attempt to initialize ChromeDriver failed: {e1}")
-                
-                # Second attempt: Try with default Chrome installation
-                try:
-                    self.driver = webdriver.Chrome(options=chrome_options)
-                    return True
-                except Exception as e2:
-                    logger.warning(f"Second attempt to initialize ChromeDriver failed: {e2}")
-                    raise Exception(f"Could not initialize ChromeDriver: {e1}; {e2}")
+            # An explicit driver path also keeps Selenium Manager from going online
+            service = Service(executable_path=chromedriver['path'])
+            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            BROWSERS_ACTIVE.inc()
+            return True
         except Exception as e:
             logger.error(f"Error initializing Chrome WebDriver: {e}")
+            self.last_error = e
             return False
     
     def login_to_linkedin(self, email, password):
@@ -63,6 +66,10 @@ class LinkedInDownloader:
             if not self.setup_driver():
                 return False
         
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        
         logger.info("Logging in to LinkedIn...")
         self.driver.get("https://www.linkedin.com/login")
         
@@ -88,22 +95,55 @@ class LinkedInDownloader:
             return True
         except Exception as e:
             logger.error(f"Login failed: {e}")
+            self.last_error = e
             return False
     
-    def extract_video_url(self, post_url):
-        """Extract video URL from LinkedIn post"""
+    def load_post(self, post_url):
+        """Navigate to a post without looking for its video, e.g. to scrape its engagement"""
         if not self.driver:
             if not self.setup_driver():
-                return None
+                return False
         
+        try:
+            logger.info(f"Navigating to post: {post_url}")
+            self.driver.get(post_url)
+            return True
+        except Exception as e:
+            logger.error(f"Error loading post: {e}")
+            self.last_error = e
+            return False
+    
+    def extract_video_variants(self, post_url):
+        """Extract every available rendition of the video in a LinkedIn post"""
+        if not self.driver:
+            if not self.setup_driver():
+                return []
+        
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
+        
+        # Only errors of this page load may decide whether the job is retried
+        self.last_error = None
         logger.info(f"Navigating to post: {post_url}")
         self.driver.get(post_url)
         
         try:
             logger.info("Waiting for video element...")
-            WebDriverWait(self.driver, self.timeout).until(
-                EC.presence_of_element_located((By.TAG_NAME, "video"))
-            )
+            try:
+                WebDriverWait(self.driver, self.timeout).until(
+                    EC.presence_of_element_located((By.TAG_NAME, "video"))
+                )
+            except TimeoutException as e:
+                # A rendered post without a <video> has no video. Anything else (a slow
+                # page, an auth wall, a rate limit page) keeps the timeout, so it is retried
+                if self.driver.find_elements(By.CSS_SELECTOR, POST_SELECTORS['author_name']):
+                    logger.info("No video found in the post")
+                else:
+                    logger.error(f"Post did not load within {self.timeout}s: {post_url}")
+                    self.last_error = e
+                return []
             
             # Let the page fully load
             time.sleep(5)
@@ -112,43 +152,34 @@ class LinkedInDownloader:
             video_elements = self.driver.find_elements(By.TAG_NAME, "video")
             if not video_elements:
                 logger.info("No video found in the post")
-                return None
+                return []
             
-            # Get the source URL of the first video
-            video_url = video_elements[0].get_attribute("src")
+            # The data-sources attribute lists every rendition with its bitrate,
+            # the playing source and <source> children add whatever it misses
+            variants = parse_page_variants(self.driver.page_source)
+            for element in video_elements[:1] + video_elements[0].find_elements(By.TAG_NAME, "source"):
+                src = element.get_attribute("src")
+                if src and src.startswith('http'):
+                    variants.append(make_variant(src))
             
-            # If src is not available, try to find it in the page source
-            if not video_url:
-                logger.info("Direct video source not found, searching in page source...")
-                page_source = self.driver.page_source
-                
-                # Look for video URLs in the page
-                data_sources = re.findall(r'data-sources="([^"]*)"', page_source)
-                if data_sources:
-                    # Clean and parse the data-sources attribute
-                    data_json = data_sources[0].replace('&quot;', '"')
-                    sources = json.loads(data_json)
-                    if isinstance(sources, list) and len(sources) > 0:
-                        highest_quality = max(sources, key=lambda x: x.get('quality', 0) if isinstance(x, dict) else 0)
-                        video_url = highest_quality.get('src')
-                
-                # If still not found, look for other patterns
-                if not video_url:
-                    # Try to find dms-src attribute
-                    dms_src = re.findall(r'dms-src="([^"]*)"', page_source)
-                    if dms_src:
-                        video_url = dms_src[0].replace('&amp;', '&')
-            
-            if video_url:
-                logger.info(f"Found video URL: {video_url}")
-            else:
-                logger.warning("Could not extract video URL")
-                
-            return video_url
+            variants = merge_variants(variants)
+            logger.info(f"Found {len(variants)} video variant(s)")
+            return variants
         
         except Exception as e:
             logger.error(f"Error extracting video URL: {e}")
-            return None
+            self.last_error = e
+            return []
+    
+    def extract_video_url(self, post_url, quality_policy='highest'):
+        """Extract the video URL from a LinkedIn post, choosing the rendition by quality policy"""
+        variant = select_variant(self.extract_video_variants(post_url), quality_policy)
+        if variant:
+            logger.info(f"Found video URL ({variant['height'] or 'unknown'}p, policy {quality_policy}): {variant['url']}")
+            return variant['url']
+        
+        logger.warning("Could not extract video URL")
+        return None
     
     def download_video(self, video_url, output_path):
         """Download video from the extracted URL"""
@@ -157,29 +188,13 @@ class LinkedInDownloader:
             return False, 0
         
         try:
-            logger.info(f"Downloading video from: {video_url}")
-            response = requests.get(video_url, stream=True)
-            response.raise_for_status()
-            
             # Create output directory if it doesn't exist
             os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else '.', exist_ok=True)
             
-            # Save the video with progress reporting
-            file_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
-            chunk_size = 1024 * 1024  # 1MB chunks
-            
             with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        # Log progress at 25% intervals
-                        if file_size > 0:
-                            percent = int(100 * downloaded / file_size)
-                            if percent % 25 == 0:
-                                logger.info(f"Download progress: {percent}% ({downloaded / (1024 * 1024):.1f}MB / {file_size / (1024 * 1024):.1f}MB)")
+                success, _ = self.download_video_to_stream(video_url, f)
+            if not success:
+                return False, 0
             
             # Calculate file size in MB
             file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
@@ -188,10 +203,52 @@ class LinkedInDownloader:
         
         except Exception as e:
             logger.error(f"Error downloading video: {e}")
+            self.last_error = e
+            return False, 0
+    
+    def download_video_to_stream(self, video_url, stream):
+        """Download video from the extracted URL into any writable file-like object"""
+        if not video_url:
+            logger.error("No valid video URL found to download")
+            return False, 0
+        
+        try:
+            logger.info(f"Downloading video from: {video_url}")
+            response = requests.get(
+                video_url, stream=True,
+                timeout=(settings.VIDEO_DOWNLOAD_CONNECT_TIMEOUT, settings.VIDEO_DOWNLOAD_READ_TIMEOUT)
+            )
+            response.raise_for_status()
+            
+            # Save the video with progress reporting
+            file_size = int(response.headers.get('content-length', 0))
+            downloaded = 0
+            chunk_size = 1024 * 1024  # 1MB chunks
+            
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    stream.write(chunk)
+                    downloaded += len(chunk)
+                    
+                    # Log progress at 25% intervals
+                    if file_size > 0:
+                        percent = int(100 * downloaded / file_size)
+                        if percent % 25 == 0:
+                            logger.info(f"Download progress: {percent}% ({downloaded / (1024 * 1024):.1f}MB / {file_size / (1024 * 1024):.1f}MB)")
+            
+            record_downloaded_bytes(downloaded)
+            return True, downloaded / (1024 * 1024)
+        
+        except Exception as e:
+            logger.error(f"Error downloading video: {e}")
+            self.last_error = e
             return False, 0
     
     def close(self):
         """Close the WebDriver"""
         if self.driver:
-            self.driver.quit()
-            self.driver = None
\ No newline at end of file
+            try:
+                self.driver.quit()
+            finally:
+                self.driver = None
+                BROWSERS_ACTIVE.dec()
\ No newline at end of file
@@ -0,0 +1,77 @@
+import re
+import hashlib
+import urllib.parse
+
+# LinkedIn CDN video URLs look like
+# https://dms.licdn.com/playlist/vid/v2/<media id>/mp4-720p-30fp-crf28/0/<ts>?e=<expiry>&v=beta&t=<token>
+MEDIA_ID_PATTERN = re.compile(r'/vid/(?:v\d+/)?([^/?]+)')
+
+# Post URLs carry the post URN either as a slug suffix (/posts/jane_title-activity-7313868802440495105-SMwB)
+# or verbatim (/feed/update/urn:li:activity:7313868802440495105/)
+POST_URN_PATTERN = re.compile(r'(activity|ugcPost|share)[-:](\d{10,})')
+
+
+def normalize_post_url(post_url):
+    """Strip tracking parameters and fragments so the same post always maps to one URL"""
+    parsed_url = urllib.parse.urlparse(post_url)
+    netloc = parsed_url.netloc.lower()
+    if netloc.startswith('linkedin.com'):
+        netloc = 'www.' + netloc
+    path = parsed_url.path.rstrip('/')
+    return f"https://{netloc}{path}"
+
+
+def canonical_post_key(post_url):
+    """
+    Return a short canonical key identifying the post behind a LinkedIn URL
+
+    Args:
+        post_url: LinkedIn post URL in any of its spellings
+
+    Returns:
+        str: 'activity:<id>' style key, or a hash of the normalized URL when no post ID is present
+    """
+    match = POST_URN_PATTERN.search(urllib.parse.unquote(post_url or ''))
+    if match:
+        return f"{match.group(1)}:{match.group(2)}"
+
+    digest = hashlib.sha1(normalize_post_url(post_url or '').encode('utf-8')).hexdigest()
+    return f"url:{digest}"
+
+
+def video_media_id(video_url):
+    """Return the LinkedIn media ID embedded in a CDN video URL, or None"""
+    if not video_url:
+        return None
+
+    parsed_url = urllib.parse.urlparse(video_url)
+    match = MEDIA_ID_PATTERN.search(parsed_url.path)
+    if match:
+        return match.group(1)
+
+    query_params = urllib.parse.parse_qs(parsed_url.query)
+    if 'mediaId' in query_params:
+        return query_params['mediaId'][0]
+    return None
+
+
+def video_url_expiry(video_url):
+    """Return the expiry (unix timestamp) of a signed CDN video URL, or None"""
+    if not video_url:
+        return None
+
+    query_params = urllib.parse.parse_qs(urllib.parse.urlparse(video_url).query)
+    try:
+        return int(query_params['e'][0])
+    except (KeyError, IndexError, ValueError):
+        return None
+
+
+# The variant segment of a CDN URL path, e.g. mp4-720p-30fp-crf28
+VARIANT_HEIGHT_PATTERN = re.compile(r'/mp4-(\d{3,4})p[-/]')
+
+
+def video_variant_height(video_url):
+    """Return the vertical resolution encoded in a CDN video URL path, or None"""
+    match = VARIANT_HEIGHT_PATTERN.search(urllib.parse.urlparse(video_url or '').path)
+    return int(match.group(1)) if match else None
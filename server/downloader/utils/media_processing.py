@@ -0,0 +1,134 @@
+import os
+import json
+import struct
+import logging
+import subprocess
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MediaToolError(Exception):
+    """Raised when ffmpeg or ffprobe is missing or fails"""
+
+
+def _run(command, timeout):
+    try:
+        result = subprocess.run(command, capture_output=True, timeout=timeout, check=False)
+    except FileNotFoundError:
+        raise MediaToolError(f"{command[0]} is not installed")
+    except subprocess.TimeoutExpired:
+        raise MediaToolError(f"{command[0]} timed out after {timeout}s")
+
+    if result.returncode != 0:
+        raise MediaToolError(f"{command[0]} failed: {result.stderr.decode('utf-8', 'replace').strip()[-500:]}")
+    return result.stdout
+
+
+def top_level_atoms(path):
+    """
+    List the top-level MP4 atoms (boxes) of a file in order
+
+    Returns:
+        list: Atom types such as ['ftyp', 'mdat', 'moov']
+    """
+    atoms = []
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        offset = 0
+        while offset + 8 <= size:
+            f.seek(offset)
+            atom_size, atom_type = struct.unpack('>I4s', f.read(8))
+            if atom_size == 1:
+                # 64-bit size follows the type
+                atom_size = struct.unpack('>Q', f.read(8))[0]
+            elif atom_size == 0:
+                # Atom extends to the end of the file
+                atom_size = size - offset
+            if atom_size < 8:
+                break
+            atoms.append(atom_type.decode('latin-1'))
+            offset += atom_size
+    return atoms
+
+
+def needs_faststart(path):
+    """Whether the moov atom comes after the media data, forcing players to fetch the whole file first"""
+    atoms = top_level_atoms(path)
+    return 'moov' in atoms and 'mdat' in atoms and atoms.index('moov') > atoms.index('mdat')
+
+
+def probe_video(path):
+    """
+    Read duration and resolution of the first video stream with ffprobe
+
+    Returns:
+        dict: duration (seconds), width and height, each None when unknown
+    """
+    output = _run([
+        settings.FFPROBE_BINARY, '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=width,height:format=duration',
+        '-of', 'json', path
+    ], timeout=settings.MEDIA_TOOL_TIMEOUT)
+    info = json.loads(output or b'{}')
+
+    stream = (info.get('streams') or [{}])[0]
+    duration = info.get('format', {}).get('duration')
+    return {
+        'duration': float(duration) if duration else None,
+        'width': stream.get('width'),
+        'height': stream.get('height'),
+    }
+
+
+def remux_faststart(source_path, output_path):
+    """Rewrite an MP4 with the moov atom first, copying the streams without re-encoding"""
+    _run([
+        settings.FFMPEG_BINARY, '-y', '-v', 'error',
+        '-i', source_path,
+        '-map', '0', '-c', 'copy',
+        '-movflags', '+faststart',
+        output_path
+    ], timeout=settings.MEDIA_TOOL_TIMEOUT)
+
+
+def extract_poster(source_path, output_path, duration=None):
+    """Save one JPEG frame from early in the video"""
+    # A frame one second in avoids the black first frame many videos start with
+    at_seconds = min(1.0, duration / 2) if duration else 0
+    _run([
+        settings.FFMPEG_BINARY, '-y', '-v', 'error',
+        '-ss', f"{at_seconds:.2f}", '-i', source_path,
+        '-frames:v', '1', '-q:v', '3',
+        output_path
+    ], timeout=settings.MEDIA_TOOL_TIMEOUT)
+
+
+# Storage prefix of the HLS playlists and segments, one directory per video
+HLS_PREFIX = 'linkedin_hls'
+
+
+def hls_file_name(video_id, name=''):
+    """Storage name of a file of the HLS packaging of a video, or of its directory without a name"""
+    return f"{HLS_PREFIX}/{video_id}/{name}"
+
+
+def package_hls(source_path, output_dir):
+    """
+    Segment an MP4 into an HLS VOD playlist, copying the streams without re-encoding
+
+    Args:
+        source_path: Local path of the MP4
+        output_dir: Existing local directory for index.m3u8 and its segments
+    """
+    _run([
+        settings.FFMPEG_BINARY, '-y', '-v', 'error',
+        '-i', source_path,
+        '-map', '0:v:0', '-map', '0:a?', '-c', 'copy',
+        '-f', 'hls',
+        '-hls_time', str(settings.HLS_SEGMENT_SECONDS),
+        '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', os.path.join(output_dir, 'segment_%05d.ts'),
+        os.path.join(output_dir, 'index.m3u8')
+    ], timeout=settings.MEDIA_TOOL_TIMEOUT)
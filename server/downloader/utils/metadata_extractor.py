@@ -1,71 +1,191 @@
 import requests
-from bs4 import BeautifulSoup
 import re
 import json
 import urllib.parse
 import logging
 from datetime import datetime
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+URL_METADATA_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36'
+}
+URL_METADATA_TIMEOUT = 10
+
+# CSS selectors of the post fields, shared by the browser scraper and the snapshot parser.
+# When LinkedIn changes its markup, fix them here and re-parse stored pages with
+# `manage.py reextract_snapshots`
+POST_SELECTORS = {
+    'author_name': '.update-components-actor__name',
+    'author_headline': '.update-components-actor__description',
+    'author_profile_url': '.update-components-actor__container a',
+    'post_text': '.update-components-text',
+    'published_date': '.update-components-actor__sub-description',
+    'likes_count': '.social-details-social-counts__reactions-count',
+    'comments_count': '.social-details-social-counts__comments',
+}
+
+
+def normalize_url(url):
+    """Add the https scheme to URLs given without one"""
+    parsed_url = urllib.parse.urlparse(url)
+    if not parsed_url.scheme:
+        url = 'https://' + url
+    return url
+
+
+def url_metadata_error(url, error):
+    """
+    Error message of a failed URL metadata fetch
+
+    requests' own messages name urllib3 objects by memory address, so apart from
+    HTTP errors both fetchers report the kind of failure in these words instead.
+
+    Args:
+        url: Normalized page URL
+        error: requests exception the fetch failed with
+
+    Returns:
+        str: Error message for the metadata dict
+    """
+    if isinstance(error, requests.exceptions.HTTPError):
+        return str(error)
+    if isinstance(error, requests.exceptions.Timeout):
+        return f"Timed out after {URL_METADATA_TIMEOUT}s fetching {url}"
+    if isinstance(error, requests.exceptions.TooManyRedirects):
+        return f"Too many redirects fetching {url}"
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return f"Could not connect to {urllib.parse.urlsplit(url).hostname or url}"
+    return f"Could not fetch {url}"
+
+
+def parse_url_metadata(url, html):
+    """
+    Parse the title, description and Open Graph/Twitter Card tags of a page
+
+    Shared by the blocking and the asyncio fetchers, so both return the same dict.
+
+    Args:
+        url: URL the page was fetched from
+        html: Decoded page body
+
+    Returns:
+        dict: URL metadata
+    """
+    # Imported on first use, keeping bs4 out of processes that never scrape
+    from bs4 import BeautifulSoup
+    
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    metadata = {
+        'url': url,
+        'extracted_at': datetime.now().isoformat(),
+    }
+    
+    # Extract title
+    title = soup.find('title')
+    metadata['title'] = title.text.strip() if title else None
+    
+    # Extract meta tags
+    for meta in soup.find_all('meta'):
+        name = meta.get('name') or meta.get('property')
+        content = meta.get('content')
+        if name and content and (name == 'description' or name == 'keywords' or name == 'author'):
+            metadata[name] = content
+    
+    # Extract Open Graph metadata
+    og_metadata = {}
+    for meta in soup.find_all('meta', property=lambda x: x and x.startswith('og:')):
+        og_metadata[meta['property'][3:]] = meta.get('content', '')
+    metadata['open_graph'] = og_metadata
+    
+    # Extract Twitter Card metadata
+    twitter_metadata = {}
+    for meta in soup.find_all('meta', attrs={'name': lambda x: x and x.startswith('twitter:')}):
+        twitter_metadata[meta['name'][8:]] = meta.get('content', '')
+    metadata['twitter_card'] = twitter_metadata
+
+    return metadata
+
+
+def _element_text(element):
+    """Rendered text of an element, one line per <br> with whitespace collapsed like a browser"""
+    for line_break in element.find_all('br'):
+        line_break.replace_with('\n')
+    lines = (' '.join(line.split()) for line in element.get_text().split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def parse_post_metadata(post_url, html):
+    """
+    Parse the post fields of a rendered post page with POST_SELECTORS
+
+    The offline counterpart of MetadataExtractor.extract_post_metadata, e.g. for
+    stored page snapshots. Fields whose selector matches nothing are None.
+
+    Args:
+        post_url: URL of the post
+        html: Page source as rendered by the browser
+
+    Returns:
+        dict: Same keys as extract_post_metadata
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    post_metadata = {'post_url': post_url, 'hashtags': []}
+
+    path_parts = urllib.parse.urlparse(post_url).path.split('/')
+    if len(path_parts) > 2:
+        post_metadata['author_username'] = path_parts[2]
+
+    for field, selector in POST_SELECTORS.items():
+        element = soup.select_one(selector)
+        if element is None:
+            post_metadata[field] = None
+        elif field == 'author_profile_url':
+            post_metadata[field] = element.get('href')
+        else:
+            post_metadata[field] = _element_text(element) or None
+
+    if post_metadata['post_text']:
+        post_metadata['hashtags'] = re.findall(r'#(\w+)', post_metadata['post_text'])
+    return post_metadata
+
+
 class MetadataExtractor:
     """Class to extract metadata from LinkedIn posts and videos"""
     
     def extract_url_metadata(self, url):
         """Extract metadata from URL using requests and BeautifulSoup"""
-        parsed_url = urllib.parse.urlparse(url)
-        if not parsed_url.scheme:
-            url = 'https://' + url
+        url = normalize_url(url)
         
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
+            response = requests.get(url, headers=URL_METADATA_HEADERS, timeout=URL_METADATA_TIMEOUT)
             response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            metadata = {
-                'url': url,
-                'extracted_at': datetime.now().isoformat(),
-            }
-            
-            # Extract title
-            title = soup.find('title')
-            metadata['title'] = title.text.strip() if title else None
-            
-            # Extract meta tags
-            for meta in soup.find_all('meta'):
-                name = meta.get('name') or meta.get('property')
-                content = meta.get('content')
-                if name and content and (name == 'description' or name == 'keywords' or name == 'author'):
-                    metadata[name] = content
-            
-            # Extract Open Graph metadata
-            og_metadata = {}
-            for meta in soup.find_all('meta', property=lambda x: x and x.startswith('og:')):
-                og_metadata[meta['property'][3:]] = meta.get('content', '')
-            metadata['open_graph'] = og_metadata
-            
-            # Extract Twitter Card metadata
-            twitter_metadata = {}
-            for meta in soup.find_all('meta', attrs={'name': lambda x: x and x.startswith('twitter:')}):
-                twitter_metadata[meta['name'][8:]] = meta.get('content', '')
-            metadata['twitter_card'] = twitter_metadata
-            
-            return metadata
+            return parse_url_metadata(url, response.text)
                 
         except requests.exceptions.RequestException as e:
             logger.error(f"Error extracting URL metadata: {e}")
-            return {'error': str(e), 'url': url}
+            return {'error': url_metadata_error(url, e), 'url': url}
+    
+    def extract_many_url_metadata(self, urls, concurrency=None, per_host=None):
+        """
+        Extract the metadata of many URLs concurrently, see async_metadata.extract_many_url_metadata
+        
+        Returns:
+            list: One extract_url_metadata result per URL, in the order given
+        """
+        from .async_metadata import extract_many_url_metadata
+        return extract_many_url_metadata(urls, concurrency, per_host)
     
     def extract_post_metadata(self, driver, post_url):
         """Extract post-specific metadata using Selenium"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        
         post_metadata = {
             'post_url': post_url,
             'author_name': None,
@@ -88,15 +208,15 @@ class MetadataExtractor:
             # Try to get author details
             try:
                 author_element = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, ".update-components-actor__name"))
+                    EC.presence_of_element_located((By.CSS_SELECTOR, POST_SELECTORS['author_name']))
                 )
                 post_metadata['author_name'] = author_element.text.strip()
                 
-                headline_element = driver.find_element(By.CSS_SELECTOR, ".update-components-actor__description")
+                headline_element = driver.find_element(By.CSS_SELECTOR, POST_SELECTORS['author_headline'])
                 if headline_element:
                     post_metadata['author_headline'] = headline_element.text.strip()
                 
-                profile_link = driver.find_element(By.CSS_SELECTOR, ".update-components-actor__container a")
+                profile_link = driver.find_element(By.CSS_SELECTOR, POST_SELECTORS['author_profile_url'])
                 if profile_link:
                     post_metadata['author_profile_url'] = profile_link.get_attribute("href")
             except Exception as e:
@@ -104,7 +224,7 @@ class MetadataExtractor:
             
             # Try to get post text
             try:
-                text_element = driver.find_element(By.CSS_SELECTOR, ".update-components-text")
+                text_element = driver.find_element(By.CSS_SELECTOR, POST_SELECTORS['post_text'])
                 if text_element:
                     post_metadata['post_text'] = text_element.text.strip()
                     hashtags = re.findall(r'#(\w+)', post_metadata['post_text'])
@@ -114,15 +234,15 @@ class MetadataExtractor:
             
             # Try to get published date and engagement stats
             try:
-                date_element = driver.find_element(By.CSS_SELECTOR, ".update-components-actor__sub-description")
+                date_element = driver.find_element(By.CSS_SELECTOR, POST_SELECTORS['published_date'])
                 if date_element:
                     post_metadata['published_date'] = date_element.text.strip()
                 
-                likes_element = driver.find_element(By.CSS_SELECTOR, ".social-details-social-counts__reactions-count")
+                likes_element = driver.find_element(By.CSS_SELECTOR, POST_SELECTORS['likes_count'])
                 if likes_element:
                     post_metadata['likes_count'] = likes_element.text.strip()
                     
-                comments_element = driver.find_element(By.CSS_SELECTOR, ".social-details-social-counts__comments")
+                comments_element = driver.find_element(By.CSS_SELECTOR, POST_SELECTORS['comments_count'])
                 if comments_element:
                     post_metadata['comments_count'] = comments_element.text.strip()
             except Exception as e:
@@ -0,0 +1,179 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+try:
+    # prometheus_client is optional; without it every metric below is a no-op
+    from prometheus_client import Counter, Gauge, Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+
+class _NoopMetric:
+    """Stand-in for a prometheus_client metric when the library isn't installed"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, amount):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+
+if not PROMETHEUS_AVAILABLE:
+    Counter = Gauge = Histogram = _NoopMetric
+
+# Browser launch and page readiness take seconds, downloads up to minutes
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+STAGE_DURATION = Histogram(
+    'linkedin_stage_duration_seconds', 'Time spent in each stage of a job',
+    ['stage'], buckets=STAGE_BUCKETS
+)
+STAGE_RESULTS = Counter(
+    'linkedin_stage_results_total', 'Stage outcomes, with the failure reason',
+    ['stage', 'outcome', 'reason']
+)
+DOWNLOADED_BYTES = Counter('linkedin_downloaded_bytes_total', 'Bytes downloaded from the LinkedIn CDN')
+URL_CACHE_LOOKUPS = Counter('linkedin_url_cache_lookups_total', 'Resolved video URL cache lookups', ['result'])
+# livesum adds up the value of every live worker process
+BROWSERS_ACTIVE = Gauge('linkedin_browsers_active', 'Chrome instances currently running', multiprocess_mode='livesum')
+
+
+class StageTimer:
+    """Handle yielded by stage_timer, to record a failure that isn't an exception"""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.failure_reason = None
+
+    def fail(self, reason):
+        self.failure_reason = reason
+
+
+@contextmanager
+def stage_timer(stage):
+    """
+    Time a stage of a job and count its outcome
+
+    The stage fails when the block raises (the reason is the exception type)
+    or calls fail() on the yielded StageTimer.
+
+    Args:
+        stage: Stage name, e.g. 'browser_launch' or 'download'
+    """
+    timer = StageTimer(stage)
+    start = time.monotonic()
+    try:
+        yield timer
+    except Exception as e:
+        timer.failure_reason = timer.failure_reason or type(e).__name__
+        raise
+    finally:
+        STAGE_DURATION.labels(stage=stage).observe(time.monotonic() - start)
+        if timer.failure_reason:
+            STAGE_RESULTS.labels(stage=stage, outcome='failure', reason=timer.failure_reason).inc()
+        else:
+            STAGE_RESULTS.labels(stage=stage, outcome='success', reason='').inc()
+
+
+def record_downloaded_bytes(size):
+    DOWNLOADED_BYTES.inc(size)
+
+
+def record_url_cache_lookup(hit):
+    URL_CACHE_LOOKUPS.labels(result='hit' if hit else 'miss').inc()
+
+
+def queue_depths(queues):
+    """
+    Count the messages waiting in each Celery queue
+
+    Args:
+        queues: Queue names
+
+    Returns:
+        dict: Queue name to message count, leaving out queues that couldn't be inspected
+    """
+    from linkedin_api.celery import app
+
+    depths = {}
+    try:
+        with app.connection_for_read() as connection:
+            connection.ensure_connection(max_retries=0)
+            channel = connection.default_channel
+            for queue in queues:
+                try:
+                    depths[queue] = channel.queue_declare(queue=queue, passive=True).message_count
+                except Exception:
+                    # Queues that were never declared have no backlog
+                    channel = connection.channel()
+    except Exception as e:
+        logger.warning(f"Could not read Celery queue depths: {e}")
+    return depths
+
+
+class QueueDepthCollector:
+    """Reports the Celery queue backlog, read from the broker at scrape time rather than stored per process"""
+
+    def __init__(self, queues):
+        self.queues = queues
+
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily
+
+        family = GaugeMetricFamily('linkedin_queue_depth', 'Messages waiting in each Celery queue', labels=['queue'])
+        for queue, depth in queue_depths(self.queues).items():
+            family.add_metric([queue], depth)
+        yield family
+
+
+def generate_metrics(queues):
+    """
+    Render every metric in the Prometheus text format
+
+    With PROMETHEUS_MULTIPROC_DIR set, values are aggregated across all web and
+    worker processes writing to that directory.
+
+    Args:
+        queues: Celery queue names to report the depth of
+
+    Returns:
+        tuple: (payload bytes, content type)
+    """
+    from prometheus_client import CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    scrape_registry = CollectorRegistry()
+    scrape_registry.register(QueueDepthCollector(queues))
+    return generate_latest(registry) + generate_latest(scrape_registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Drop the live gauges of an exited worker process from the multiprocess directory"""
+    if PROMETHEUS_AVAILABLE and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,116 @@
+import os
+import re
+import gzip
+import hashlib
+import logging
+import tempfile
+from django.conf import settings
+from django.utils import timezone
+from .metadata_extractor import MetadataExtractor, parse_post_metadata
+from .video_variants import make_variant, merge_variants, parse_page_variants, parse_quality_policy, select_variant
+
+# No model imports here: snapshot_reextraction runs parse_snapshot in spawned
+# processes, which import this module before Django is set up
+
+logger = logging.getLogger(__name__)
+
+# src of <video> and <source> elements, which the browser scraper reads besides data-sources and dms-src
+VIDEO_SRC_PATTERN = re.compile(r'<(?:video|source)\b[^>]*?\ssrc="(http[^"]*)"')
+
+
+def snapshot_path(digest, root=None):
+    """Path of a stored page, fanned out over two directory levels"""
+    return os.path.join(root or settings.PAGE_SNAPSHOT_ROOT, digest[:2], digest[2:4], f"{digest}.html.gz")
+
+
+def store_page(page_source):
+    """
+    Store a page in the snapshot store, once per distinct content
+
+    Returns:
+        tuple: (sha256 hex digest, uncompressed size in bytes)
+    """
+    data = page_source.encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    path = snapshot_path(digest)
+    try:
+        # Reused content: mark it fresh, so orphan cleanup leaves it alone until our row is written
+        os.utime(path)
+    except FileNotFoundError:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write under a temporary name, so concurrent writers and readers never see half a file
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(gzip.compress(data, mtime=0))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    return digest, len(data)
+
+
+def load_page(digest, root=None):
+    """Read a page back from the snapshot store"""
+    with gzip.open(snapshot_path(digest, root), 'rb') as f:
+        return f.read().decode('utf-8')
+
+
+def capture_page(recorder, driver):
+    """
+    Snapshot the page loaded in the browser, recorded with the video on the next flush
+
+    A snapshot is a by-product of the job, so failing to take one is only logged.
+    """
+    try:
+        digest, size = store_page(driver.page_source)
+    except Exception as e:
+        logger.warning(f"Could not snapshot the page of video {recorder.video.id}: {e}")
+        return False
+    recorder.add_page_snapshot(digest, size, timezone.now())
+    return True
+
+
+def parse_page_video_url(page_source, quality_policy):
+    """
+    Choose the video URL of a stored page the way the browser scraper would
+
+    max_bytes policies need the size of each rendition from the CDN, so they
+    give no URL offline.
+    """
+    try:
+        name, _ = parse_quality_policy(quality_policy)
+    except ValueError:
+        return None
+    if name == 'max_bytes':
+        return None
+
+    variants = parse_page_variants(page_source)
+    variants += [make_variant(src) for src in VIDEO_SRC_PATTERN.findall(page_source)]
+    variant = select_variant(merge_variants(variants), quality_policy)
+    return variant['url'] if variant else None
+
+
+def parse_snapshot(job):
+    """
+    Re-run the post and video URL parsing over one stored page, in a pool worker of
+    snapshot_reextraction
+
+    Args:
+        job: (video ID, snapshot digest, post URL, quality policy, snapshot root)
+
+    Returns:
+        dict: video_id, and post_metadata and video_url_metadata, or error
+    """
+    video_id, digest, post_url, quality_policy, root = job
+    try:
+        page_source = load_page(digest, root)
+        video_url = parse_page_video_url(page_source, quality_policy)
+        return {
+            'video_id': video_id,
+            'post_metadata': parse_post_metadata(post_url, page_source),
+            'video_url_metadata': MetadataExtractor().extract_video_metadata(video_url) if video_url else {},
+        }
+    except Exception as e:
+        return {'video_id': video_id, 'error': f"{type(e).__name__}: {e}"}
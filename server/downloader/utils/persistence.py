@@ -0,0 +1,175 @@
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from ..models import VideoMetadata, HashTag, PageSnapshot
+from .engagement import apply_engagement_values
+
+METADATA_FIELDS = {
+    field.name for field in VideoMetadata._meta.concrete_fields
+    if field.name not in ('id', 'video')
+}
+ENGAGEMENT_SOURCE_FIELDS = {'likes_count', 'comments_count', 'published_date'}
+
+
+class VideoJobRecorder:
+    """
+    Accumulates what a job learns about a video and writes it in as few statements as possible
+
+    Status transitions that clients poll for are written straight away; everything else
+    is buffered until flush(), which issues at most one update_fields-scoped write per
+    model inside a single transaction.
+    """
+
+    def __init__(self, video_obj):
+        self.video = video_obj
+        self.video_changes = {}
+        self.metadata_changes = {}
+        self.hashtags = []
+        self.page_snapshots = []
+        self.scraped_at = None
+        self.pending_file = None
+        self.stored_file_pending = False
+
+    def mark_processing(self):
+        """Make the processing state of a new attempt visible immediately"""
+        self.video.status = 'processing'
+        self.video.attempts += 1
+        self.video.save(update_fields=['status', 'attempts', 'updated_at'])
+
+    def set_video_fields(self, **fields):
+        """Buffer arbitrary LinkedInVideo fields"""
+        self.video_changes.update(fields)
+
+    def add_url_metadata(self, url_metadata):
+        """Buffer the title, description and Open Graph/Twitter Card data of a URL metadata dict"""
+        if 'title' in url_metadata:
+            self.video_changes['title'] = url_metadata.get('title')
+        if 'description' in url_metadata:
+            self.video_changes['description'] = url_metadata.get('description')
+        self.video_changes['extracted_at'] = timezone.now()
+
+        if 'open_graph' in url_metadata:
+            self.metadata_changes['open_graph'] = url_metadata['open_graph']
+        if 'twitter_card' in url_metadata:
+            self.metadata_changes['twitter_card'] = url_metadata['twitter_card']
+
+    def add_post_metadata(self, post_metadata, scraped_at=None):
+        """Buffer author, post text, engagement and hashtags scraped from the post"""
+        for key, value in post_metadata.items():
+            if key == 'hashtags':
+                for tag_name in value or []:
+                    if tag_name not in self.hashtags:
+                        self.hashtags.append(tag_name)
+            elif key in METADATA_FIELDS:
+                self.metadata_changes[key] = value
+        self.scraped_at = scraped_at or timezone.now()
+
+    def add_metadata(self, **fields):
+        """Buffer arbitrary VideoMetadata fields"""
+        self.metadata_changes.update(fields)
+
+    def add_video_url_metadata(self, video_url_metadata):
+        """Buffer metadata parsed from the CDN video URL"""
+        for key, value in video_url_metadata.items():
+            if key in METADATA_FIELDS:
+                self.metadata_changes[key] = value
+
+    def add_page_snapshot(self, sha256, size, captured_at):
+        """Record a page stored in the snapshot store"""
+        self.page_snapshots.append(PageSnapshot(video=self.video, sha256=sha256, size=size, captured_at=captured_at))
+
+    def attach_file(self, path, filename, file_size_mb):
+        """Store a downloaded file with the video on the next flush"""
+        self.pending_file = (path, filename, file_size_mb)
+
+    def attach_stored_file(self, name, file_size_mb):
+        """Point the video at a file that was already written to storage"""
+        self.video.video_file.name = name
+        self.video.file_size = file_size_mb
+        self.stored_file_pending = True
+
+    def fail(self, error_message):
+        """Record a failure, keeping whatever metadata was gathered before it"""
+        self.flush(status='failed', error_message=error_message)
+
+    def defer(self, error_message):
+        """Record a failed attempt that will be retried, putting the video back to pending"""
+        self.flush(status='pending', error_message=error_message)
+
+    def flush(self, status=None, error_message=None):
+        """
+        Write everything buffered so far
+
+        Args:
+            status: Optional new status, written together with the other video fields
+            error_message: Optional error message for failed jobs
+        """
+        video_fields = set()
+
+        # Copy the file into storage before opening the transaction, which should stay short
+        if self.pending_file:
+            path, filename, file_size_mb = self.pending_file
+            with open(path, 'rb') as f:
+                self.video.video_file.save(filename, File(f), save=False)
+            self.video.file_size = file_size_mb
+            video_fields.update({'video_file', 'file_size'})
+            self.pending_file = None
+        elif self.stored_file_pending:
+            video_fields.update({'video_file', 'file_size'})
+            self.stored_file_pending = False
+
+        for field, value in self.video_changes.items():
+            setattr(self.video, field, value)
+        video_fields.update(self.video_changes)
+        self.video_changes = {}
+
+        if status:
+            self.video.status = status
+            video_fields.add('status')
+        if error_message is not None:
+            self.video.error_message = error_message
+            video_fields.add('error_message')
+
+        with transaction.atomic():
+            if self.video._state.adding:
+                self.video.save()
+            elif video_fields:
+                self.video.save(update_fields=[*video_fields, 'updated_at'])
+
+            if self.metadata_changes:
+                self._write_metadata()
+
+            if self.hashtags:
+                self._write_hashtags()
+
+            if self.page_snapshots:
+                PageSnapshot.objects.bulk_create(self.page_snapshots)
+                self.page_snapshots = []
+
+    def _write_metadata(self):
+        changes = self.metadata_changes
+        self.metadata_changes = {}
+
+        metadata_obj = VideoMetadata.objects.filter(video=self.video).first()
+        created = metadata_obj is None
+        if created:
+            metadata_obj = VideoMetadata(video=self.video)
+        for field, value in changes.items():
+            setattr(metadata_obj, field, value)
+
+        update_fields = list(changes)
+        if created or ENGAGEMENT_SOURCE_FIELDS & set(changes):
+            update_fields += apply_engagement_values(metadata_obj, reference=self.scraped_at)
+
+        if created:
+            metadata_obj.save()
+        else:
+            metadata_obj.save(update_fields=update_fields)
+
+    def _write_hashtags(self):
+        names = self.hashtags
+        self.hashtags = []
+
+        HashTag.objects.bulk_create([HashTag(name=name) for name in names], ignore_conflicts=True)
+        self.video.hashtags.add(*HashTag.objects.filter(name__in=names))
+
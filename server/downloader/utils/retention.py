@@ -0,0 +1,257 @@
+import os
+import time
+import shutil
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from ..models import LinkedInVideo, PageSnapshot
+from .link_preview import PREVIEW_IMAGE_DIR
+from .media_processing import hls_file_name
+from .storage import S3VideoStorage, get_video_storage
+
+logger = logging.getLogger(__name__)
+
+# Storage prefixes of LinkedInVideo files and the fields referring to them
+STORED_FILE_FIELDS = (
+    ('linkedin_videos', 'video_file'),
+    ('linkedin_posters', 'poster_image'),
+)
+
+
+def _batches(queryset, batch_size, max_batches):
+    """Yield lists of at most batch_size objects, re-querying so each batch is a short transaction"""
+    for _ in range(max_batches):
+        batch = list(queryset[:batch_size])
+        if not batch:
+            return
+        yield batch
+        if len(batch) < batch_size:
+            return
+
+
+def _delete_stored_file(video, field='video_file'):
+    """Delete a file of the video from storage, tolerating files that are already gone"""
+    stored_file = getattr(video, field)
+    try:
+        stored_file.storage.delete(stored_file.name)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not delete file {stored_file.name} of video {video.id}: {e}")
+        return False
+    return True
+
+
+def _delete_hls_files(video_id):
+    """Delete the HLS packaging of a video, which is only a cache of its file"""
+    storage = get_video_storage()
+    directory = hls_file_name(video_id)
+    if not isinstance(storage, S3VideoStorage):
+        shutil.rmtree(storage.path(directory), ignore_errors=True)
+        return
+    try:
+        for name in storage.list_files(directory):
+            storage.delete(name)
+    except Exception as e:
+        logger.warning(f"Could not delete the HLS files of video {video_id}: {e}")
+
+
+def evict_stale_files(policy, now=None):
+    """
+    Delete the files of videos nobody has played for a while, keeping their rows and metadata
+
+    Access is recorded by the video-file/ endpoint; videos never played there count from their creation.
+
+    Returns:
+        int: Number of evicted files
+    """
+    days = policy['evict_files_after_days']
+    if not days:
+        return 0
+
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    queryset = (
+        LinkedInVideo.objects
+        .filter(status='completed')
+        .exclude(video_file='').exclude(video_file__isnull=True)
+        .filter(Q(last_accessed_at__lt=cutoff) | Q(last_accessed_at__isnull=True, created_at__lt=cutoff))
+        .only('id', 'video_file')
+        .order_by('created_at')
+    )
+
+    evicted = 0
+    for batch in _batches(queryset, policy['batch_size'], policy['max_batches']):
+        ids = [video.id for video in batch if _delete_stored_file(video)]
+        for video_id in ids:
+            _delete_hls_files(video_id)
+        LinkedInVideo.objects.filter(pk__in=ids).update(video_file='', file_evicted_at=timezone.now())
+        evicted += len(ids)
+        if len(ids) < len(batch):
+            # Files that couldn't be deleted would be selected again forever
+            break
+    return evicted
+
+
+def purge_videos(queryset, policy):
+    """Delete the rows (and files) matched by queryset in bounded batches"""
+    purged = 0
+    queryset = queryset.only('id', 'video_file', 'poster_image').order_by('updated_at')
+    for batch in _batches(queryset, policy['batch_size'], policy['max_batches']):
+        for video in batch:
+            if video.video_file:
+                _delete_stored_file(video)
+            if video.poster_image:
+                _delete_stored_file(video, 'poster_image')
+            _delete_hls_files(video.id)
+        LinkedInVideo.objects.filter(pk__in=[video.id for video in batch]).delete()
+        purged += len(batch)
+    return purged
+
+
+def purge_failed_videos(policy, now=None):
+    """Delete failed jobs older than purge_failed_after_days"""
+    days = policy['purge_failed_after_days']
+    if not days:
+        return 0
+
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    return purge_videos(LinkedInVideo.objects.filter(status='failed', updated_at__lt=cutoff), policy)
+
+
+def purge_expired_videos(policy, now=None):
+    """Delete every video, whatever its status, older than purge_all_after_days"""
+    days = policy['purge_all_after_days']
+    if not days:
+        return 0
+
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    return purge_videos(LinkedInVideo.objects.filter(created_at__lt=cutoff), policy)
+
+
+def remove_orphaned_snapshots(cutoff, batch_size):
+    """
+    Delete stored pages no snapshot refers to any more, e.g. after their videos were purged
+
+    Args:
+        cutoff: Only files last modified before this timestamp are considered
+        batch_size: Digests looked up per query
+
+    Returns:
+        int: Number of deleted files
+    """
+    root = settings.PAGE_SNAPSHOT_ROOT
+    candidates = {}
+    removed = 0
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if os.stat(path).st_mtime >= cutoff:
+                continue
+            if filename.endswith('.tmp'):
+                # Left behind by a writer that crashed
+                os.unlink(path)
+                removed += 1
+            elif filename.endswith('.html.gz'):
+                candidates[filename[:-len('.html.gz')]] = path
+
+    digests = list(candidates)
+    for start in range(0, len(digests), batch_size):
+        chunk = digests[start:start + batch_size]
+        referenced = set(PageSnapshot.objects.filter(sha256__in=chunk).values_list('sha256', flat=True))
+        for digest in chunk:
+            if digest in referenced:
+                continue
+            try:
+                # A job may have reused the page since the scan, refreshing its mtime
+                if os.stat(candidates[digest]).st_mtime < cutoff:
+                    os.unlink(candidates[digest])
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def remove_orphaned_files(policy):
+    """
+    Delete leftover temporary downloads, stored video and poster files (local or S3)
+    and files under PAGE_SNAPSHOT_ROOT no row refers to, incomplete S3 multipart
+    uploads, and link preview images no cached preview uses
+
+    Only files older than orphan_files_after_hours are considered, so downloads
+    in progress are never touched.
+
+    Returns:
+        int: Number of deleted files
+    """
+    hours = policy['orphan_files_after_hours']
+    if not hours:
+        return 0
+
+    cutoff = time.time() - hours * 3600
+    removed = 0
+
+    def old_files(directory, before=cutoff):
+        if not os.path.isdir(directory):
+            return []
+        with os.scandir(directory) as entries:
+            return [entry for entry in entries if entry.is_file() and entry.stat().st_mtime < before]
+
+    for entry in old_files(settings.VIDEO_TEMP_DIR):
+        os.unlink(entry.path)
+        removed += 1
+
+    # Files stored before their row was committed, e.g. when the transaction failed or the worker died
+    storage = get_video_storage()
+    for prefix, field in STORED_FILE_FIELDS:
+        if isinstance(storage, S3VideoStorage):
+            names = storage.list_files(prefix, modified_before=cutoff)
+        else:
+            names = [f"{prefix}/{entry.name}" for entry in old_files(os.path.join(settings.MEDIA_ROOT, prefix))]
+        for start in range(0, len(names), policy['batch_size']):
+            chunk = names[start:start + policy['batch_size']]
+            referenced = set(LinkedInVideo.objects.filter(**{f'{field}__in': chunk}).values_list(field, flat=True))
+            for name in chunk:
+                if name in referenced:
+                    continue
+                try:
+                    storage.delete(name)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+
+    if isinstance(storage, S3VideoStorage):
+        removed += storage.abort_incomplete_uploads(cutoff)
+
+    # Stored pages of purged videos, which content addressing can't delete with their rows
+    removed += remove_orphaned_snapshots(cutoff, policy['batch_size'])
+
+    # Link preview images are only referenced by cached previews, which expire after LINK_PREVIEW_CACHE_TTL
+    for entry in old_files(os.path.join(settings.MEDIA_ROOT, PREVIEW_IMAGE_DIR), cutoff - settings.LINK_PREVIEW_CACHE_TTL):
+        os.unlink(entry.path)
+        removed += 1
+    return removed
+
+
+def apply_retention_policies(policy=None):
+    """
+    Run every retention policy once
+
+    Args:
+        policy: Overrides for settings.VIDEO_RETENTION
+
+    Returns:
+        dict: Number of files and rows affected per policy
+    """
+    policy = {**settings.VIDEO_RETENTION, **(policy or {})}
+    now = timezone.now()
+
+    summary = {
+        'evicted_files': evict_stale_files(policy, now),
+        'purged_failed': purge_failed_videos(policy, now),
+        'purged_expired': purge_expired_videos(policy, now),
+        'orphaned_files': remove_orphaned_files(policy),
+    }
+    logger.info(f"Retention run finished: {summary}")
+    return summary
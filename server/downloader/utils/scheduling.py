@@ -0,0 +1,64 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from ..models import LinkedInVideo
+
+# Priority classes whose downloads wait in the database for dispatch_pending_downloads
+DEFERRED_PRIORITIES = ('bulk', 'background')
+
+
+def download_queue(priority):
+    """Celery queue of a download priority class"""
+    return settings.DOWNLOAD_PRIORITY_QUEUES.get(priority, settings.CELERY_TASK_DEFAULT_QUEUE)
+
+
+def client_key_for_request(request):
+    """Identify the submitting client: the user when authenticated, otherwise the remote address"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def dispatch_capacity(priority):
+    """
+    Number of downloads of a deferred class that may be sent to its queue now
+
+    Returns:
+        int: The dispatch window minus the downloads already queued or running
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.DOWNLOAD_DISPATCH_TIMEOUT)
+    in_flight = LinkedInVideo.objects.filter(
+        priority=priority, status__in=['pending', 'processing'], queued_at__gte=cutoff
+    ).count()
+    return max(settings.DOWNLOAD_DISPATCH_WINDOW.get(priority, 0) - in_flight, 0)
+
+
+def fair_share_batch(priority, limit):
+    """
+    Pick the next undispatched downloads of a class, round-robin between clients
+
+    Each client's downloads are taken oldest first, and every client with work
+    waiting gets its n-th download picked before any client gets its (n+1)-th, so
+    one client's large import can't hold back another's.
+
+    Args:
+        priority: Priority class
+        limit: Maximum number of downloads to pick
+
+    Returns:
+        list: LinkedInVideo objects in dispatch order
+    """
+    if limit <= 0:
+        return []
+    return list(
+        LinkedInVideo.objects
+        .filter(priority=priority, status='pending', queued_at__isnull=True)
+        .annotate(client_rank=Window(
+            RowNumber(), partition_by=[F('client_key')], order_by=F('created_at').asc()
+        ))
+        .order_by('client_rank', 'created_at')
+        .only('id', 'priority', 'client_key', 'created_at')[:limit]
+    )
@@ -0,0 +1,199 @@
+import re
+import uuid
+import logging
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
+from ..models import LinkedInVideo
+
+logger = logging.getLogger(__name__)
+
+SQLITE_TABLE = 'downloader_video_fts'
+POSTGRES_TABLE = 'downloader_video_search'
+
+QUERY_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def _search_document(video):
+    """Collect the searchable text of a video"""
+    try:
+        post_text = video.metadata.post_text
+    except ObjectDoesNotExist:
+        post_text = None
+
+    return {
+        'title': video.title or '',
+        'description': video.description or '',
+        'post_text': post_text or '',
+        'hashtags': ' '.join(tag.name for tag in video.hashtags.all()),
+    }
+
+
+class SearchBackend:
+    """Full-text index over video titles, descriptions, post text and hashtags"""
+
+    def __init__(self, db_connection):
+        self.connection = db_connection
+
+    def _db_id(self, video_id):
+        """Convert a video ID to the form the database stores it in"""
+        return LinkedInVideo._meta.pk.get_db_prep_value(video_id, self.connection)
+
+    def _filter_sql(self, status=None, created_after=None, created_before=None):
+        """SQL conditions and parameters for the status and date filters"""
+        conditions, params = [], []
+        if status:
+            conditions.append('v.status = %s')
+            params.append(status)
+        if created_after:
+            conditions.append('v.created_at >= %s')
+            params.append(self.connection.ops.adapt_datetimefield_value(created_after))
+        if created_before:
+            conditions.append('v.created_at < %s')
+            params.append(self.connection.ops.adapt_datetimefield_value(created_before))
+        return ''.join(f' AND {condition}' for condition in conditions), params
+
+    def index_video(self, video):
+        raise NotImplementedError
+
+    def remove_video(self, video_id):
+        raise NotImplementedError
+
+    def search(self, query, status=None, created_after=None, created_before=None, limit=20, offset=0):
+        """
+        Search the index
+
+        Args:
+            query: Free-text query
+            status: Optional video status filter
+            created_after: Optional lower bound on created_at
+            created_before: Optional upper bound on created_at
+            limit: Maximum number of results
+            offset: Number of results to skip
+
+        Returns:
+            list: (video UUID, relevance) tuples, most relevant first
+        """
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 virtual table, ranked with bm25"""
+
+    def index_video(self, video):
+        document = _search_document(video)
+        video_id = self._db_id(video.id)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE} WHERE video_id = %s", [video_id])
+            cursor.execute(
+                f"INSERT INTO {SQLITE_TABLE} (video_id, title, description, post_text, hashtags) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [video_id, document['title'], document['description'], document['post_text'], document['hashtags']]
+            )
+
+    def remove_video(self, video_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE} WHERE video_id = %s", [self._db_id(video_id)])
+
+    def search(self, query, status=None, created_after=None, created_before=None, limit=20, offset=0):
+        # Quote every word so user input can't inject FTS5 query syntax
+        tokens = QUERY_TOKEN_PATTERN.findall(query)
+        if not tokens:
+            return []
+        match = ' '.join('"%s"' % token for token in tokens)
+
+        filter_sql, filter_params = self._filter_sql(status, created_after, created_before)
+        with self.connection.cursor() as cursor:
+            # bm25 weights per column: video_id, title, description, post_text, hashtags
+            cursor.execute(
+                f"SELECT v.id, bm25({SQLITE_TABLE}, 0, 4.0, 2.0, 1.0, 3.0) AS rank "
+                f"FROM {SQLITE_TABLE} JOIN downloader_linkedinvideo v ON v.id = {SQLITE_TABLE}.video_id "
+                f"WHERE {SQLITE_TABLE} MATCH %s{filter_sql} "
+                "ORDER BY rank LIMIT %s OFFSET %s",
+                [match, *filter_params, limit, offset]
+            )
+            # bm25 scores are negative, lower is better
+            return [(uuid.UUID(row[0]), -row[1]) for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Weighted tsvector column with a GIN index, ranked with ts_rank_cd"""
+
+    def index_video(self, video):
+        document = _search_document(video)
+        config = settings.FULL_TEXT_SEARCH_CONFIG
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {POSTGRES_TABLE} (video_id, document) VALUES (%s, "
+                "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'B') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'C') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'B')) "
+                "ON CONFLICT (video_id) DO UPDATE SET document = EXCLUDED.document",
+                [
+                    self._db_id(video.id),
+                    config, document['title'],
+                    config, document['description'],
+                    config, document['post_text'],
+                    config, document['hashtags'],
+                ]
+            )
+
+    def remove_video(self, video_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {POSTGRES_TABLE} WHERE video_id = %s", [self._db_id(video_id)])
+
+    def search(self, query, status=None, created_after=None, created_before=None, limit=20, offset=0):
+        if not QUERY_TOKEN_PATTERN.search(query):
+            return []
+
+        filter_sql, filter_params = self._filter_sql(status, created_after, created_before)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT v.id, ts_rank_cd(s.document, q) AS rank "
+                f"FROM {POSTGRES_TABLE} s JOIN downloader_linkedinvideo v ON v.id = s.video_id, "
+                "websearch_to_tsquery(%s::regconfig, %s) q "
+                f"WHERE s.document @@ q{filter_sql} "
+                "ORDER BY rank DESC LIMIT %s OFFSET %s",
+                [settings.FULL_TEXT_SEARCH_CONFIG, query, *filter_params, limit, offset]
+            )
+            return [(row[0], row[1]) for row in cursor.fetchall()]
+
+
+SEARCH_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(db_connection=None):
+    """Return the full-text search backend for the database in use"""
+    db_connection = db_connection or connection
+    try:
+        return SEARCH_BACKENDS[db_connection.vendor](db_connection)
+    except KeyError:
+        raise NotImplementedError(f"Full-text search is not supported on {db_connection.vendor}")
+
+
+def index_video(video_id):
+    """
+    Refresh the search document of a video
+
+    Args:
+        video_id: UUID of the LinkedInVideo object
+    """
+    video = (
+        LinkedInVideo.objects.select_related('metadata')
+        .prefetch_related('hashtags')
+        .filter(id=video_id)
+        .first()
+    )
+    try:
+        backend = get_search_backend()
+        if video is None:
+            backend.remove_video(video_id)
+        else:
+            backend.index_video(video)
+    except Exception as e:
+        # A stale search document must never fail the write that triggered it
+        logger.error(f"Error indexing video {video_id} for search: {e}")
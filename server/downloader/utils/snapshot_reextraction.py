@@ -0,0 +1,168 @@
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from ..models import HashTag, LinkedInVideo, PageSnapshot, VideoMetadata
+from .engagement import apply_engagement_values
+from .metadata_extractor import POST_SELECTORS
+from .page_snapshots import parse_snapshot
+from .search import index_video
+
+logger = logging.getLogger(__name__)
+
+# Post fields a re-extraction may update; None never overwrites a stored value
+POST_FIELDS = (*POST_SELECTORS, 'author_username')
+VIDEO_URL_FIELDS = ('embed_id', 'media_id', 'resolution', 'quality', 'has_auth_token')
+ENGAGEMENT_SOURCE_FIELDS = {'likes_count', 'comments_count', 'published_date'}
+SEARCH_FIELDS = {'post_text'}
+
+
+def latest_snapshots(video_ids=None):
+    """Videos with at least one page snapshot, annotated with the digest and time of their latest"""
+    latest = PageSnapshot.objects.filter(video=OuterRef('pk')).order_by('-captured_at')
+    videos = (
+        LinkedInVideo.objects
+        .annotate(
+            snapshot_sha256=Subquery(latest.values('sha256')[:1]),
+            snapshot_captured_at=Subquery(latest.values('captured_at')[:1]),
+        )
+        .filter(snapshot_sha256__isnull=False)
+        .select_related('metadata')
+        .prefetch_related('hashtags')
+        .only('id', 'post_url', 'quality_policy', 'engagement_refreshed_at', 'metadata')
+        .order_by('pk')
+    )
+    if video_ids:
+        videos = videos.filter(id__in=video_ids)
+    return videos
+
+
+def _changes(video, result):
+    """
+    Apply a parse result to the metadata of a video in memory
+
+    Returns:
+        tuple: (VideoMetadata, changed field names, hashtag names to add)
+    """
+    metadata_obj = getattr(video, 'metadata', None)
+    if metadata_obj is None:
+        metadata_obj = VideoMetadata(video=video)
+
+    values = {field: result['post_metadata'].get(field) for field in POST_FIELDS}
+    values.update({field: result['video_url_metadata'][field] for field in VIDEO_URL_FIELDS if field in result['video_url_metadata']})
+    if video.engagement_refreshed_at and video.engagement_refreshed_at > video.snapshot_captured_at:
+        # The engagement refresh saw newer counts than the page
+        del values['likes_count'], values['comments_count']
+
+    changed_fields = []
+    for field, value in values.items():
+        if value is not None and getattr(metadata_obj, field) != value:
+            setattr(metadata_obj, field, value)
+            changed_fields.append(field)
+    if ENGAGEMENT_SOURCE_FIELDS & set(changed_fields):
+        changed_fields += apply_engagement_values(metadata_obj, reference=video.snapshot_captured_at)
+
+    known_tags = {tag.name for tag in video.hashtags.all()}
+    new_tags = [name for name in dict.fromkeys(result['post_metadata'].get('hashtags') or []) if name not in known_tags]
+    return metadata_obj, changed_fields, new_tags
+
+
+def _write_changes(changes):
+    """Write the changes of one batch in one transaction, with bulk statements"""
+    created = [metadata_obj for metadata_obj, _, _ in changes if metadata_obj.pk is None]
+    updated = [metadata_obj for metadata_obj, fields, _ in changes if metadata_obj.pk is not None and fields]
+    update_fields = sorted({field for metadata_obj, fields, _ in changes if metadata_obj.pk is not None for field in fields})
+    tag_links = [(metadata_obj.video_id, name) for metadata_obj, _, tags in changes for name in tags]
+    created_ids = {metadata_obj.video_id for metadata_obj in created}
+
+    with transaction.atomic():
+        VideoMetadata.objects.bulk_create(created)
+        if updated:
+            VideoMetadata.objects.bulk_update(updated, update_fields)
+        if tag_links:
+            names = {name for _, name in tag_links}
+            HashTag.objects.bulk_create([HashTag(name=name) for name in names], ignore_conflicts=True)
+            tag_ids = dict(HashTag.objects.filter(name__in=names).values_list('name', 'id'))
+            HashTag.videos.through.objects.bulk_create([
+                HashTag.videos.through(linkedinvideo_id=video_id, hashtag_id=tag_ids[name])
+                for video_id, name in tag_links
+            ], ignore_conflicts=True)
+
+    # Bulk writes send no signals, so refresh the search documents here
+    for metadata_obj, fields, tags in changes:
+        if metadata_obj.video_id in created_ids or tags or SEARCH_FIELDS & set(fields):
+            index_video(metadata_obj.video_id)
+
+
+def reextract_snapshots(video_ids=None, workers=None, batch_size=500, dry_run=False, progress=None):
+    """
+    Re-parse the latest page snapshot of each video and update the stored metadata
+
+    Pages are parsed in a process pool while the previous batch is written. Only
+    values the parser found are written, so a selector that no longer matches
+    never blanks a field.
+
+    Args:
+        video_ids: Limit to these videos, by default every video with a snapshot
+        workers: Parser processes, defaults to the number of CPUs
+        batch_size: Videos parsed and written per batch
+        dry_run: Count the changes without writing them
+        progress: Optional callable receiving the running summary after each batch
+
+    Returns:
+        dict: Videos parsed, changed and failed, and how often each field changed
+    """
+    summary = {'videos': 0, 'changed': 0, 'failed': 0, 'fields': {}}
+    queryset = latest_snapshots(video_ids)
+    root = settings.PAGE_SNAPSHOT_ROOT
+    workers = workers or os.cpu_count() or 1
+
+    def apply_batch(videos, results):
+        changes = []
+        for video, result in zip(videos, results):
+            summary['videos'] += 1
+            if 'error' in result:
+                summary['failed'] += 1
+                logger.warning(f"Could not re-parse the snapshot of video {video.id}: {result['error']}")
+                continue
+            metadata_obj, fields, tags = _changes(video, result)
+            if not (fields or tags):
+                continue
+            summary['changed'] += 1
+            for field in fields + (['hashtags'] if tags else []):
+                summary['fields'][field] = summary['fields'].get(field, 0) + 1
+            changes.append((metadata_obj, fields, tags))
+        if changes and not dry_run:
+            _write_changes(changes)
+        if progress:
+            progress(summary)
+
+    # Spawned, not forked: the parent holds database connections and threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        pending = None
+        last_pk = None
+        while True:
+            page = queryset.filter(pk__gt=last_pk) if last_pk else queryset
+            videos = list(page[:batch_size])
+            if not videos:
+                break
+            last_pk = videos[-1].pk
+
+            jobs = [
+                (str(video.id), video.snapshot_sha256, video.post_url,
+                 video.quality_policy or settings.VIDEO_QUALITY_POLICY, root)
+                for video in videos
+            ]
+            # Parse this batch while the previous one is written
+            results = pool.map(parse_snapshot, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+            if pending:
+                apply_batch(*pending)
+            pending = (videos, results)
+        if pending:
+            apply_batch(*pending)
+
+    logger.info(f"Snapshot re-extraction: {summary}")
+    return summary
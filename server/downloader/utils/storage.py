@@ -0,0 +1,257 @@
+import logging
+import mimetypes
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import Storage, default_storage
+from django.utils.deconstruct import deconstructible
+
+logger = logging.getLogger(__name__)
+
+# S3 rejects multipart parts smaller than 5MB, except the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+# Types mimetypes gets wrong for media files (it maps .ts to Qt translation files)
+CONTENT_TYPES = {
+    '.ts': 'video/mp2t',
+    '.m3u8': 'application/vnd.apple.mpegurl',
+}
+
+
+def guess_content_type(name):
+    """Content-Type to store a file under, from its extension"""
+    for extension, content_type in CONTENT_TYPES.items():
+        if name.lower().endswith(extension):
+            return content_type
+    return mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+class MultipartUpload:
+    """
+    File-like sink that uploads to S3 in parallel multipart parts while it is being written
+
+    Parts are uploaded as soon as enough bytes are buffered, with at most
+    `max_concurrency` parts in flight, so memory use stays bounded however large the file is.
+    """
+
+    def __init__(self, client, bucket, key, part_size, max_concurrency):
+        self.client = client
+        self.bucket = bucket
+        self.name = key
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.max_concurrency = max_concurrency
+        self.buffer = bytearray()
+        self.futures = []
+        self.upload_id = client.create_multipart_upload(
+            Bucket=bucket, Key=key, ContentType=guess_content_type(key)
+        )['UploadId']
+        # Only start threads once there is an upload to feed, so a failed create doesn't leak them
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def write(self, data):
+        self.buffer.extend(data)
+        while len(self.buffer) >= self.part_size:
+            part = bytes(self.buffer[:self.part_size])
+            del self.buffer[:self.part_size]
+            self._submit(part)
+        return len(data)
+
+    def _submit(self, part):
+        # Backpressure: wait for the oldest part before queueing more than max_concurrency
+        in_flight = [future for future in self.futures if not future.done()]
+        if len(in_flight) >= self.max_concurrency:
+            in_flight[0].result()
+
+        part_number = len(self.futures) + 1
+        self.futures.append(self.executor.submit(self._upload_part, part_number, part))
+
+    def _upload_part(self, part_number, data):
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self.name, UploadId=self.upload_id,
+            PartNumber=part_number, Body=data
+        )
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+    def complete(self):
+        """Upload the remaining bytes and assemble the object, aborting the upload if that fails"""
+        try:
+            if self.buffer or not self.futures:
+                self._submit(bytes(self.buffer))
+                self.buffer = bytearray()
+            parts = [future.result() for future in self.futures]
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.name, UploadId=self.upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception:
+            # Uploaded parts are billed until the upload is aborted
+            self.abort()
+            raise
+        self.executor.shutdown(wait=True)
+
+    def abort(self):
+        """Discard the parts uploaded so far"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.name, UploadId=self.upload_id)
+        except Exception as e:
+            logger.warning(f"Could not abort multipart upload of {self.name}: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.complete()
+        else:
+            self.abort()
+        return False
+
+
+@deconstructible
+class S3VideoStorage(Storage):
+    """
+    Storage for S3-compatible object stores (AWS S3, MinIO, ...)
+
+    Files are read back through presigned URLs, so the bytes never pass through the app servers.
+    """
+
+    supports_streaming_upload = True
+
+    def __init__(self, options=None):
+        self.options = options or settings.VIDEO_STORAGE_S3
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            # boto3 is only required when S3 storage is enabled
+            import boto3
+
+            self._client = boto3.client(
+                's3',
+                endpoint_url=self.options.get('endpoint_url') or None,
+                region_name=self.options.get('region_name') or None,
+                aws_access_key_id=self.options.get('access_key') or None,
+                aws_secret_access_key=self.options.get('secret_key') or None,
+            )
+        return self._client
+
+    @property
+    def bucket(self):
+        return self.options['bucket']
+
+    def _key(self, name):
+        return name.replace('\\', '/')
+
+    def _open(self, name, mode='rb'):
+        # Spool to disk past a few MB so large videos don't sit in memory
+        spooled = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        self.client.download_fileobj(self.bucket, self._key(name), spooled)
+        spooled.seek(0)
+        return File(spooled, name=name)
+
+    def _save(self, name, content):
+        from boto3.s3.transfer import TransferConfig
+
+        content.seek(0)
+        self.client.upload_fileobj(
+            content, self.bucket, self._key(name),
+            ExtraArgs={'ContentType': guess_content_type(name)},
+            Config=TransferConfig(
+                multipart_chunksize=max(self.options['part_size'], MIN_PART_SIZE),
+                max_concurrency=self.options['max_concurrency'],
+            )
+        )
+        return name
+
+    def open_upload(self, name):
+        """
+        Start a streaming multipart upload
+
+        Args:
+            name: Storage name of the new file
+
+        Returns:
+            MultipartUpload: Write the file to it, then close the context manager
+        """
+        return MultipartUpload(
+            self.client, self.bucket, self._key(name),
+            self.options['part_size'], self.options['max_concurrency']
+        )
+
+    def get_available_name(self, name, max_length=None):
+        # Upload names are UUIDs, so skip the HEAD request Storage would use to deduplicate
+        return name
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+
+    def exists(self, name):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(name))
+            return True
+        except self.client.exceptions.ClientError:
+            return False
+
+    def list_files(self, prefix, modified_before=None):
+        """
+        Names of the objects under a prefix
+
+        Args:
+            prefix: Directory-like prefix, e.g. 'linkedin_videos'
+            modified_before: Optional unix timestamp, to only list objects last modified before it
+
+        Returns:
+            list: Object names
+        """
+        names = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix).rstrip('/') + '/'):
+            for obj in page.get('Contents', []):
+                if modified_before is None or obj['LastModified'].timestamp() < modified_before:
+                    names.append(obj['Key'])
+        return names
+
+    def abort_incomplete_uploads(self, started_before):
+        """
+        Abort multipart uploads started before a unix timestamp, e.g. by a worker that died mid-upload
+
+        Their parts are invisible to list_files but still billed until aborted.
+
+        Returns:
+            int: Number of aborted uploads
+        """
+        aborted = 0
+        paginator = self.client.get_paginator('list_multipart_uploads')
+        for page in paginator.paginate(Bucket=self.bucket):
+            for upload in page.get('Uploads', []):
+                if upload['Initiated'].timestamp() >= started_before:
+                    continue
+                try:
+                    self.client.abort_multipart_upload(Bucket=self.bucket, Key=upload['Key'], UploadId=upload['UploadId'])
+                    aborted += 1
+                except Exception as e:
+                    logger.warning(f"Could not abort multipart upload of {upload['Key']}: {e}")
+        return aborted
+
+    def size(self, name):
+        return self.client.head_object(Bucket=self.bucket, Key=self._key(name))['ContentLength']
+
+    def get_modified_time(self, name):
+        return self.client.head_object(Bucket=self.bucket, Key=self._key(name))['LastModified']
+
+    def url(self, name):
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': self._key(name)},
+            ExpiresIn=self.options['url_expiry']
+        )
+
+
+def get_video_storage():
+    """Storage for LinkedInVideo files, selected by VIDEO_STORAGE_BACKEND"""
+    if settings.VIDEO_STORAGE_BACKEND == 's3':
+        return S3VideoStorage()
+    return default_storage
@@ -0,0 +1,68 @@
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from .linkedin_urls import canonical_post_key, video_media_id, video_url_expiry
+from .metrics import record_url_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Every rendition of a video shares its media ID, so the quality policy is part of the keys
+POST_MEDIA_KEY = 'linkedin:post-media:{}:{}'
+MEDIA_URL_KEY = 'linkedin:media-url:{}:{}'
+
+
+def _post_cache_key(post_url, quality_policy):
+    return POST_MEDIA_KEY.format(canonical_post_key(post_url), quality_policy)
+
+
+def get_cached_video_url(post_url, quality_policy='highest'):
+    """
+    Return a previously resolved CDN URL for the post if its signed token is still valid
+
+    Args:
+        post_url: LinkedIn post URL
+        quality_policy: Quality policy the URL was selected with
+
+    Returns:
+        str or None: Cached video URL
+    """
+    media_id = cache.get(_post_cache_key(post_url, quality_policy))
+    video_url = cache.get(MEDIA_URL_KEY.format(media_id, quality_policy)) if media_id else None
+
+    # The cache TTL already tracks the expiry, but guard against clock skew between nodes
+    expires_at = video_url_expiry(video_url)
+    if not video_url or (expires_at and expires_at - time.time() <= settings.VIDEO_URL_EXPIRY_MARGIN):
+        record_url_cache_lookup(hit=False)
+        return None
+
+    record_url_cache_lookup(hit=True)
+    logger.info(f"Reusing resolved video URL for media {media_id}")
+    return video_url
+
+
+def cache_video_url(post_url, video_url, quality_policy='highest'):
+    """
+    Remember a resolved CDN URL by media ID until shortly before its token expires
+
+    Args:
+        post_url: LinkedIn post URL the video was resolved from
+        video_url: Resolved CDN video URL
+        quality_policy: Quality policy the URL was selected with
+
+    Returns:
+        bool: Whether the URL was cached
+    """
+    media_id = video_media_id(video_url)
+    expires_at = video_url_expiry(video_url)
+    if not media_id or not expires_at:
+        # Without a known expiry there is no safe lifetime for the URL
+        return False
+
+    ttl = int(expires_at - time.time() - settings.VIDEO_URL_EXPIRY_MARGIN)
+    if ttl <= 0:
+        return False
+
+    cache.set(MEDIA_URL_KEY.format(media_id, quality_policy), video_url, ttl)
+    cache.set(_post_cache_key(post_url, quality_policy), media_id, ttl)
+    return True
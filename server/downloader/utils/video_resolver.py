@@ -0,0 +1,78 @@
+import logging
+from .failures import classify_failure, failure_from, linkedin_breaker
+from .linkedin_downloader import LinkedInDownloader
+from .metrics import stage_timer
+from .url_cache import get_cached_video_url, cache_video_url
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserInitError(Exception):
+    """Raised when the Chrome WebDriver could not be started"""
+
+
+def resolve_video_url(post_url, linkedin_email='', linkedin_password='', quality_policy='highest'):
+    """
+    Resolve the direct CDN URL of a LinkedIn post video
+
+    A URL resolved earlier for the same post is reused while its signed token is valid,
+    otherwise a browser is launched to scrape the post. Only anonymous resolutions are
+    cached and reused: a URL found through a login may be for a post anonymous
+    callers can't see.
+
+    Args:
+        post_url: LinkedIn post URL
+        linkedin_email: Optional LinkedIn account email
+        linkedin_password: Optional LinkedIn account password
+        quality_policy: Which rendition to pick (see video_variants.parse_quality_policy)
+
+    Returns:
+        tuple: (video URL or None, whether it came from the cache)
+
+    Raises:
+        BrowserInitError: If Chrome could not be started
+        CircuitOpenError: If browser work is paused because LinkedIn is failing
+        JobFailure: If the post page failed in a way a later attempt may not (transient)
+    """
+    anonymous = not (linkedin_email and linkedin_password)
+    if anonymous:
+        cached_url = get_cached_video_url(post_url, quality_policy)
+        if cached_url:
+            return cached_url, True
+
+    linkedin_breaker.raise_if_open()
+
+    downloader = LinkedInDownloader(headless=True, timeout=15)
+    with stage_timer('browser_launch') as stage:
+        if not downloader.setup_driver():
+            stage.fail('driver_init')
+            raise BrowserInitError("Failed to initialize browser")
+
+    try:
+        # Login if credentials provided, continue without it on failure
+        if not anonymous:
+            with stage_timer('login') as stage:
+                if not downloader.login_to_linkedin(linkedin_email, linkedin_password):
+                    stage.fail('login_rejected')
+                    logger.warning(f"LinkedIn login failed while resolving {post_url}")
+
+        with stage_timer('page_ready') as stage:
+            video_url = downloader.extract_video_url(post_url, quality_policy)
+            if not video_url:
+                stage.fail('no_video')
+                # A page that timed out or errored is not a post without a video
+                failure = failure_from(downloader.last_error, "Could not extract video URL from the post", 'no_video')
+                if failure.transient:
+                    raise failure
+        linkedin_breaker.record_success()
+    except Exception as e:
+        if classify_failure(e).counts_against_linkedin:
+            linkedin_breaker.record_failure()
+        raise
+    finally:
+        # Always close the browser
+        downloader.close()
+
+    if video_url and anonymous:
+        cache_video_url(post_url, video_url, quality_policy)
+    return video_url, False
@@ -0,0 +1,167 @@
+import html
+import json
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from .linkedin_urls import video_variant_height
+
+logger = logging.getLogger(__name__)
+
+QUALITY_POLICIES = ('highest', 'lowest', 'max_height', 'max_bytes')
+DATA_SOURCES_PATTERN = re.compile(r'data-sources="([^"]*)"')
+DMS_SRC_PATTERN = re.compile(r'dms-src="([^"]*)"')
+HEAD_TIMEOUT = 5
+
+
+def parse_quality_policy(policy):
+    """
+    Parse a quality policy string
+
+    Accepted forms are 'highest', 'lowest', 'max_height:<pixels>' and 'max_bytes:<bytes>'.
+
+    Returns:
+        tuple: (policy name, limit or None)
+
+    Raises:
+        ValueError: If the policy is not recognised
+    """
+    name, _, limit = (policy or 'highest').strip().partition(':')
+    if name not in QUALITY_POLICIES:
+        raise ValueError(f"Unknown quality policy '{policy}', expected one of {', '.join(QUALITY_POLICIES)}")
+
+    if name in ('highest', 'lowest'):
+        if limit:
+            raise ValueError(f"Quality policy '{name}' takes no limit")
+        return name, None
+
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError(f"Quality policy '{name}' needs a numeric limit, e.g. '{name}:720'")
+    if limit <= 0:
+        raise ValueError(f"Quality policy '{name}' needs a positive limit")
+    return name, limit
+
+
+def make_variant(url, height=None, bitrate=None, size=None):
+    """Describe one downloadable rendition of a video"""
+    return {
+        'url': url,
+        'height': height or video_variant_height(url),
+        'bitrate': bitrate,
+        'size': size,
+    }
+
+
+def _source_number(source, *keys):
+    for key in keys:
+        try:
+            return int(source[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+def parse_page_variants(page_source):
+    """
+    Collect every video rendition referenced by the data-sources and dms-src attributes of a page
+
+    Returns:
+        list: Variant dicts (see make_variant)
+    """
+    variants = []
+    for data_sources in DATA_SOURCES_PATTERN.findall(page_source):
+        try:
+            sources = json.loads(html.unescape(data_sources))
+        except ValueError:
+            continue
+        if not isinstance(sources, list):
+            continue
+        for source in sources:
+            if isinstance(source, dict) and source.get('src'):
+                variants.append(make_variant(
+                    source['src'],
+                    height=_source_number(source, 'height'),
+                    bitrate=_source_number(source, 'bitrate', 'data-bitrate', 'quality'),
+                ))
+
+    for dms_src in DMS_SRC_PATTERN.findall(page_source):
+        variants.append(make_variant(html.unescape(dms_src)))
+    return variants
+
+
+def merge_variants(variants):
+    """Drop duplicate URLs, keeping the first (most detailed) description of each"""
+    merged = {}
+    for variant in variants:
+        if variant['url'] not in merged:
+            merged[variant['url']] = variant
+        else:
+            known = merged[variant['url']]
+            for key in ('height', 'bitrate', 'size'):
+                known[key] = known[key] or variant[key]
+    return list(merged.values())
+
+
+def _head_size(url):
+    try:
+        response = requests.head(url, allow_redirects=True, timeout=HEAD_TIMEOUT)
+        response.raise_for_status()
+        return int(response.headers['content-length'])
+    except (requests.RequestException, KeyError, ValueError) as e:
+        logger.warning(f"Could not determine size of video variant: {e}")
+        return None
+
+
+def fetch_variant_sizes(variants):
+    """Fill in the size of each variant with concurrent HEAD requests"""
+    missing = [variant for variant in variants if variant['size'] is None]
+    if not missing:
+        return variants
+
+    with ThreadPoolExecutor(max_workers=min(len(missing), 8)) as executor:
+        for variant, size in zip(missing, executor.map(_head_size, [variant['url'] for variant in missing])):
+            variant['size'] = size
+    return variants
+
+
+def _quality_key(variant):
+    # Unknown resolutions and bitrates rank below every known one
+    return (variant['height'] or 0, variant['bitrate'] or 0, variant['size'] or 0)
+
+
+def select_variant(variants, policy='highest'):
+    """
+    Pick the rendition to download according to a quality policy
+
+    Capped policies take the best variant within the cap, and fall back to the
+    smallest variant when none fits. Sizes are only fetched for max_bytes.
+
+    Args:
+        variants: Variant dicts
+        policy: Quality policy string (see parse_quality_policy)
+
+    Returns:
+        dict or None: The selected variant
+    """
+    if not variants:
+        return None
+
+    name, limit = parse_quality_policy(policy)
+    ranked = sorted(variants, key=_quality_key)
+    if name == 'highest':
+        return ranked[-1]
+    if name == 'lowest':
+        return ranked[0]
+
+    if name == 'max_height':
+        fitting = [variant for variant in ranked if variant['height'] and variant['height'] <= limit]
+        return fitting[-1] if fitting else ranked[0]
+
+    fetch_variant_sizes(ranked)
+    fitting = [variant for variant in ranked if variant['size'] is not None and variant['size'] <= limit]
+    if fitting:
+        return fitting[-1]
+    sized = [variant for variant in ranked if variant['size'] is not None]
+    return min(sized, key=lambda variant: variant['size']) if sized else ranked[0]
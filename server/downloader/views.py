@@ -1,14 +1,44 @@
-from rest_framework import views, status
+import os
+import re
+import logging
+from datetime import timedelta
+from rest_framework import generics, views, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.http import Http404, HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
-
-from downloader.utils.linkedin_downloader import LinkedInDownloader
+from django.urls import reverse
+from django.utils import timezone
 
 from .models import LinkedInVideo, VideoMetadata
-from .serializers import LinkedInVideoSerializer, LinkedInVideoCreateSerializer, VideoDownloadURLSerializer
-from .tasks import download_linkedin_video
+from .pagination import VideoCursorPagination
+from .serializers import (
+    EngagementSnapshotSerializer, EngagementTrackingSerializer, LinkPreviewQuerySerializer,
+    LinkedInVideoSerializer, LinkedInVideoCreateSerializer, LinkedInVideoListSerializer,
+    VideoDownloadURLSerializer, VideoListFilterSerializer, VideoSearchQuerySerializer
+)
+from .tasks import enqueue_download, resolve_video_download_url, package_hls, hls_failure_key, hls_lock_key
+from .utils.failures import CircuitOpenError, JobFailure
+from .utils.file_serving import serve_file
 from .utils.immediate_metadata import extract_immediate_metadata
+from .utils.job_credentials import store_job_credentials
+from .utils.link_preview import PREVIEW_IMAGE_DIR, PreviewURLError, get_link_preview, preview_image_path
+from .utils.media_processing import hls_file_name
+from .utils.metrics import PROMETHEUS_AVAILABLE, generate_metrics
+from .utils.scheduling import DEFERRED_PRIORITIES, client_key_for_request
+from .utils.search import get_search_backend
+from .utils.storage import get_video_storage
+from .utils.url_cache import get_cached_video_url
+from .utils.video_resolver import resolve_video_url, BrowserInitError
+
+logger = logging.getLogger(__name__)
+
+# How stale last_accessed_at may get before playback updates it
+ACCESS_RECORD_INTERVAL = timedelta(hours=1)
 
 class LinkedInVideoView(views.APIView):
     """
@@ -27,15 +57,26 @@ class LinkedInVideoView(views.APIView):
         video = LinkedInVideo(
             post_url=serializer.validated_data['post_url'],
             linkedin_email=serializer.validated_data.get('linkedin_email', ''),
-            linkedin_password=serializer.validated_data.get('linkedin_password', '')
+            linkedin_password=serializer.validated_data.get('linkedin_password', ''),
+            quality_policy=serializer.validated_data.get('quality_policy', ''),
+            priority=serializer.validated_data.get('priority', 'interactive'),
+            client_key=client_key_for_request(request),
+            is_tracked=serializer.validated_data.get('is_tracked', False)
         )
-        video.save()
         
-        # Extract basic metadata immediately to provide in the response
-        extract_immediate_metadata(video)
+        # Interactive downloads are queued straight away; bulk and background ones
+        # wait for dispatch_pending_downloads to share their queue between clients
+        if video.priority not in DEFERRED_PRIORITIES:
+            video.queued_at = timezone.now()
+        
+        # Extract basic metadata immediately to provide in the response,
+        # inserting the video together with it
+        if not extract_immediate_metadata(video):
+            video.save()
         
         # Trigger background task for full processing
-        download_linkedin_video.delay(str(video.id))
+        if video.queued_at:
+            enqueue_download(video)
         
         # Return the video object with initial metadata
         return Response(
@@ -56,6 +97,86 @@ class LinkedInVideoView(views.APIView):
         return Response(LinkedInVideoSerializer(video).data)
 
 
+class LinkedInVideoListView(generics.ListAPIView):
+    """
+    API endpoint for listing LinkedIn videos
+    - GET: Cursor-paginated list, newest first, filterable by status, hashtag,
+      author and creation date range
+    """
+    permission_classes = [AllowAny]
+    serializer_class = LinkedInVideoListSerializer
+    pagination_class = VideoCursorPagination
+    
+    def get_queryset(self):
+        """Build the filtered queryset, loading relations in a fixed number of queries"""
+        filters = VideoListFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        params = filters.validated_data
+        
+        queryset = LinkedInVideo.objects.select_related('metadata').prefetch_related('hashtags')
+        
+        if 'status' in params:
+            queryset = queryset.filter(status=params['status'])
+        if 'hashtag' in params:
+            queryset = queryset.filter(hashtags__name=params['hashtag'].lstrip('#'))
+        if 'author' in params:
+            queryset = queryset.filter(
+                Q(metadata__author_username=params['author']) |
+                Q(metadata__author_name__iexact=params['author'])
+            )
+        if 'created_after' in params:
+            queryset = queryset.filter(created_at__gte=params['created_after'])
+        if 'created_before' in params:
+            queryset = queryset.filter(created_at__lt=params['created_before'])
+        
+        return queryset
+
+
+class VideoSearchView(views.APIView):
+    """
+    API endpoint for full-text search over videos
+    - GET: Videos matching the query in their title, description, post text or
+      hashtags, most relevant first, filterable by status and creation date
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        """Search videos"""
+        query = VideoSearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        
+        # Fetch one extra hit to know whether there is a next page
+        hits = get_search_backend().search(
+            params['q'],
+            status=params.get('status'),
+            created_after=params.get('created_after'),
+            created_before=params.get('created_before'),
+            limit=params['limit'] + 1,
+            offset=params['offset']
+        )
+        has_next = len(hits) > params['limit']
+        hits = hits[:params['limit']]
+        
+        videos = LinkedInVideo.objects.select_related('metadata').prefetch_related('hashtags').in_bulk(
+            [video_id for video_id, _ in hits]
+        )
+        results = []
+        for video_id, rank in hits:
+            if video_id in videos:
+                item = LinkedInVideoListSerializer(videos[video_id], context={'request': request}).data
+                item['rank'] = rank
+                results.append(item)
+        
+        next_url = None
+        if has_next:
+            next_params = request.query_params.copy()
+            next_params['offset'] = params['offset'] + params['limit']
+            next_url = request.build_absolute_uri(f"{request.path}?{next_params.urlencode()}")
+        
+        return Response({"next": next_url, "results": results})
+
+
 class TaskStatusView(views.APIView):
     """
     API endpoint for checking task status
@@ -95,7 +216,9 @@ class TaskStatusView(views.APIView):
 class VideoDownloadURLView(views.APIView):
     """
     API endpoint for getting a direct download URL for a LinkedIn video
-    - POST: Extract and return a direct downloadable URL for a LinkedIn video post
+    - POST: Extract and return a direct downloadable URL for a LinkedIn video post,
+      or queue the extraction and return a job handle when run_async is set
+    - GET: Get the status and result of a queued extraction job
     """
     permission_classes = [AllowAny]
     
@@ -120,46 +243,333 @@ class VideoDownloadURLView(views.APIView):
         # Get optional credentials if provided
         linkedin_email = serializer.validated_data.get('email', '')
         linkedin_password = serializer.validated_data.get('password', '')
+        quality_policy = serializer.validated_data.get('quality_policy') or settings.VIDEO_QUALITY_POLICY
         
-        try:
-            # Initialize downloader
-            downloader = LinkedInDownloader(headless=True, timeout=15)
+        if serializer.validated_data.get('run_async'):
+            if linkedin_email and linkedin_password:
+                # Credentials never go into a task's arguments, only a token to fetch them with
+                credentials_token = store_job_credentials(linkedin_email, linkedin_password)
+            else:
+                # Serve from the cache without queueing when the URL is still valid
+                cached_url = get_cached_video_url(post_url, quality_policy)
+                if cached_url:
+                    return Response({
+                        "downloadable_url": cached_url,
+                        "post_url": post_url,
+                        "cached": True
+                    })
+                credentials_token = None
             
-            # Setup browser
-            if not downloader.setup_driver():
-                return Response(
-                    {"error": "Failed to initialize browser"},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-                
-            try:
-                # Login if credentials provided
-                if linkedin_email and linkedin_password:
-                    login_success = downloader.login_to_linkedin(linkedin_email, linkedin_password)
-                    if not login_success:
-                        # Continue without login, but log a warning
-                        pass
-                
-                # Extract video URL
-                video_url = downloader.extract_video_url(post_url)
-                
-                if not video_url:
-                    return Response(
-                        {"error": "Could not extract video URL from the post. The post might not contain a video or might require login."},
-                        status=status.HTTP_404_NOT_FOUND
-                    )
-                    
-                return Response({
-                    "downloadable_url": video_url,
-                    "post_url": post_url
-                })
-                
-            finally:
-                # Always close the browser
-                downloader.close()
-                
+            job = resolve_video_download_url.delay(post_url, quality_policy, credentials_token)
+            return Response(
+                {"job_id": job.id, "status": "pending", "post_url": post_url},
+                status=status.HTTP_202_ACCEPTED
+            )
+        
+        try:
+            video_url, cached = resolve_video_url(post_url, linkedin_email, linkedin_password, quality_policy)
+        except BrowserInitError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        except CircuitOpenError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(int(e.retry_after) + 1)}
+            )
+        except JobFailure as e:
+            # The post page timed out or was refused, worth trying again later
+            headers = {'Retry-After': str(int(e.retry_after) + 1)} if e.retry_after else None
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers=headers
+            )
         except Exception as e:
             return Response(
                 {"error": f"Error extracting video URL: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+        
+        if not video_url:
+            return Response(
+                {"error": "Could not extract video URL from the post. The post might not contain a video or might require login."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+            
+        return Response({
+            "downloadable_url": video_url,
+            "post_url": post_url,
+            "cached": cached
+        })
+    
+    def get(self, request):
+        """Get status and result of a queued URL extraction job"""
+        job_id = request.query_params.get('job_id')
+        if not job_id:
+            return Response(
+                {"error": "Missing required parameter 'job_id'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        job = resolve_video_download_url.AsyncResult(job_id)
+        response = {"job_id": job_id}
+        
+        if job.state == 'SUCCESS':
+            response.update(job.result)
+            response["status"] = 'failed' if 'error' in job.result else 'completed'
+        elif job.state == 'FAILURE':
+            response["status"] = 'failed'
+            response["error"] = f"Error extracting video URL: {job.result}"
+        elif job.state in ('STARTED', 'RETRY'):
+            response["status"] = 'processing'
+        else:
+            # Celery reports unknown job IDs as PENDING too
+            response["status"] = 'pending'
+        
+        return Response(response)
+
+
+class VideoFileView(views.APIView):
+    """
+    API endpoint for playing back a downloaded LinkedIn video
+    - GET/HEAD: Stream the video file with HTTP Range and conditional request support
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request, video_id):
+        """Serve the video file, or the requested byte range of it"""
+        video = get_object_or_404(LinkedInVideo, id=video_id)
+        if not video.video_file:
+            raise Http404("Video file is not available")
+        
+        # Feed the retention policy, writing at most once per interval per video
+        now = timezone.now()
+        if not video.last_accessed_at or now - video.last_accessed_at > ACCESS_RECORD_INTERVAL:
+            LinkedInVideo.objects.filter(pk=video.pk).update(last_accessed_at=now)
+        
+        try:
+            path = video.video_file.path
+        except NotImplementedError:
+            # Storage without local paths serves the file itself
+            return HttpResponseRedirect(video.video_file.url)
+        
+        if not os.path.exists(path):
+            raise Http404("Video file is not available")
+        
+        return serve_file(request, path, video.video_file.name)
+
+
+HLS_FILE_PATTERN = re.compile(r'^(index\.m3u8|segment_\d{5}\.ts)$')
+HLS_CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.ts': 'video/mp2t',
+}
+# Seconds a player should wait before asking again for a playlist still being packaged
+HLS_RETRY_AFTER = 5
+
+
+class VideoHLSView(views.APIView):
+    """
+    API endpoint for adaptive (HLS) playback of a downloaded LinkedIn video
+    - GET/HEAD: Serve the index.m3u8 playlist or one of its segments
+    
+    The first request for a playlist queues the packaging job and answers 503 with
+    Retry-After; once packaged, playlist and segments are served from the video
+    storage like video files.
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request, video_id, name):
+        """Serve an HLS file, packaging the video on first play"""
+        if not settings.HLS_ENABLED or not HLS_FILE_PATTERN.match(name):
+            raise Http404("HLS file not found")
+        
+        storage = get_video_storage()
+        stored_name = hls_file_name(video_id, name)
+        if name != 'index.m3u8':
+            # Players only ask for the segments of a playlist they got
+            return self.serve(request, storage, stored_name)
+        
+        if storage.exists(stored_name):
+            # Count HLS plays for the retention policy too, in one conditional write
+            now = timezone.now()
+            LinkedInVideo.objects.filter(pk=video_id).filter(
+                Q(last_accessed_at__isnull=True) | Q(last_accessed_at__lt=now - ACCESS_RECORD_INTERVAL)
+            ).update(last_accessed_at=now)
+            return self.serve(request, storage, stored_name)
+        
+        if cache.get(hls_failure_key(video_id)):
+            return Response(
+                {"status": "failed", "error": "The video could not be packaged for HLS playback"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        video = get_object_or_404(LinkedInVideo.objects.only('id', 'video_file'), id=video_id)
+        if not video.video_file:
+            raise Http404("Video file is not available")
+        
+        # Only the first concurrent request queues the job; the task releases the lock
+        if cache.add(hls_lock_key(video.id), True, timeout=settings.MEDIA_TOOL_TIMEOUT):
+            package_hls.delay(str(video.id))
+        
+        response = Response({"status": "packaging"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = str(HLS_RETRY_AFTER)
+        return response
+    
+    def serve(self, request, storage, name):
+        """Serve a stored HLS file from disk, or from a storage without local paths"""
+        content_type = HLS_CONTENT_TYPES[os.path.splitext(name)[1]]
+        try:
+            path = storage.path(name)
+        except NotImplementedError:
+            if name.endswith('.m3u8'):
+                # Segment URIs are relative to the playlist, so it is served from here
+                # and the segment requests are redirected to the storage
+                with storage.open(name) as f:
+                    return HttpResponse(f.read(), content_type=content_type)
+            return HttpResponseRedirect(storage.url(name))
+        
+        if not os.path.exists(path):
+            raise Http404("HLS file not found")
+        return serve_file(request, path, name, content_type=content_type)
+
+
+class VideoEngagementView(views.APIView):
+    """
+    API endpoint for the engagement history of a post
+    - GET: Likes and comments snapshots, oldest first, with the tracking state
+    - POST: Start or stop tracking the post, e.g. {"is_tracked": true}
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request, video_id):
+        """Get the engagement time series of a video"""
+        video = get_object_or_404(LinkedInVideo.objects.only('id', 'is_tracked', 'engagement_refreshed_at'), id=video_id)
+        snapshots = video.engagement_snapshots.only('captured_at', 'num_likes', 'num_comments')
+        return Response({
+            "video_id": video.id,
+            "is_tracked": video.is_tracked,
+            "engagement_refreshed_at": video.engagement_refreshed_at,
+            "snapshots": EngagementSnapshotSerializer(snapshots, many=True).data
+        })
+    
+    def post(self, request, video_id):
+        """Start or stop tracking the engagement of a video"""
+        serializer = EngagementTrackingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        updated = LinkedInVideo.objects.filter(id=video_id).update(is_tracked=serializer.validated_data['is_tracked'])
+        if not updated:
+            raise Http404("Video not found")
+        return self.get(request, video_id)
+
+
+class LinkPreviewView(views.APIView):
+    """
+    API endpoint for link previews in the mobile client
+    - GET: Title, description, image and site name of a page, e.g. ?url=https://example.com/article
+    
+    Previews come from the shared cache when possible; the image points at a
+    downscaled copy served by link-preview-image/ when one could be stored.
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        """Get the preview of a page"""
+        serializer = LinkPreviewQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            preview, cached = get_link_preview(serializer.validated_data['url'])
+        except PreviewURLError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if 'error' in preview:
+            return Response(
+                {"error": f"Could not fetch the page: {preview['error']}", "url": preview['url']},
+                status=status.HTTP_502_BAD_GATEWAY
+            )
+        
+        response = {key: value for key, value in preview.items() if key != 'image_file'}
+        if 'image_file' in preview:
+            response['image'] = request.build_absolute_uri(reverse('link-preview-image', args=[preview['image_file']]))
+        response['cached'] = cached
+        # Let the phone's HTTP cache answer repeated previews without a request
+        return Response(response, headers={'Cache-Control': f"public, max-age={settings.LINK_PREVIEW_CACHE_TTL}"})
+
+
+PREVIEW_IMAGE_PATTERN = re.compile(r'^[0-9a-f]{64}\.jpg$')
+
+
+class LinkPreviewImageView(views.APIView):
+    """
+    API endpoint for the downscaled images of link previews
+    - GET/HEAD: Serve a stored preview image
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request, name):
+        """Serve a preview image"""
+        path = preview_image_path(name)
+        if not PREVIEW_IMAGE_PATTERN.match(name) or not os.path.exists(path):
+            raise Http404("Preview image is not available")
+        
+        response = serve_file(request, path, f"{PREVIEW_IMAGE_DIR}/{name}", content_type='image/jpeg')
+        response['Cache-Control'] = f"public, max-age={settings.LINK_PREVIEW_CACHE_TTL}"
+        return response
+
+
+class HealthCheckView(views.APIView):
+    """
+    API endpoint for load balancer health checks
+    - GET: Report whether the database is reachable
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        """Check the database connection"""
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except Exception:
+            # The error text can name hosts and users, so it only goes to the log
+            logger.exception("Health check could not reach the database")
+            return Response(
+                {"status": "unavailable", "database": "database unavailable"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        return Response({"status": "ok", "database": connection.vendor})
+
+
+
+class MetricsView(views.APIView):
+    """
+    API endpoint for Prometheus scraping
+    - GET: Per-stage timings and outcomes, download volume, URL cache hits,
+      running browsers and Celery queue depth, in the Prometheus text format
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        """Render all metrics"""
+        if not PROMETHEUS_AVAILABLE:
+            return Response(
+                {"error": "Metrics require the prometheus_client package"},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+        
+        payload, content_type = generate_metrics([
+            settings.CELERY_TASK_DEFAULT_QUEUE, settings.CELERY_BULK_QUEUE, settings.CELERY_BACKGROUND_QUEUE,
+            settings.CELERY_BROWSER_QUEUE, settings.CELERY_MEDIA_QUEUE, settings.CELERY_SCHEDULER_QUEUE
+        ])
+        return HttpResponse(payload, content_type=content_type)
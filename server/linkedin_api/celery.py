@@ -1,9 +1,13 @@
 import os
+import logging
 from celery import Celery
+from celery.signals import worker_init, worker_process_shutdown
 
 # Set the default Django settings module
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'linkedin_api.settings')
 
+logger = logging.getLogger(__name__)
+
 # Create the Celery app
 app = Celery('linkedin_api')
 
@@ -13,6 +17,27 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Auto-discover tasks in all installed apps
 app.autodiscover_tasks()
 
+@worker_init.connect
+def resolve_chromedriver_at_boot(sender=None, **kwargs):
+    """Resolve ChromeDriver before the pool forks, so every child inherits the result"""
+    from django.conf import settings
+    from downloader.utils.chromedriver import ChromeDriverError, resolve_chromedriver
+
+    # Only workers consuming browser tasks need Chrome
+    consumed = set(sender.app.amqp.queues.consume_from) if sender else set()
+    if not consumed & {*settings.DOWNLOAD_PRIORITY_QUEUES.values(), settings.CELERY_BROWSER_QUEUE}:
+        return
+    try:
+        resolve_chromedriver()
+    except ChromeDriverError as e:
+        logger.critical(f"Browser tasks will fail on this worker: {e}")
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    """Stop counting the live gauges of a prefork child that exited"""
+    from downloader.utils.metrics import mark_process_dead
+    mark_process_dead(pid or os.getpid())
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
\ No newline at end of file
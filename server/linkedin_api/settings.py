@@ -81,11 +81,47 @@ WSGI_APPLICATION = 'linkedin_api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DATABASE_ENGINE=postgres for multi-worker deployments, sqlite (default) for single-node installs
+DATABASE_ENGINE = os.getenv('DATABASE_ENGINE', 'sqlite')
+
+if DATABASE_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'linkedin_api'),
+            'USER': os.getenv('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            # Keep connections open between requests/tasks, and check them before reuse
+            'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DATABASE_CONNECT_TIMEOUT', 5)),
+            },
+        }
     }
+    # DATABASE_POOL=pgbouncer when connecting through PgBouncer in transaction pooling mode,
+    # which can't keep server-side cursors open across transactions
+    if os.getenv('DATABASE_POOL') == 'pgbouncer':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Seconds to wait for the write lock before raising "database is locked"
+                'timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 20)),
+            },
+        }
+    }
+
+# Applied to every new SQLite connection: WAL lets readers proceed while a worker writes
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 20)) * 1000,
 }
 
 
@@ -131,11 +167,128 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Where video files are stored: 'filesystem' (MEDIA_ROOT) or 's3' (any S3-compatible store, requires boto3)
+VIDEO_STORAGE_BACKEND = os.getenv('VIDEO_STORAGE_BACKEND', 'filesystem')
+VIDEO_STORAGE_S3 = {
+    'bucket': os.getenv('S3_BUCKET', 'linkedin-videos'),
+    'endpoint_url': os.getenv('S3_ENDPOINT_URL', ''),  # e.g. http://localhost:9000 for MinIO
+    'region_name': os.getenv('S3_REGION', ''),
+    'access_key': os.getenv('S3_ACCESS_KEY', ''),
+    'secret_key': os.getenv('S3_SECRET_KEY', ''),
+    'part_size': int(os.getenv('S3_PART_SIZE', 8 * 1024 * 1024)),
+    'max_concurrency': int(os.getenv('S3_MAX_CONCURRENCY', 4)),
+    'url_expiry': int(os.getenv('S3_URL_EXPIRY', 3600)),  # Lifetime of presigned read URLs in seconds
+}
+
+# Downloads in progress; files left behind by crashed jobs are removed by the retention task
+VIDEO_TEMP_DIR = os.getenv('VIDEO_TEMP_DIR', os.path.join(BASE_DIR, 'tmp'))
+
+# Retention policies applied by the periodic apply_retention_policies task, 0 disables a policy
+VIDEO_RETENTION = {
+    # Delete video files not played for this many days, keeping the row and metadata
+    'evict_files_after_days': int(os.getenv('RETENTION_EVICT_FILES_AFTER_DAYS', 30)),
+    # Delete failed jobs this many days after they failed
+    'purge_failed_after_days': int(os.getenv('RETENTION_PURGE_FAILED_AFTER_DAYS', 7)),
+    # Delete every job, with its file, this many days after it was created
+    'purge_all_after_days': int(os.getenv('RETENTION_PURGE_ALL_AFTER_DAYS', 0)),
+    # Delete temporary and unreferenced video files older than this many hours
+    'orphan_files_after_hours': int(os.getenv('RETENTION_ORPHAN_FILES_AFTER_HOURS', 6)),
+    # Rows handled per transaction, and transactions per policy per run
+    'batch_size': int(os.getenv('RETENTION_BATCH_SIZE', 200)),
+    'max_batches': int(os.getenv('RETENTION_MAX_BATCHES', 50)),
+}
+
+# Remux downloads for fast start and extract a poster frame, duration and resolution (needs ffmpeg)
+VIDEO_POSTPROCESS_ENABLED = os.getenv('VIDEO_POSTPROCESS_ENABLED', 'false').lower() == 'true'
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+FFPROBE_BINARY = os.getenv('FFPROBE_BINARY', 'ffprobe')
+MEDIA_TOOL_TIMEOUT = int(os.getenv('MEDIA_TOOL_TIMEOUT', 600))
+
+# ChromeDriver used by the scraping browser, resolved once per process. Set
+# CHROMEDRIVER_PATH to pin a preinstalled driver; otherwise chromedriver is looked
+# up on PATH, and only then downloaded by webdriver-manager (needs network access,
+# disable with CHROMEDRIVER_AUTO_INSTALL=false for offline hosts)
+CHROMEDRIVER_PATH = os.getenv('CHROMEDRIVER_PATH', '')
+CHROMEDRIVER_AUTO_INSTALL = os.getenv('CHROMEDRIVER_AUTO_INSTALL', 'true').lower() == 'true'
+CHROME_BINARY = os.getenv('CHROME_BINARY', '')
+# Seconds a failed resolution is remembered before browser tasks try again
+CHROMEDRIVER_RETRY_AFTER = int(os.getenv('CHROMEDRIVER_RETRY_AFTER', 60))
+
+# Downloads that fail for a transient reason (timeouts, HTTP 429 and 5xx, browser
+# errors) are retried until DOWNLOAD_MAX_ATTEMPTS attempts were made, waiting
+# DOWNLOAD_RETRY_BACKOFF seconds after the first, doubling up to the maximum, with jitter
+DOWNLOAD_MAX_ATTEMPTS = int(os.getenv('DOWNLOAD_MAX_ATTEMPTS', 4))
+DOWNLOAD_RETRY_BACKOFF = float(os.getenv('DOWNLOAD_RETRY_BACKOFF', 30))
+DOWNLOAD_RETRY_BACKOFF_MAX = float(os.getenv('DOWNLOAD_RETRY_BACKOFF_MAX', 1800))
+# Seconds to wait for the CDN to accept a video download connection, and between
+# two reads of its body, so a stalled connection fails as a retryable timeout
+VIDEO_DOWNLOAD_CONNECT_TIMEOUT = float(os.getenv('VIDEO_DOWNLOAD_CONNECT_TIMEOUT', 10))
+VIDEO_DOWNLOAD_READ_TIMEOUT = float(os.getenv('VIDEO_DOWNLOAD_READ_TIMEOUT', 60))
+
+# Circuit breaker pausing browser work when LinkedIn fails too often. It opens for
+# LINKEDIN_BREAKER_COOLDOWN seconds once at least LINKEDIN_BREAKER_FAILURE_RATIO of the
+# LinkedIn requests in a LINKEDIN_BREAKER_WINDOW-second window failed (from a minimum
+# of LINKEDIN_BREAKER_MIN_REQUESTS). Its state lives in the cache, so set CACHE_URL to
+# share it between workers
+LINKEDIN_BREAKER_WINDOW = int(os.getenv('LINKEDIN_BREAKER_WINDOW', 60))
+LINKEDIN_BREAKER_MIN_REQUESTS = int(os.getenv('LINKEDIN_BREAKER_MIN_REQUESTS', 10))
+LINKEDIN_BREAKER_FAILURE_RATIO = float(os.getenv('LINKEDIN_BREAKER_FAILURE_RATIO', 0.5))
+LINKEDIN_BREAKER_COOLDOWN = int(os.getenv('LINKEDIN_BREAKER_COOLDOWN', 120))
+
+# Bulk URL metadata previews: requests in flight at once, and per host
+URL_METADATA_CONCURRENCY = int(os.getenv('URL_METADATA_CONCURRENCY', 50))
+URL_METADATA_PER_HOST = int(os.getenv('URL_METADATA_PER_HOST', 8))
+
+# Keep the rendered page of every scraped post, gzip-compressed and stored once per
+# distinct content under PAGE_SNAPSHOT_ROOT, so `manage.py reextract_snapshots` can
+# re-parse them after LinkedIn changes its markup. Pages of logged-in sessions can
+# hold account data, so keep the directory out of MEDIA_ROOT
+PAGE_SNAPSHOTS_ENABLED = os.getenv('PAGE_SNAPSHOTS_ENABLED', 'false').lower() == 'true'
+PAGE_SNAPSHOT_ROOT = os.getenv('PAGE_SNAPSHOT_ROOT', os.path.join(BASE_DIR, 'snapshots'))
+
+# Link previews for the mobile client: title, description and image of a page, kept in
+# the shared cache for LINK_PREVIEW_CACHE_TTL seconds (failed fetches for
+# LINK_PREVIEW_ERROR_TTL). Images are downscaled to fit LINK_PREVIEW_IMAGE_SIZE pixels
+# and stored under MEDIA_ROOT/link_previews (needs Pillow, otherwise clients get the
+# original image URL). Pages larger than LINK_PREVIEW_PAGE_MAX_BYTES are not read.
+# Hosts on private networks are refused, on every redirect too, unless allowed
+LINK_PREVIEW_CACHE_TTL = int(os.getenv('LINK_PREVIEW_CACHE_TTL', 86400))
+LINK_PREVIEW_ERROR_TTL = int(os.getenv('LINK_PREVIEW_ERROR_TTL', 300))
+LINK_PREVIEW_IMAGE_SIZE = int(os.getenv('LINK_PREVIEW_IMAGE_SIZE', 600))
+LINK_PREVIEW_IMAGE_QUALITY = int(os.getenv('LINK_PREVIEW_IMAGE_QUALITY', 80))
+LINK_PREVIEW_PAGE_MAX_BYTES = int(os.getenv('LINK_PREVIEW_PAGE_MAX_BYTES', 2 * 1024 * 1024))
+LINK_PREVIEW_IMAGE_MAX_BYTES = int(os.getenv('LINK_PREVIEW_IMAGE_MAX_BYTES', 10 * 1024 * 1024))
+LINK_PREVIEW_ALLOW_PRIVATE_HOSTS = os.getenv('LINK_PREVIEW_ALLOW_PRIVATE_HOSTS', 'false').lower() == 'true'
+
+# Proxy for the scraping browser, e.g. http://proxy.internal:3128 (the benchmark
+# command points it at its fake LinkedIn server)
+CHROME_PROXY_SERVER = os.getenv('CHROME_PROXY_SERVER', '')
+
+# Rendition downloaded when a request doesn't choose one: highest, lowest,
+# max_height:<pixels> (e.g. max_height:720) or max_bytes:<bytes>
+VIDEO_QUALITY_POLICY = os.getenv('VIDEO_QUALITY_POLICY', 'highest')
+
+# HLS packaging for adaptive playback on mobile clients. Videos are segmented
+# (remux only) on first play and the segments saved to the video storage, next
+# to the files. A failed packaging is reported for HLS_FAILURE_TTL seconds
+# before the next play tries again.
+HLS_ENABLED = os.getenv('HLS_ENABLED', 'false').lower() == 'true'
+HLS_SEGMENT_SECONDS = int(os.getenv('HLS_SEGMENT_SECONDS', 6))
+HLS_FAILURE_TTL = int(os.getenv('HLS_FAILURE_TTL', 3600))
+
+# How video-file/ hands out bytes: 'direct' (WSGI server, sendfile where supported),
+# 'x-accel-redirect' (nginx internal location) or 'x-sendfile' (Apache/lighttpd)
+VIDEO_SERVE_MODE = os.getenv('VIDEO_SERVE_MODE', 'direct')
+VIDEO_ACCEL_REDIRECT_PREFIX = os.getenv('VIDEO_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Text search configuration used for the Postgres full-text index
+FULL_TEXT_SEARCH_CONFIG = os.getenv('FULL_TEXT_SEARCH_CONFIG', 'english')
+
 
 # REST Framework settings
 REST_FRAMEWORK = {
@@ -161,6 +314,90 @@ CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:63
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+CELERY_TASK_TRACK_STARTED = True
+
+# Queue for tasks without a route, e.g. downloads
+CELERY_TASK_DEFAULT_QUEUE = 'celery'
+# Queue for tasks that drive a Chrome browser
+CELERY_BROWSER_QUEUE = os.getenv('CELERY_BROWSER_QUEUE', 'browser')
+# Queue for CPU and disk heavy ffmpeg work, kept apart from downloads
+CELERY_MEDIA_QUEUE = os.getenv('CELERY_MEDIA_QUEUE', 'media')
+# Queue for the periodic dispatch and retention tasks, so they never wait behind
+# the downloads they schedule
+CELERY_SCHEDULER_QUEUE = os.getenv('CELERY_SCHEDULER_QUEUE', 'scheduler')
+# Queues of the download priority classes. Interactive downloads share the default
+# queue and are sent straight away; bulk and background ones wait in the database
+# until dispatch_pending_downloads releases them, round-robin between clients
+CELERY_BULK_QUEUE = os.getenv('CELERY_BULK_QUEUE', 'bulk')
+CELERY_BACKGROUND_QUEUE = os.getenv('CELERY_BACKGROUND_QUEUE', 'background')
+DOWNLOAD_PRIORITY_QUEUES = {
+    'interactive': CELERY_TASK_DEFAULT_QUEUE,
+    'bulk': CELERY_BULK_QUEUE,
+    'background': CELERY_BACKGROUND_QUEUE,
+}
+# Dispatched but unfinished downloads allowed per deferred class; keeping this near
+# the number of worker processes on the queue keeps new clients from waiting long
+DOWNLOAD_DISPATCH_WINDOW = {
+    'bulk': int(os.getenv('BULK_DISPATCH_WINDOW', 20)),
+    'background': int(os.getenv('BACKGROUND_DISPATCH_WINDOW', 5)),
+}
+# Dispatched downloads still unfinished after this many seconds no longer count
+# against the window, so lost messages can't stall a class
+DOWNLOAD_DISPATCH_TIMEOUT = int(os.getenv('DOWNLOAD_DISPATCH_TIMEOUT', 3600))
+CELERY_TASK_ROUTES = {
+    'downloader.tasks.resolve_video_download_url': {'queue': CELERY_BROWSER_QUEUE},
+    'downloader.tasks.postprocess_video': {'queue': CELERY_MEDIA_QUEUE},
+    'downloader.tasks.package_hls': {'queue': CELERY_MEDIA_QUEUE},
+    'downloader.tasks.refresh_tracked_engagement': {'queue': CELERY_BACKGROUND_QUEUE},
+    'downloader.tasks.dispatch_pending_downloads': {'queue': CELERY_SCHEDULER_QUEUE},
+    'downloader.tasks.apply_retention_policies': {'queue': CELERY_SCHEDULER_QUEUE},
+}
+
+# Likes and comments of tracked posts are refreshed without downloading the video,
+# up to ENGAGEMENT_REFRESH_BATCH posts per run through one browser, each post at
+# most once per ENGAGEMENT_REFRESH_INTERVAL seconds
+ENGAGEMENT_REFRESH_INTERVAL = int(os.getenv('ENGAGEMENT_REFRESH_INTERVAL', 6 * 3600))
+ENGAGEMENT_REFRESH_BATCH = int(os.getenv('ENGAGEMENT_REFRESH_BATCH', 50))
+
+# Periodic tasks, run with `celery -A linkedin_api beat`
+CELERY_BEAT_SCHEDULE = {
+    'dispatch-pending-downloads': {
+        'task': 'downloader.tasks.dispatch_pending_downloads',
+        'schedule': float(os.getenv('DOWNLOAD_DISPATCH_INTERVAL', 5)),
+        # Runs missed while no scheduler worker was up are superseded by the next one
+        'options': {'expires': float(os.getenv('DOWNLOAD_DISPATCH_INTERVAL', 5))},
+    },
+    'refresh-tracked-engagement': {
+        'task': 'downloader.tasks.refresh_tracked_engagement',
+        'schedule': float(os.getenv('ENGAGEMENT_REFRESH_SCHEDULE', 600)),
+    },
+    'apply-retention-policies': {
+        'task': 'downloader.tasks.apply_retention_policies',
+        'schedule': float(os.getenv('RETENTION_INTERVAL', 3600)),
+    },
+}
+
+# Shared cache, used among other things to reuse resolved video URLs across workers
+if os.getenv('CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds before a signed CDN URL expires at which it is no longer handed out
+VIDEO_URL_EXPIRY_MARGIN = int(os.getenv('VIDEO_URL_EXPIRY_MARGIN', 300))
+
+# Seconds the credentials of a queued URL job wait in the cache for a worker to
+# read them (once). Workers only see them when CACHE_URL points at a shared cache
+JOB_CREDENTIALS_TTL = int(os.getenv('JOB_CREDENTIALS_TTL', 600))
 
 # Logging Configuration
 LOGGING = {